@@ -0,0 +1,173 @@
+''' QuickCLI Import Time Benchmark
+
+Runs `python -X importtime -c STATEMENT` in fresh processes (by default
+for "import quick_cli" and "from quick_cli import QuickCLIApp") and
+reports cumulative import time of quick_cli in microseconds, along with
+its slowest submodules.
+
+Fails (exit code 1) if:
+  * median import time of a statement exceeds --max-us, or exceeds its
+    median in a --baseline result file by more than --tolerance percent
+  * a statement imports any of its DEFERRED_MODULES (modules that should
+    only be imported on first use)
+
+Results are written as JSON (see --output), so they can serve as a
+baseline for later runs.
+'''
+from argparse import ArgumentParser
+import json
+import os
+import os.path
+import platform
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'src')
+
+STATEMENTS = ['import quick_cli', 'from quick_cli import QuickCLIApp']
+
+DEFERRED_MODULES = {
+    'import quick_cli': ['quick_cli.app', 'argparse', 'datetime'],
+    'from quick_cli import QuickCLIApp': ['argparse', 'datetime', 'json',
+                                          'quick_cli.parser', 'yaml'],
+}
+
+
+def import_times(statement):
+    ''' Run statement with -X importtime in a new process
+
+    Returns list of (name, self us, cumulative us, children) import tree
+    roots, children being lists of the same form
+    '''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [SRC_DIR] + [path for path in [env.get('PYTHONPATH')] if path])
+    process = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                                statement], env=env, stderr=subprocess.PIPE)
+    _, errors = process.communicate()
+    if process.returncode:
+        raise RuntimeError("Failed to run '%s': %s" % (statement,
+                                                      errors.decode('utf-8')))
+    # Modules are listed after their imports, nesting shown by indentation
+    pending = []
+    for line in errors.decode('utf-8').splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # header line
+        depth = len(name) - len(name.lstrip())
+        children = []
+        while pending and pending[-1][0] > depth:
+            children.insert(0, pending.pop()[1])
+        pending.append((depth, (name.strip(), int(self_us), int(cumulative_us),
+                                children)))
+    return [node for _, node in pending]
+
+
+def package_time(nodes, package='quick_cli'):
+    ''' Get cumulative import time of outermost imports of package modules '''
+    total = 0
+    for name, _, cumulative_us, children in nodes:
+        if name == package or name.startswith(package + '.'):
+            total += cumulative_us
+        else:
+            total += package_time(children, package)
+    return total
+
+
+def flatten(nodes):
+    ''' Get dictionary of module name to self import time '''
+    modules = {}
+    for name, self_us, _, children in nodes:
+        modules[name] = self_us
+        modules.update(flatten(children))
+    return modules
+
+
+def measure(statement, repeat):
+    ''' Measure import time of quick_cli for a statement '''
+    samples = []
+    modules = {}
+    for _ in range(repeat):
+        nodes = import_times(statement)
+        samples.append(package_time(nodes))
+        modules = flatten(nodes)
+    samples.sort()
+    slowest = sorted(((self_us, name) for name, self_us in modules.items()
+                      if name.startswith('quick_cli')), reverse=True)[:5]
+    return {
+        'runs': repeat,
+        'min_us': samples[0],
+        'median_us': samples[len(samples) // 2],
+        'max_us': samples[-1],
+        'slowest_self_us': [[name, self_us] for self_us, name in slowest],
+        'modules': sorted(modules),
+    }
+
+
+def check(results, max_us, baseline, tolerance):
+    ''' Check results against limits, returning list of failures '''
+    failures = []
+    for statement, result in sorted(results.items()):
+        median = result['median_us']
+        if max_us is not None and median > max_us:
+            failures.append("%s: %d us exceeds limit of %d us" % (
+                statement, median, max_us))
+        if baseline and statement in baseline:
+            limit = baseline[statement]['median_us'] * (1.0 + tolerance / 100.0)
+            if median > limit:
+                failures.append("%s: %d us exceeds baseline %d us by more than %d%%" % (
+                    statement, median, baseline[statement]['median_us'], tolerance))
+        imported = set(result['modules'])
+        for module in DEFERRED_MODULES.get(statement, []):
+            if module in imported:
+                failures.append("%s: imports %s, which should be deferred" % (
+                    statement, module))
+    return failures
+
+
+def main(argv):
+    ''' Main '''
+    parser = ArgumentParser(description="QuickCLI import time benchmark")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--statement', action='append', dest='statements',
+                        help="Statement to measure (default: %s)" % STATEMENTS)
+    parser.add_argument('--max-us', type=int,
+                        help="Fail if median import time exceeds this")
+    parser.add_argument('--baseline', help="Baseline JSON results to compare")
+    parser.add_argument('--tolerance', type=float, default=25.0,
+                        help="Allowed regression over baseline, in percent "
+                        "[default: %(default)s]")
+    parser.add_argument('--output', '-o', help="Write results to JSON file")
+    opts = parser.parse_args(argv)
+
+    results = dict((statement, measure(statement, opts.repeat))
+                   for statement in opts.statements or STATEMENTS)
+    baseline = None
+    if opts.baseline:
+        with open(opts.baseline) as source:
+            baseline = json.load(source)['results']
+    document = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if opts.output:
+        with open(opts.output, 'w') as output:
+            json.dump(document, output, indent=2, sort_keys=True)
+
+    for statement, result in sorted(results.items()):
+        print("%-40s median %6d us (min %d, max %d)" % (
+            statement, result['median_us'], result['min_us'], result['max_us']))
+        for name, self_us in result['slowest_self_us']:
+            print("    %-36s self %6d us" % (name, self_us))
+    failures = check(results, opts.max_us, baseline, opts.tolerance)
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
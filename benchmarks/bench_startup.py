@@ -0,0 +1,155 @@
+''' QuickCLI Startup And Dispatch Benchmarks
+
+Measures, for a synthetic app of given width, depth and argument count:
+  * construct      - QuickCLIApp construction
+  * compile        - compiling the whole action tree
+  * configure_*    - building the parser (full, lazy and fast path modes)
+  * dispatch_*     - parse_args plus ActionWrapper.execute of a leaf action
+  * help_*         - rendering top level and leaf help
+  * cold_process_* - end-to-end latency of a new Python process
+
+Results are written as JSON (see --output), one document per run, so runs
+of different versions can be compared with --compare.
+'''
+from argparse import ArgumentParser
+import datetime
+import json
+import os.path
+import platform
+import subprocess
+import sys
+import time
+
+import synthetic
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+SYNTHETIC_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'synthetic.py')
+
+
+def measure(func, setup=None, repeat=10):
+    ''' Measure func, calling setup (untimed) before each run
+
+    Returns statistics in milliseconds
+    '''
+    samples = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = _clock()
+        func(state)
+        samples.append((_clock() - start) * 1000.0)
+    samples.sort()
+    return {
+        'runs': repeat,
+        'min_ms': samples[0],
+        'median_ms': samples[len(samples) // 2],
+        'mean_ms': sum(samples) / len(samples),
+        'max_ms': samples[-1],
+    }
+
+
+def run_benchmarks(width, depth, arg_count, repeat, cold_repeat):
+    ''' Run all benchmarks, returning a dictionary of results '''
+    argv = synthetic.leaf_argv(width, depth, arg_count)
+    app_classes = {
+        'full': synthetic.make_app_class(width, depth, arg_count),
+        'lazy': synthetic.make_app_class(width, depth, arg_count,
+                                         LAZY_PARSER=True),
+        'fast': synthetic.make_app_class(width, depth, arg_count,
+                                         FAST_DISPATCH=True),
+    }
+    full_class = app_classes['full']
+    results = {}
+
+    results['construct'] = measure(lambda _: full_class(), repeat=repeat)
+    results['compile'] = measure(lambda app: app.command.compile(),
+                                 setup=full_class, repeat=repeat)
+    for mode, app_class in sorted(app_classes.items()):
+        results['configure_%s' % mode] = measure(
+            lambda app: app.build_parser(argv), setup=app_class, repeat=repeat)
+
+        def dispatch(app):
+            ''' Parse and execute leaf action '''
+            args = vars(app.build_parser(argv).parse_args(argv))
+            app.context.set('args', args)
+            app.command.execute(args)
+        results['dispatch_%s' % mode] = measure(
+            dispatch, setup=app_class, repeat=repeat)
+
+    def make_parser():
+        ''' Setup for help rendering '''
+        app = full_class()
+        return app.build_parser()
+    leaf_path = synthetic.leaf_path(width, depth)
+
+    def help_leaf(parser):
+        ''' Render help of a leaf action '''
+        for name in leaf_path:
+            parser = [action for action in parser._actions  # pylint: disable=protected-access
+                      if action.choices and name in action.choices][0].choices[name]
+        parser.format_help()
+    results['help_top'] = measure(lambda parser: parser.format_help(),
+                                  setup=make_parser, repeat=repeat)
+    results['help_leaf'] = measure(help_leaf, setup=make_parser, repeat=repeat)
+
+    for mode in sorted(app_classes):
+        command = [sys.executable, SYNTHETIC_SCRIPT, '--width', str(width),
+                   '--depth', str(depth), '--args', str(arg_count),
+                   '--mode', mode, '--'] + argv
+        results['cold_process_%s' % mode] = measure(
+            lambda _: subprocess.check_call(command), repeat=cold_repeat)
+    return results
+
+
+def compare(current, baseline_file):
+    ''' Print comparison of current results with a baseline result file '''
+    with open(baseline_file) as source:
+        baseline = json.load(source)['results']
+    print("%-24s %12s %12s %8s" % ("benchmark", "baseline ms", "current ms",
+                                   "ratio"))
+    for name in sorted(current):
+        if name not in baseline:
+            continue
+        old = baseline[name]['median_ms']
+        new = current[name]['median_ms']
+        print("%-24s %12.3f %12.3f %8.2f" % (name, old, new,
+                                             new / old if old else 0.0))
+
+
+def main(argv):
+    ''' Main '''
+    parser = ArgumentParser(description="QuickCLI startup benchmarks")
+    parser.add_argument('--width', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--args', type=int, default=5, dest='arg_count')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--cold-repeat', type=int, default=5)
+    parser.add_argument('--output', '-o', help="Write results to JSON file")
+    parser.add_argument('--compare', help="Baseline JSON results to compare")
+    opts = parser.parse_args(argv)
+
+    results = run_benchmarks(opts.width, opts.depth, opts.arg_count,
+                             opts.repeat, opts.cold_repeat)
+    document = {
+        'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {'width': opts.width, 'depth': opts.depth,
+                   'args': opts.arg_count, 'repeat': opts.repeat,
+                   'cold_repeat': opts.cold_repeat},
+        'results': results,
+    }
+    if opts.output:
+        with open(opts.output, 'w') as output:
+            json.dump(document, output, indent=2, sort_keys=True)
+    else:
+        json.dump(document, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    if opts.compare:
+        compare(results, opts.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
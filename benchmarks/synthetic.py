@@ -0,0 +1,94 @@
+''' Synthetic QuickCLI Applications For Benchmarks
+
+May also be run as a script to execute a synthetic app:
+
+    python synthetic.py --width 10 --depth 3 --args 5 -- a0 a0_1 a0_1_2
+'''
+import os.path
+import sys
+
+try:
+    import quick_cli  # pylint: disable=unused-import
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from quick_cli import Action, QuickCLIApp  # pylint: disable=wrong-import-position
+
+
+def noop(args, wrapper):
+    ''' Leaf action '''
+    return 0
+
+
+def make_args(prefix, count):
+    ''' Make argument definitions for an action '''
+    return [dict(flags='--opt%d' % idx, dest='%s_opt%d' % (prefix, idx),
+                 help="Option %d of %s" % (idx, prefix)) for idx in range(count)]
+
+
+def make_actions(prefix, width, depth, arg_count):
+    ''' Make a level of actions, each with width sub actions, depth deep '''
+    actions = []
+    for idx in range(width):
+        name = "%s%d" % (prefix, idx) if prefix else "a%d" % idx
+        kwargs = dict(args=make_args(name, arg_count),
+                      desc="Synthetic action %s" % name)
+        if depth > 1:
+            kwargs['actions'] = make_actions(
+                name + "_", width, depth - 1, arg_count)
+        else:
+            kwargs['action'] = noop
+        actions.append(Action(name, aliases=[name + "x"], **kwargs))
+    return actions
+
+
+def make_app_class(width, depth, arg_count, **options):
+    ''' Make a synthetic QuickCLIApp class
+
+    options are set as class attributes, i.e. LAZY_PARSER=True
+    '''
+    attrs = dict(ACTIONS=make_actions("", width, depth, arg_count),
+                 __doc__="Synthetic %dx%d app" % (width, depth))
+    attrs.update(options)
+    return type("SyntheticApp", (QuickCLIApp,), attrs)
+
+
+def leaf_path(width, depth):
+    ''' Get names of actions on the path to the last leaf action '''
+    path = []
+    name = ""
+    for _ in range(depth):
+        name = "%s%d" % (name + "_" if name else "a", width - 1)
+        path.append(name)
+    return path
+
+
+def leaf_argv(width, depth, arg_count):
+    ''' Get argv selecting last leaf action, with all its options set '''
+    argv = leaf_path(width, depth)
+    for idx in range(arg_count):
+        argv.extend(['--opt%d' % idx, 'value'])
+    return argv
+
+
+def main(argv):
+    ''' Run a synthetic app '''
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description="Run synthetic QuickCLI app")
+    parser.add_argument('--width', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--args', type=int, default=5, dest='arg_count')
+    parser.add_argument('--mode', default='full',
+                        choices=['full', 'lazy', 'fast'])
+    parser.add_argument('app_argv', nargs='*')
+    opts = parser.parse_args(argv)
+    options = {'lazy': dict(LAZY_PARSER=True),
+               'fast': dict(FAST_DISPATCH=True)}.get(opts.mode, {})
+    app = make_app_class(opts.width, opts.depth, opts.arg_count, **options)()
+    sys.argv = [sys.argv[0]] + opts.app_argv
+    return app.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
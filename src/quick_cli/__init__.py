@@ -1,6 +1,45 @@
-''' QuickCLI Library Package '''
+''' QuickCLI Library Package
 
-from .actions import Action, ActionBase
-from .app import QuickCLIApp
-from .app import QuickCLIAppLogged
-from .context import QuickCLIContext
+Exported names are imported on first use, so "import quick_cli" itself is
+cheap, and submodules are only loaded when needed.
+'''
+import sys
+
+__all__ = ['Action', 'ActionBase', 'ActionRef', 'LazyFileType',
+           'MappedFileType', 'QuickCLIApp', 'QuickCLIAppLogged',
+           'QuickCLIContext']
+
+_EXPORTS = {
+    'Action': 'actions',
+    'ActionBase': 'actions',
+    'ActionRef': 'actions',
+    'LazyFileType': 'arg_types',
+    'MappedFileType': 'arg_types',
+    'QuickCLIApp': 'app',
+    'QuickCLIAppLogged': 'app',
+    'QuickCLIContext': 'context',
+}
+
+
+def __getattr__(name):
+    ''' Import exported names on first use (PEP 562) '''
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+    from importlib import import_module
+    value = getattr(import_module("%s.%s" % (__name__, module_name)), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # No module __getattr__ support, import eagerly
+    from .actions import Action, ActionBase, ActionRef
+    from .arg_types import LazyFileType, MappedFileType
+    from .app import QuickCLIApp
+    from .app import QuickCLIAppLogged
+    from .context import QuickCLIContext
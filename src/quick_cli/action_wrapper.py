@@ -4,118 +4,432 @@ Action Wrapper
 import logging
 import sys
 
+from .actions import ActionRef
+
 LOG = logging.getLogger(__name__)
 
 IS_PYTHON2 = sys.version_info[0] == 2
 
 
+class CompiledAction(object):
+    ''' Immutable, precomputed view of a wrapped action
+
+    Holds everything parser configuration and execution need from an
+    ActionWrapper, so it is not recomputed (or looked up through
+    ActionBase._get_property) on every access.
+    '''
+    __slots__ = ('name', 'aliases', 'path', 'dest', 'actions_title',
+                 'actions_desc', 'actions_metavar', 'actions', 'actions_idx',
+                 'fan_out', 'cacheable', 'cache_ttl', 'records')
+
+    def __init__(self, wrapper):
+        ''' Constructor '''
+        command = wrapper.command
+        actions, actions_idx = wrapper._process_actions(command.actions)
+        setattr_ = object.__setattr__
+        setattr_(self, 'name', wrapper.name)
+        setattr_(self, 'aliases', tuple(wrapper.aliases))
+        setattr_(self, 'path', wrapper.path_tuple)
+        setattr_(self, 'dest', wrapper._compute_dest(command))
+        setattr_(self, 'actions_title', command.actions_title)
+        setattr_(self, 'actions_desc', command.actions_desc)
+        setattr_(self, 'actions_metavar', command.actions_metavar)
+        setattr_(self, 'actions', tuple(actions))
+        setattr_(self, 'actions_idx', actions_idx)
+        setattr_(self, 'fan_out', command.fan_out_dest)
+        setattr_(self, 'cacheable', command.cacheable)
+        setattr_(self, 'cache_ttl', command.cache_ttl)
+        setattr_(self, 'records', command.records)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledAction is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CompiledAction is immutable")
+
+
 class ActionWrapper(object):
 
     def __init__(self, command, parent):
         ''' Constructor for Command Wrapper '''
-        self.command = command
+        self.stub = command
+        self._command = command
         self.parent = parent
-        self.app = self.root.command
+        self._root = parent._root if parent is not None else self
+        self.app = self._root.command
+        self.path_tuple = parent.path_tuple if parent is not None else ()
+        if command.name:
+            self.path_tuple += (command.name,)
+        self._path = "_".join(self.path_tuple)
+
+        self._compiled = None
+        self._trie = None
+
+    @property
+    def command(self):
+        ''' Get wrapped command, importing it if it is an ActionRef '''
+        if isinstance(self._command, ActionRef):
+            self._command = self._command.resolve()
+        return self._command
+
+    @property
+    def is_lazy(self):
+        ''' Check if wrapped command is an ActionRef not yet imported '''
+        return isinstance(self._command, ActionRef) and not self._command.is_resolved
+
+    @property
+    def compiled(self):
+        ''' Get compiled view of this action, compiling it on first use '''
+        if self._compiled is None:
+            self._compiled = CompiledAction(self)
+        return self._compiled
+
+    def compile(self, recursive=True):
+        ''' Freeze this action (and, if recursive, all descendants)
 
-        self.actions = []
-        self.actions_idx = {}
-        self._process_actions(command.actions)
+        Compiling imports any ActionRef along the way, so lazy trees should
+        rely on compiled property to compile only the dispatched path
+        '''
+        compiled = self.compiled
+        if recursive:
+            for action in compiled.actions:
+                action.compile(recursive)
+        return compiled
+
+    @property
+    def actions(self):
+        ''' Get wrapped sub actions '''
+        return self.compiled.actions
+
+    @property
+    def actions_idx(self):
+        ''' Get index of wrapped sub actions by name and alias '''
+        return self.compiled.actions_idx
+
+    @property
+    def actions_trie(self):
+        ''' Get trie of sub action names and aliases, built on first use '''
+        if self._trie is None:
+            from .trie import Trie
+            self._trie = Trie((key, action.name)
+                              for key, action in self.actions_idx.items())
+        return self._trie
+
+    @property
+    def abbreviations(self):
+        ''' Check if sub actions may be selected by unique prefixes '''
+        return getattr(self.app, 'ABBREVIATIONS', False)
+
+    def resolve_action(self, name):
+        ''' Get wrapped sub action by name, alias or unique abbreviation
+
+        Abbreviations are only resolved if enabled by app ABBREVIATIONS.
+        Returns None if name is unknown or ambiguous
+        '''
+        action = self.actions_idx.get(name)
+        if action is None and self.abbreviations:
+            action = self.actions_idx.get(self.actions_trie.unique(name))
+        return action
+
+    def suggest_actions(self, name):
+        ''' Get names or aliases of sub actions closest to name '''
+        return self.actions_trie.suggest(name)
 
     def _process_actions(self, actions):
-        ''' Process actions '''
+        ''' Process actions, returning list of wrapped actions and its index '''
+        wrapped_actions = []
+        actions_idx = {}
         for action in actions:
             wrapped = ActionWrapper(action, self)
-            self.actions.append(wrapped)
-            self.actions_idx[action.name] = wrapped
-        for wrapped in self.actions:
+            if action.name in actions_idx:
+                LOG.warning("Duplicate action '%s'%s, ignoring", action.name,
+                            " in %s" % self.path if self.path else "")
+                continue
+            wrapped_actions.append(wrapped)
+            actions_idx[action.name] = wrapped
+        for wrapped in wrapped_actions:
             for alias in wrapped.aliases:
-                if not alias in self.actions_idx:
-                    self.actions_idx[alias] = wrapped
+                if alias in actions_idx:
+                    if actions_idx[alias] is not wrapped:
+                        LOG.warning("Alias '%s' of '%s' conflicts with '%s', ignoring",
+                                    alias, wrapped.name, actions_idx[alias].name)
+                    continue
+                actions_idx[alias] = wrapped
+        return wrapped_actions, actions_idx
 
     @property
     def has_actions(self):
         ''' Check if we have sub-commands '''
         return True if self.actions else False
 
+    def walk(self, resolve=True):
+        ''' Iterate over this wrapper and all its descendants, depth first
+
+        If resolve is False, do not descend into (and import) lazy actions
+        '''
+        yield self
+        if not resolve and self.is_lazy:
+            return
+        for action in self.actions:
+            for wrapper in action.walk(resolve):
+                yield wrapper
+
     @property
     def root(self):
         ''' get root command '''
-        if self.parent is None:
-            return self
-        return self.parent.root
+        return self._root
 
     @property
     def name(self):
         ''' Get name of the command '''
-        return self.command.name
+        return self.stub.name
+
+    @property
+    def aliases(self):
+        ''' Get aliases of the command '''
+        return self.stub.aliases
+
+    @property
+    def desc(self):
+        ''' Get description of the command '''
+        return self.stub.desc
 
     @property
     def path(self):
         ''' Generate Path '''
-        return self.delimited_path(delimiter="_")
+        return self._path
 
     def delimited_path(self, delimiter="_"):
         ''' Generate Path Using a delimiter '''
-        path = self.list_path()
-        return delimiter.join(path)
+        return delimiter.join(self.path_tuple)
 
     def list_path(self):
         ''' Generate Path as a list, starting with top-most sub item '''
-        path = []
-        name = self.name
-        if self.parent:
-            path = self.parent.list_path()
-        if name:
-            path.append(name)
-        return path
+        return list(self.path_tuple)
 
     @property
     def dest(self):
         ''' Get Destination key for arguments for this command '''
-        if self.command.actions_dest:
-            return self.command.actions_dest
+        return self.compiled.dest
+
+    def _compute_dest(self, command):
+        ''' Compute Destination key for arguments for this command '''
+        if command.actions_dest:
+            return command.actions_dest
         path = self.path
 
         if not path:
-            return self.command.actions_dest_base
-        return "%s_%s" % (path, self.command.actions_dest_base)
+            return command.actions_dest_base
+        return "%s_%s" % (path, command.actions_dest_base)
 
     def parser_args(self, parser):
         ''' Add arguments to parser '''
         return self.command.parser_args(parser)
 
-    def configure_parser(self, parser):
-        ''' Configure Parser '''
+    def subparser_args(self):
+        ''' Get add_parser() arguments for this action
+
+        Help of ActionRef targets without desc is lazy, so they are only
+        imported for help output
+        '''
+        if self.is_lazy and self.stub._get_property('desc') is None:
+            from .actions import ActionRefDesc
+            from .parser import LazyText
+            args = {'help': LazyText(ActionRefDesc(self.stub))}
+        else:
+            args = {'help': self.desc}
+        aliases = self.aliases
+        if aliases and self.parent is not None:
+            # Conflicting aliases are left out of the index, see _process_actions
+            index = self.parent.actions_idx
+            aliases = [alias for alias in aliases if index.get(alias) is self]
+        if aliases and not IS_PYTHON2:
+            args['aliases'] = aliases
+        return args
+
+    def is_selected(self, tokens):
+        ''' Check if name or any alias of this action is among tokens
+
+        If abbreviations are enabled, tokens that are prefixes of name or an
+        alias select it too (ambiguous ones may select several actions)
+        '''
+        if self.name in tokens:
+            return True
+        for alias in self.aliases:
+            if alias in tokens:
+                return True
+        if self.abbreviations:
+            names = [self.name] + list(self.aliases)
+            return any(name.startswith(token) for token in tokens if token
+                       for name in names)
+        return False
+
+    def configure_parser(self, parser, argv=None):
+        ''' Configure Parser
+
+        If argv is given, parser is built lazily - only actions whose name or
+        alias appears in argv get a full sub-parser, the rest get stub
+        sub-parsers with just name, aliases and help, which is all that is
+        needed for help output and error messages.
+        '''
+        tokens = frozenset(argv) if argv is not None else None
+        return self._configure_parser(parser, tokens)
+
+    def _configure_parser(self, parser, tokens):
+        ''' Configure Parser, building sub-parsers only for selected tokens '''
         parser = self.parser_args(parser)
-        if self.has_actions:
-            subparsers = parser.add_subparsers(dest=self.dest,
-                                               help=self.command.actions_desc,
-                                               title=self.command.actions_title,
-                                               metavar=self.command.actions_metavar)
-
-            for action in self.actions:
-                args = {'help': action.desc}
-                if action.aliases and not IS_PYTHON2:
-                    args['aliases'] = action.aliases
-                subparser = subparsers.add_parser(action.name, **args)
-                action.configure_parser(subparser)
+        if self._compiled is None and not self.command.actions:
+            # Leaf actions are only compiled if they are dispatched to
+            return parser
+        compiled = self.compiled
+        if compiled.actions:
+            subparsers = parser.add_subparsers(dest=compiled.dest,
+                                               help=compiled.actions_desc,
+                                               title=compiled.actions_title,
+                                               metavar=compiled.actions_metavar)
+
+            for action in compiled.actions:
+                subparser = subparsers.add_parser(action.name,
+                                                  **action.subparser_args())
+                if tokens is None or action.is_selected(tokens):
+                    action._configure_parser(subparser, tokens)
 
         return parser
 
     def execute(self, args, wrapper=None):
-        ''' Execute Command '''
-        self.command.prep_command(args, self)
-        if self.has_actions:
-            action_name = args.get(self.dest, None)
+        ''' Execute Command
+
+        Results of cacheable actions are taken from app result cache, if
+        it is enabled, unless --no-cache is given. Lazy argument values
+        (see quick_cli.arg_types) are released after top level action
+        returns.
+        '''
+        if self.parent is not None:
+            return self._execute_cached(args)
+        try:
+            return self._execute_cached(args)
+        finally:
+            from .arg_types import release_args
+            release_args(args)
+
+    def result_cache(self, args):
+        ''' Get app result cache, if results of this action are cached for args '''
+        if not self.compiled.cacheable or args.get('no_cache'):
+            return None
+        return getattr(self.app, 'result_cache', None)
+
+    def cache_inputs(self, args):
+        ''' Get names of input record files read by this action, "-" for stdin '''
+        if not self.compiled.records:
+            return ()
+        from .records import FILES_DEST
+        return args.get(FILES_DEST) or ['-']
+
+    def _execute_cached(self, args):
+        ''' Execute Command, using result cache if action is cacheable '''
+        cache = self.result_cache(args)
+        if cache is not None:
+            return cache.call(self.path_tuple, args, self.compiled.cache_ttl,
+                              lambda: self._execute_timed(args),
+                              self.cache_inputs(args))
+        return self._execute_timed(args)
+
+    def _execute_timed(self, args):
+        ''' Execute Command, timing it if app timer is enabled '''
+        timer = getattr(self.app, 'timer', None)
+        if timer is None or not timer.enabled:
+            return self._execute(args, None)
+        with timer.phase("execute[%s]" % self.delimited_path(' ')):
+            return self._execute(args, timer)
+
+    def _execute(self, args, timer):
+        ''' Execute Command, timing hooks if timer is given '''
+        if timer is None:
+            self.command.prep_command(args, self)
+        else:
+            with timer.phase("prep_command[%s]" % self.delimited_path(' ')):
+                self.command.prep_command(args, self)
+        action, hook = self.next_step(args)
+        if action is not None:
+            return action.execute(args, self)
+        if timer is None:
+            return self.output(args, hook())
+        with timer.phase("action[%s]" % self.delimited_path(' ')):
+            result = hook()
+        return self.output(args, result)
+
+    def output(self, args, result):
+        ''' Write result if it is records (see quick_cli.output)
+
+        Returns exit code, or result as is if it is not records
+        '''
+        if result is None or isinstance(result, int):
+            return result
+        from .output import is_records, write_records
+        fields = self.command.output_fields
+        if not is_records(result, fields is not None):
+            return result
+        write_output = getattr(self.app, 'write_output', None)
+        if write_output is None:
+            return write_records(result, fields=fields)
+        return write_output(args, result, fields)
+
+    def next_step(self, args):
+        ''' Get next step of execution, after prep_command
+
+        Returns tuple of wrapped sub action to dispatch to, or None and a
+        hook to call (execute, fan-out execute, execute with input records,
+        on_invalid_action or on_missing_action)
+        '''
+        compiled = self.compiled
+        if compiled.actions:
+            action_name = args.get(compiled.dest, None)
             if action_name is not None:
-                action = self.actions_idx.get(action_name)
+                action = self.resolve_action(action_name)
                 if action:
-                    return action.execute(args, self)
-                else:
-                    return self.command.on_invalid_action(args, self, action_name)
-            else:
-                return self.command.on_missing_action(args, self)
-        return self.command.execute(args, self)
+                    return action, None
+                return None, lambda: self.command.on_invalid_action(args, self, action_name)
+            return None, lambda: self.command.on_missing_action(args, self)
+        if self.is_fan_out(args):
+            return None, lambda: self._fan_out(args)
+        if compiled.records:
+            return None, lambda: self.command.execute(self._with_records(args), self)
+        return None, lambda: self.command.execute(args, self)
+
+    def is_fan_out(self, args):
+        ''' Check if execution with args fans out over a list of values '''
+        compiled = self.compiled
+        return bool(compiled.fan_out and not compiled.actions and
+                    isinstance(args.get(compiled.fan_out), list))
+
+    def _with_records(self, args):
+        ''' Add reader of input records to args, see quick_cli.records
+
+        Raises ValueError if args already have a value of that dest
+        '''
+        from .records import FILES_DEST, RECORDS_DEST, RecordReader
+        if RECORDS_DEST in args:
+            raise ValueError("Argument dest '%s' of %s is reserved for input records" % (
+                RECORDS_DEST, self.delimited_path(' ')))
+        command = self.command
+        args[RECORDS_DEST] = RecordReader(args.get(FILES_DEST), self.compiled.records,
+                                          command.records_batch,
+                                          command.records_encoding)
+        return args
+
+    def _fan_out(self, args):
+        ''' Execute command once per value of its fan-out argument '''
+        from .fanout import FanOut
+        return FanOut(self, args).execute()
+
+    def dispatch_path(self, args):
+        ''' Get list of wrapped actions args dispatch to, starting with self '''
+        path = [self]
+        action = self.next_step(args)[0]
+        while action is not None:
+            path.append(action)
+            action = action.next_step(args)[0]
+        return path
 
     def __getattr__(self, name):
         ''' Get attribute '''
@@ -0,0 +1,122 @@
+''' Unit Tests For Action Wrapper '''
+
+from argparse import ArgumentParser, PARSER
+import logging
+import unittest
+
+from .action_wrapper import ActionWrapper, IS_PYTHON2
+from .actions import Action, ActionRef
+
+
+def make_tree():
+    ''' Build a small action tree '''
+    return Action(None, actions=[
+        Action("one", aliases=['o'], args=[dict(flags='-c', dest='config')],
+               actions=[Action('uno', args=[dict(flags='--x', dest='x')]),
+                        Action('dos')]),
+        Action("two", args=[dict(flags='-t', dest='two_flag')]),
+    ])
+
+
+def subparsers_of(parser):
+    ''' Get name to parser map of the sub-parsers action of a parser '''
+    for action in parser._actions:  # pylint: disable=protected-access
+        if action.nargs == PARSER:
+            return action.choices
+    return {}
+
+
+class TestActionWrapper(unittest.TestCase):
+    ''' Action Wrapper tests '''
+
+    def test_full_parser(self):
+        ''' Test full parser is built when no argv is given '''
+        wrapper = ActionWrapper(make_tree(), None)
+        parser = wrapper.configure_parser(ArgumentParser())
+        args = vars(parser.parse_args(['two', '-t', 'val']))
+        self.assertEqual(args['action'], 'two')
+        self.assertEqual(args['two_flag'], 'val')
+        self.assertIn('uno', subparsers_of(subparsers_of(parser)['one']))
+
+    def test_lazy_parser_stubs_siblings(self):
+        ''' Test only selected branch is fully built in lazy mode '''
+        wrapper = ActionWrapper(make_tree(), None)
+        argv = ['one', '-c', 'cfg', 'uno', '--x', '1']
+        parser = wrapper.configure_parser(ArgumentParser(), argv)
+        subparsers = subparsers_of(parser)
+        self.assertNotIn(
+            'two_flag', [act.dest for act in subparsers['two']._actions])
+        args = vars(parser.parse_args(argv))
+        self.assertEqual(args['action'], 'one')
+        self.assertEqual(args['one_action'], 'uno')
+        self.assertEqual(args['x'], '1')
+
+    @unittest.skipIf(IS_PYTHON2, "Aliases are not supported on Python 2")
+    def test_lazy_parser_alias(self):
+        ''' Test branch selected by alias is fully built in lazy mode '''
+        wrapper = ActionWrapper(make_tree(), None)
+        argv = ['o', '-c', 'cfg', 'uno', '--x', '1']
+        parser = wrapper.configure_parser(ArgumentParser(), argv)
+        args = vars(parser.parse_args(argv))
+        self.assertEqual(args['action'], 'o')
+        self.assertEqual(args['x'], '1')
+
+    def test_lazy_parser_matches_full(self):
+        ''' Test lazy parser produces same args as full parser '''
+        argv = ['one', 'dos']
+        full = ActionWrapper(make_tree(), None).configure_parser(
+            ArgumentParser())
+        lazy = ActionWrapper(make_tree(), None).configure_parser(
+            ArgumentParser(), argv)
+        self.assertEqual(vars(full.parse_args(argv)),
+                         vars(lazy.parse_args(argv)))
+
+    def test_lazy_actions_not_resolved(self):
+        ''' Test action references are only resolved when dispatched '''
+        tree = Action(None, actions=[
+            ActionRef("one", "quick_cli.actions:Action", desc="One"),
+            ActionRef("two", "quick_cli.actions:Action", desc="Two",
+                      action=lambda args, wrapper: 7)])
+        wrapper = ActionWrapper(tree, None)
+        argv = ['two']
+        parser = wrapper.configure_parser(ArgumentParser(), argv)
+        one, two = wrapper.actions
+        self.assertTrue(one.is_lazy)
+        self.assertFalse(two.is_lazy)
+        self.assertEqual(wrapper.execute(vars(parser.parse_args(argv))), 7)
+        self.assertTrue(one.is_lazy)
+
+    def test_lazy_help(self):
+        ''' Test stub descriptions are only resolved for help output '''
+        tree = Action(None, actions=[
+            ActionRef("one", "quick_cli.actions:Action"),
+            Action("two")])
+        wrapper = ActionWrapper(tree, None)
+        parser = wrapper.configure_parser(ArgumentParser(), ['two'])
+        parser.parse_args(['two'])
+        one = wrapper.actions[0]
+        self.assertTrue(one.is_lazy)
+        self.assertIn("Generic Action", parser.format_help())
+        self.assertFalse(one.is_lazy)
+
+    def test_compiled(self):
+        ''' Test compiled action view '''
+        wrapper = ActionWrapper(make_tree(), None)
+        compiled = wrapper.compile()
+        self.assertEqual(compiled.dest, 'action')
+        one = compiled.actions_idx['o']
+        self.assertIs(one, compiled.actions_idx['one'])
+        self.assertEqual(one.compiled.path, ('one',))
+        uno = one.actions_idx['uno']
+        self.assertEqual(uno.compiled.path, ('one', 'uno'))
+        self.assertEqual(uno.path, 'one_uno')
+        self.assertEqual(uno.delimited_path(':'), 'one:uno')
+        self.assertEqual(one.dest, 'one_action')
+        self.assertIs(uno.root, wrapper)
+        with self.assertRaises(AttributeError):
+            compiled.dest = 'other'
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
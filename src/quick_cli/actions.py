@@ -3,6 +3,15 @@ import logging
 
 LOG = logging.getLogger(__name__)
 
+CO_COROUTINE = 0x80
+
+
+def is_coroutine_function(func):
+    ''' Check if func is a coroutine function (without importing inspect) '''
+    func = getattr(func, '__func__', func)
+    code = getattr(func, '__code__', None)
+    return bool(code is not None and code.co_flags & CO_COROUTINE)
+
 
 class ActionBase(object):
     ''' QuickCLI SubCommand Action
@@ -19,6 +28,18 @@ class ActionBase(object):
 
     DESC = None
 
+    FAN_OUT_POOL = "thread"
+    FAN_OUT_JOBS = 1
+
+    OUTPUT_FIELDS = None
+
+    CACHEABLE = False
+    CACHE_TTL = 300
+
+    RECORDS = None
+    RECORDS_BATCH = None
+    RECORDS_ENCODING = 'utf-8'
+
     def __init__(self, name, aliases=None, **kwargs):
         ''' Constructor '''
         self.aliases = aliases if aliases else []
@@ -76,6 +97,59 @@ class ActionBase(object):
             return doc.strip().split('\n', 1)[0]
         return "No description"
 
+    @property
+    def fan_out_dest(self):
+        ''' Get dest of the fan-out argument, if any '''
+        return None
+
+    @property
+    def fan_out_pool(self):
+        ''' Get kind of pool fan-out items run in: "thread" or "process" '''
+        return self._get_property('fan_out_pool', default_value="thread")
+
+    @property
+    def fan_out_jobs(self):
+        ''' Get default number of parallel fan-out jobs '''
+        return self._get_property('fan_out_jobs', default_value=1)
+
+    @property
+    def output_fields(self):
+        ''' Get columns (and their order) of records returned by execute '''
+        return self._get_property('output_fields', default_value=None)
+
+    @property
+    def records(self):
+        ''' Get format of input records this action consumes (see quick_cli.records) '''
+        return self._get_property('records', default_value=None)
+
+    @property
+    def records_batch(self):
+        ''' Get number of input records per batch, None for single records '''
+        return self._get_property('records_batch', default_value=None)
+
+    @property
+    def records_encoding(self):
+        ''' Get encoding of input record files '''
+        return self._get_property('records_encoding', default_value='utf-8')
+
+    @property
+    def cacheable(self):
+        ''' Check if results of this action may be cached (see quick_cli.result_cache) '''
+        return self._get_property('cacheable', default_value=False)
+
+    @property
+    def cache_ttl(self):
+        ''' Get number of seconds cached results are valid for, None for no limit '''
+        return self._get_property('cache_ttl', default_value=300)
+
+    @property
+    def is_async(self):
+        ''' Check if any execution hook of this action is a coroutine function '''
+        return any(is_coroutine_function(hook) for hook in (
+            self.prep_command, self.execute,
+            self._get_property("prep_command", "", default_value=None),
+            self._get_property("action", "", default_value=None)))
+
     def parser_args(self, parser):
         ''' Add Arguments to Parser '''
         return parser
@@ -86,8 +160,11 @@ class ActionBase(object):
     def on_invalid_action(self, args, wrapper, action_name):
         ''' Hook executed if action is invalid '''
         path = wrapper.path
-        LOG.critical("Invalid %s '%s'%s", self.actions_title,
-                     action_name, " for %s" % path if path else "")
+        suggestions = wrapper.suggest_actions(action_name)
+        LOG.critical("Invalid %s '%s'%s%s", self.actions_title,
+                     action_name, " for %s" % path if path else "",
+                     " - did you mean %s?" % " or ".join(
+                         "'%s'" % name for name in suggestions) if suggestions else "")
         return 1
 
     def on_missing_action(self, args, wrapper):
@@ -117,13 +194,23 @@ class ActionBase(object):
         LOG.debug("Action for %s - action: %s", self.name, action != None)
         return -1
 
+    def on_fan_out_result(self, args, wrapper, item, code):
+        ''' Hook executed with exit code of each fan-out item '''
+        if code:
+            LOG.debug("Fan-out item %r of %s exited with %s", item,
+                      wrapper.delimited_path(' '), code)
+
 
 class Action(ActionBase):
     ''' Generic Action '''
 
     def __init__(self, name, aliases=None, **kwargs):
+        self._fan_out = None
         self._args = self._register_args(kwargs.pop('args', []))
         ActionBase.__init__(self, name, aliases=aliases, **kwargs)
+        if self._fan_out and self.records:
+            raise ValueError("Action '%s' can not have both input records and a "
+                             "fan-out argument" % name)
 
     def _register_args(self, args):
         ''' Process arguments '''
@@ -134,6 +221,11 @@ class Action(ActionBase):
                 flags = arg.pop('flags', [])
                 if isinstance(flags, str):
                     flags = [flags]
+                if arg.pop('fan_out', False):
+                    from .fanout import arg_dest
+                    self._fan_out = arg_dest(flags, arg)
+                    if 'action' not in arg:
+                        arg.setdefault('nargs', '+')
                 registered_args.append((flags, arg))
             elif isinstance(item, list):
                 registered_args.extend(self._register_args(item))
@@ -146,4 +238,107 @@ class Action(ActionBase):
         parser = ActionBase.parser_args(self, parser)
         for flags, args in self._args:
             parser.add_argument(*flags, **args)
+        if self._fan_out:
+            from .fanout import JOBS_DEST
+            parser.add_argument('-j', '--jobs', dest=JOBS_DEST, type=int,
+                                default=self.fan_out_jobs, metavar='N',
+                                help="Number of parallel jobs (default: %(default)s)")
+        if self.records:
+            from .records import FILES_DEST
+            parser.add_argument(FILES_DEST, metavar='FILE', nargs='*',
+                                help="Input files, '-' for stdin (default: stdin)")
         return parser
+
+    @property
+    def fan_out_dest(self):
+        ''' Get dest of the fan-out argument, if any '''
+        return self._fan_out
+
+
+class ActionRef(ActionBase):
+    ''' Lazy Reference to an Action
+
+    Lightweight stand-in for an action that is only imported when it is
+    dispatched or its arguments are needed. Target is an import path in
+    "module:attr" form, where attr is either an ActionBase instance, or an
+    ActionBase subclass that gets instantiated with name, aliases and any
+    extra keyword arguments of this reference.
+
+    Provide desc to keep help output from importing the target.
+
+    Targets are only left unimported if the parser is built for the
+    dispatched path only, which QuickCLIApp does by default for trees
+    containing references (see LAZY_PARSER), or with FAST_DISPATCH. Full
+    parser builds (LAZY_PARSER = False, PARSER_CACHE, batch and shell
+    modes) import every target.
+    '''
+
+    def __init__(self, name, target, aliases=None, **kwargs):
+        ''' Constructor '''
+        ActionBase.__init__(self, name, aliases=aliases, **kwargs)
+        self.target = target
+        self._resolved = None
+
+    @property
+    def target_module(self):
+        ''' Get name of module containing target '''
+        return self.target.split(':', 1)[0]
+
+    @property
+    def is_resolved(self):
+        ''' Check if target was already imported '''
+        return self._resolved is not None
+
+    @property
+    def desc(self):
+        ''' Get Description without importing target, if possible '''
+        desc = self._get_property('desc', default_value=None)
+        if desc is not None:
+            return desc
+        return self.resolve().desc
+
+    def resolve(self):
+        ''' Import target and return the action it refers to '''
+        if self._resolved is None:
+            import importlib
+            module_name, _, attr = self.target.partition(':')
+            LOG.debug("Resolving action %s from %s", self.name, self.target)
+            target = importlib.import_module(module_name)
+            for part in attr.split('.') if attr else []:
+                target = getattr(target, part)
+            if isinstance(target, type):
+                target = target(self.name, aliases=self.aliases,
+                                **self._properties)
+            if not isinstance(target, ActionBase):
+                raise TypeError("Action reference '%s' is not an action: %r" %
+                                (self.target, target))
+            self._resolved = target
+        return self._resolved
+
+
+
+
+def contains_refs(action):
+    ''' Check if declared action tree contains ActionRefs, without importing them '''
+    for sub_action in action.actions:
+        if isinstance(sub_action, ActionRef) or contains_refs(sub_action):
+            return True
+    return False
+
+class ActionRefDesc(object):
+    ''' Callable getting description of an ActionRef, importing its target
+
+    Used for lazy help of references without desc. Pickles as a fresh
+    reference to the same target, so cached parsers only import the target
+    if help is shown.
+    '''
+
+    def __init__(self, ref):
+        ''' Constructor '''
+        self.ref = ref
+
+    def __call__(self):
+        return self.ref.desc
+
+    def __reduce__(self):
+        return (ActionRefDesc, (ActionRef(self.ref.name, self.ref.target),))
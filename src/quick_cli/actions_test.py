@@ -1,15 +1,20 @@
 ''' Unit Tests For Actions '''
 
 import logging
+import sys
 import unittest
 
-from .actions import ActionBase
+from .actions import Action, ActionBase, ActionRef, contains_refs
+from .app import QuickCLIApp
 
 
 def dummy_action():
     ''' Test '''
 
 
+REFERENCED = Action("referenced", desc="Referenced Action")
+
+
 class TestQuickCLIActions(unittest.TestCase):
     '''App Info tests'''
 
@@ -73,6 +78,56 @@ class TestQuickCLIActions(unittest.TestCase):
                             'alias1', 'alias2'], desc="my desc", action=dummy_action)
         self.assertEqual(action.desc, "my desc")
 
+    def test_action_ref_class(self):
+        ''' Test resolving action reference to a class '''
+        ref = ActionRef("name", "quick_cli.actions:Action",
+                        aliases=['alias1'], desc="my desc")
+        self.assertFalse(ref.is_resolved)
+        self.assertEqual(ref.desc, "my desc")
+        self.assertFalse(ref.is_resolved)
+        action = ref.resolve()
+        self.assertIsInstance(action, Action)
+        self.assertEqual(action.name, "name")
+        self.assertEqual(action.aliases, ['alias1'])
+        self.assertEqual(action.desc, "my desc")
+
+    def test_action_ref_instance(self):
+        ''' Test resolving action reference to an instance '''
+        ref = ActionRef("name", "%s:REFERENCED" % __name__)
+        self.assertEqual(ref.desc, "Referenced Action")
+        self.assertIs(ref.resolve(), REFERENCED)
+
+    def test_action_ref_invalid(self):
+        ''' Test resolving action reference to a non-action '''
+        ref = ActionRef("name", "%s:dummy_action" % __name__)
+        with self.assertRaises(TypeError):
+            ref.resolve()
+
+
+class RefApp(QuickCLIApp):
+    ''' Test App with a reference to a module that is never imported '''
+    ACTIONS = [Action("light", action=lambda args, wrapper: 0),
+               Action("group", actions=[
+                   ActionRef("heavy", "quick_cli.no_such_module:Action", desc="Heavy")])]
+
+
+class TestActionRefApp(unittest.TestCase):
+    ''' Action reference app tests '''
+
+    def test_default_mode(self):
+        ''' Test references are not imported by default unless dispatched '''
+        self.assertTrue(contains_refs(RefApp()))
+        self.assertFalse(contains_refs(Action("plain", actions=[Action("sub")])))
+        app = RefApp()
+        self.assertEqual(app.invoke(['light']), 0)
+        self.assertNotIn('quick_cli.no_such_module', sys.modules)
+
+    def test_full_parser(self):
+        ''' Test full parser build imports references '''
+        app = RefApp()
+        app.LAZY_PARSER = False
+        self.assertNotEqual(app.invoke(['light']), 0)
+
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG)
@@ -0,0 +1,170 @@
+''' Asyncio Support
+
+Async counterparts of QuickCLIApp and ActionWrapper execution, used when
+an app or any action on the dispatched path has coroutine function hooks.
+Synchronous hooks are called as usual, awaitable results are awaited.
+'''
+import asyncio
+import logging
+
+LOG = logging.getLogger(__name__)
+
+
+async def resolve(value):
+    ''' Await value if it is awaitable, otherwise return it as is '''
+    if hasattr(value, '__await__'):
+        return await value
+    return value
+
+
+async def execute_cached(cache, wrapper, args, timer):
+    ''' Execute wrapped action, using result cache (see quick_cli.result_cache) '''
+    path = wrapper.path_tuple
+    key = cache.key(path, args, wrapper.cache_inputs(args))
+    if key is None:
+        LOG.debug("Not caching result of '%s': reads stdin or writes files",
+                  ' '.join(path))
+        return await execute_timed(wrapper, args, timer)
+    entry = cache.load(key, wrapper.compiled.cache_ttl)
+    if entry is not None:
+        return cache.replay(path, entry)
+
+    saved = cache.capture()
+    try:
+        code = await execute_timed(wrapper, args, timer)
+    finally:
+        captured = cache.restore(saved)
+    cache.store(key, path, code, captured)
+    return code
+
+
+async def execute_wrapper(wrapper, args, timer):
+    ''' Execute wrapped action, awaiting its hooks '''
+    cache = wrapper.result_cache(args)
+    if cache is not None:
+        return await execute_cached(cache, wrapper, args, timer)
+    return await execute_timed(wrapper, args, timer)
+
+
+async def execute_timed(wrapper, args, timer):
+    ''' Execute wrapped action, timing its hooks '''
+    path = wrapper.delimited_path(' ')
+    with timer.phase("execute[%s]" % path):
+        with timer.phase("prep_command[%s]" % path):
+            await resolve(wrapper.command.prep_command(args, wrapper))
+        action, hook = wrapper.next_step(args)
+        if action is not None:
+            return await execute_wrapper(action, args, timer)
+        with timer.phase("action[%s]" % path):
+            if wrapper.is_fan_out(args):
+                return await fan_out(wrapper, args)
+            result = await resolve(hook())
+        return wrapper.output(args, result)
+
+
+async def execute_item(fan_out_execution, item):
+    ''' Execute wrapped action for a single fan-out item, returning exit code '''
+    from .app import exit_code
+    wrapper = fan_out_execution.wrapper
+    item_args = fan_out_execution.item_args(item)
+    try:
+        result = await resolve(wrapper.command.execute(item_args, wrapper))
+        return exit_code(wrapper.output(item_args, result))
+    except Exception:  # pylint: disable=broad-except
+        LOG.exception("Failed to execute %s for %r", wrapper.delimited_path(' '), item)
+        return 1
+
+
+async def fan_out(wrapper, args):
+    ''' Execute wrapped action once per fan-out item, as concurrent tasks
+
+    At most jobs items run at a time, and output of each item is captured
+    and written out as a whole once it completes (see quick_cli.fanout).
+    Capturing output per task needs contextvars (Python 3.7+), so items
+    run one at a time without it.
+    '''
+    import sys
+    from .context import ContextVar
+    from .fanout import FanOut, _CapturingStream, aggregate_exit_code
+    execution = FanOut(wrapper, args)
+    jobs = min(execution.jobs, len(execution.items))
+    if ContextVar is None and jobs > 1:
+        LOG.debug("No contextvars to capture output per task, running items in turn")
+        jobs = 1
+    LOG.debug("Fan-out of %s over %d items, %d tasks", wrapper.delimited_path(' '),
+              len(execution.items), jobs)
+    if jobs <= 1:
+        for index, item in enumerate(execution.items):
+            execution.report(index, await execute_item(execution, item))
+        return aggregate_exit_code(execution.codes)
+
+    semaphore = asyncio.Semaphore(jobs)
+    stdout = _CapturingStream(sys.stdout)
+    stderr = _CapturingStream(sys.stderr)
+
+    async def run(index, item):
+        ''' Run an item, with its output captured '''
+        async with semaphore:
+            stdout.capture()
+            stderr.capture()
+            try:
+                code = await execute_item(execution, item)
+            finally:
+                output, errors = stdout.release(), stderr.release()
+            stdout.stream.write(output)
+            stderr.stream.write(errors)
+            execution.report(index, code)
+
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        await asyncio.gather(*[run(index, item)
+                               for index, item in enumerate(execution.items)])
+    finally:
+        sys.stdout, sys.stderr = stdout.stream, stderr.stream
+    return aggregate_exit_code(execution.codes)
+
+
+async def execute_app(app, args, timer):
+    ''' Execute app after parsing, awaiting its hooks '''
+    with timer.phase("post_parsing"):
+        await resolve(app.post_parsing(args))
+
+    with timer.phase("process_args"):
+        app._process_args(args)  # pylint: disable=protected-access
+
+    with timer.phase("pre_execute"):
+        await resolve(app.pre_execute())
+    with timer.phase("execute"):
+        try:
+            return await execute_wrapper(app.command, app.args, timer)
+        finally:
+            from .arg_types import release_args
+            release_args(app.args)
+
+
+def run_async(app, args, timer):
+    ''' Run app execution in a new event loop
+
+    KeyboardInterrupt cancels the execution task, and is then handled by
+    app's on_keyboard_interrupt hook (which may also be a coroutine)
+    '''
+    loop = asyncio.new_event_loop()
+    try:
+        task = loop.create_task(execute_app(app, args, timer))
+        try:
+            return loop.run_until_complete(task)
+        except KeyboardInterrupt:
+            if not task.done():
+                LOG.debug("Cancelling execution on Keyboard Interrupt")
+                task.cancel()
+                try:
+                    loop.run_until_complete(task)
+                except (asyncio.CancelledError, KeyboardInterrupt):
+                    pass
+            return loop.run_until_complete(
+                resolve(app._on_keyboard_interrupt()))  # pylint: disable=protected-access
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
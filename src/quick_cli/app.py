@@ -1,22 +1,46 @@
 ''' QuickCLI Top Level Application '''
-from argparse import ArgumentParser, RawDescriptionHelpFormatter
 import logging
+import os
 import sys
-import traceback
 
 from quick_cli.action_wrapper import ActionWrapper
 
-from .actions import Action
+from .actions import Action, is_coroutine_function
 from .app_info import QuickCLIAppBaseInfo
-from .context import QuickCLIContext
+from .context import ContextSlot, QuickCLIContext
+from .timing import PhaseTimer, TIMING_ENV, extract_timing_flag
 
 
 LOG = logging.getLogger(__name__)
 
 
+def exit_code(result):
+    ''' Normalize an invocation result or SystemExit code to an int '''
+    if result is None:
+        return 0
+    if isinstance(result, int):
+        return result
+    sys.stderr.write("%s\n" % result)
+    return 1
+
+
 class QuickCLIApp(QuickCLIAppBaseInfo, Action):
     ''' QuickCLI Application Base '''
     DEBUG = False
+    LAZY_PARSER = None
+    PARSER_CACHE = None
+    FAST_DISPATCH = False
+    COMPLETION_FLAG = '--quickcli-completion'
+    ASYNC = None
+    CONFIG_FILES = None
+    CONFIG_CACHE = True
+    HELP_CACHE = None
+    ABBREVIATIONS = False
+    OUTPUT_FORMAT = 'table'
+    OUTPUT_FORMAT_FLAG = None
+    OUTPUT_BUFFER_SIZE = 65536
+    RESULT_CACHE = None
+    RESULT_CACHE_SIZE = 32 * 1024 * 1024
 
     def __init__(self, **kwargs):
         ''' Constructor for QuickCLIApp Base '''
@@ -24,21 +48,218 @@ class QuickCLIApp(QuickCLIAppBaseInfo, Action):
         if 'context' in kwargs:
             del kwargs['context']
         context.update(kwargs)
-        self.context = context
+        self.base_context = context
+        self._context = ContextSlot('quick_cli.context', context)
+        self.timer = PhaseTimer(os.environ.get(TIMING_ENV))
         QuickCLIAppBaseInfo.__init__(self, **kwargs)
         Action.__init__(self, None)
         self.command = ActionWrapper(self, None)
+        self._parser_cache = None
+        self._config_cache = None
+        self._help_cache = None
+        self._result_cache = None
+        self._lazy_parser = None
 
     def parser(self):
-        ''' Create App Args Parser '''
-        parser = ArgumentParser(description=self.info.program_desc,
-                                prog=self.info.program_name,
-                                epilog=self.info.program_epilog,
-                                formatter_class=RawDescriptionHelpFormatter)
-        parser.add_argument('-V', '--version',
-                            action='version', version=self.info.program_version_message)
+        ''' Create App Args Parser
+
+        Description, epilog and version message are only resolved if help
+        or version is requested, and rendered help is cached if HELP_CACHE
+        is enabled
+        '''
+        from argparse import SUPPRESS, RawDescriptionHelpFormatter
+        from .parser import LazyVersionAction, QuickCLIArgumentParser
+        info = self.info
+        parser = QuickCLIArgumentParser(
+            description=lambda: info.program_desc,
+            prog=info.program_name,
+            epilog=lambda: info.program_epilog,
+            formatter_class=RawDescriptionHelpFormatter,
+            help_cache=self.help_cache,
+            abbreviations=self.ABBREVIATIONS)
+        parser.add_argument('-V', '--version', action=LazyVersionAction,
+                            version=lambda: info.program_version_message)
+        if self.OUTPUT_FORMAT_FLAG:
+            from .output import FORMATTERS
+            parser.add_argument(self.OUTPUT_FORMAT_FLAG, dest='output_format',
+                                choices=sorted(FORMATTERS), default=SUPPRESS,
+                                help="Format of action results [default: %s]" %
+                                self.OUTPUT_FORMAT)
+        if self.RESULT_CACHE:
+            parser.add_argument('--no-cache', dest='no_cache', action='store_true',
+                                default=SUPPRESS,
+                                help="Do not use cached action results")
+            parser.add_argument('--clear-cache', dest='clear_cache',
+                                action='store_true', default=SUPPRESS,
+                                help="Clear cached action results")
+        return parser
+
+    def write_output(self, args, result, fields=None):
+        ''' Write records returned by an action, returning exit code
+
+        Records are formatted by OUTPUT_FORMAT, or by output format
+        selected with OUTPUT_FORMAT_FLAG (i.e. '--output-format'), which is
+        only added to the parser if set, see quick_cli.output
+        '''
+        from .output import write_records
+        output_format = args.get('output_format') if self.OUTPUT_FORMAT_FLAG else None
+        return write_records(result, output_format or self.OUTPUT_FORMAT,
+                             sys.stdout, self.OUTPUT_BUFFER_SIZE, fields)
+
+    @property
+    def parser_cache(self):
+        ''' Get parser cache, if enabled by PARSER_CACHE
+
+        PARSER_CACHE may be True to use default cache directory, or a path
+        to a cache directory.
+        '''
+        if not self.PARSER_CACHE:
+            return None
+        if self._parser_cache is None:
+            from .parser_cache import ParserCache
+            cache_dir = self.PARSER_CACHE if self.PARSER_CACHE is not True else None
+            self._parser_cache = ParserCache(self, cache_dir)
+        return self._parser_cache
+
+    @property
+    def help_cache(self):
+        ''' Get cache of rendered help, if enabled by HELP_CACHE
+
+        HELP_CACHE may be True to use default cache directory, or a path
+        to a cache directory.
+        '''
+        if not self.HELP_CACHE:
+            return None
+        if self._help_cache is None:
+            from .parser_cache import HelpCache
+            cache_dir = self.HELP_CACHE if self.HELP_CACHE is not True else None
+            self._help_cache = HelpCache(self, cache_dir)
+        return self._help_cache
+
+    @property
+    def result_cache(self):
+        ''' Get cache of results of cacheable actions, if enabled by RESULT_CACHE
+
+        RESULT_CACHE may be True to use default cache directory, or a path
+        to a cache directory. Its size is bounded by RESULT_CACHE_SIZE bytes.
+        '''
+        if not self.RESULT_CACHE:
+            return None
+        if self._result_cache is None:
+            from .result_cache import ResultCache
+            cache_dir = self.RESULT_CACHE if self.RESULT_CACHE is not True else None
+            self._result_cache = ResultCache(self, cache_dir, self.RESULT_CACHE_SIZE)
+        return self._result_cache
+
+    @property
+    def config_cache(self):
+        ''' Get cache of parsed config files, if enabled by CONFIG_CACHE
+
+        CONFIG_CACHE may be True to use default cache directory, or a path
+        to a cache directory.
+        '''
+        if not self.CONFIG_CACHE:
+            return None
+        if self._config_cache is None:
+            from .config import ConfigCache
+            cache_dir = self.CONFIG_CACHE if self.CONFIG_CACHE is not True else None
+            self._config_cache = ConfigCache(cache_dir)
+        return self._config_cache
+
+    def config_files(self):
+        ''' Get list of config files, later files taking precedence
+
+        By default CONFIG_FILES, with ~ and environment variables expanded
+        '''
+        return [os.path.expanduser(os.path.expandvars(filename))
+                for filename in self.CONFIG_FILES or []]
+
+    def apply_config(self, parser, argv):
+        ''' Set defaults from config files on parser, before parsing argv
+
+        See quick_cli.config for config file structure. Loaded config is
+        set as 'config' in context
+        '''
+        filenames = self.config_files()
+        if not filenames:
+            return
+        from .config import apply_defaults, load_config
+        config = load_config(filenames, self.config_cache)
+        self.context.set('config', config)
+        applied = apply_defaults(parser, self.command, config, argv)
+        LOG.debug("Applied config defaults: %s", applied)
+
+    @property
+    def lazy_parser(self):
+        ''' Check if parser is built for argv only (see ActionWrapper.configure_parser)
+
+        LAZY_PARSER may be True or False, or None to build lazily if the
+        action tree contains ActionRefs, so they are not imported unless
+        dispatched to
+        '''
+        if self.LAZY_PARSER is not None:
+            return self.LAZY_PARSER
+        if self._lazy_parser is None:
+            from .actions import contains_refs
+            self._lazy_parser = contains_refs(self)
+        return self._lazy_parser
+
+    def build_parser(self, argv=None):
+        ''' Build fully configured parser for argv '''
+        if self.FAST_DISPATCH and argv is not None:
+            from .dispatcher import build_path_parser
+            with self.timer.phase("fast_dispatch"):
+                parser = build_path_parser(self, argv)
+            if parser is not None:
+                return parser
+
+        cache = self.parser_cache
+        if cache is not None:
+            with self.timer.phase("parser_cache_load"):
+                parser = cache.load()
+            if parser is not None:
+                return parser
+
+        with self.timer.phase("parser"):
+            parser = self.parser()
+        with self.timer.phase("configure_parser"):
+            if cache is not None:
+                parser = self.command.configure_parser(parser)
+            else:
+                parser = self.command.configure_parser(
+                    parser, argv if self.lazy_parser else None)
+        if cache is not None:
+            with self.timer.phase("parser_cache_save"):
+                cache.save(parser)
         return parser
 
+    @property
+    def context(self):
+        ''' Get current context
+
+        Current context is kept per thread (and asyncio task), so
+        concurrent invocations each see their own context
+        '''
+        return self._context.get()
+
+    @context.setter
+    def context(self, context):
+        ''' Set current context '''
+        self._context.set(context)
+
+    def bind_context(self, func):
+        ''' Bind func to current context, i.e. to run it in another thread '''
+        return self._context.bind(func)
+
+    def new_context(self):
+        ''' Create a fresh context for a single invocation
+
+        New context is a child layered on top of the context the app was
+        constructed with, so state set by one invocation does not leak into
+        another, without copying app data
+        '''
+        return self.base_context.child()
+
     @property
     def args(self):
         ''' Get args from context '''
@@ -62,6 +283,7 @@ class QuickCLIApp(QuickCLIAppBaseInfo, Action):
         ''' Executed On Uncaught Exception - User overridable '''
         indent = len(self.info.program_name) * " "
         if self.DEBUG:
+            import traceback
             traceback.print_exc()
 
         sys.stderr.write(self.info.program_name +
@@ -87,10 +309,41 @@ class QuickCLIApp(QuickCLIAppBaseInfo, Action):
     def pre_execute(self):
         ''' Hook for execution after before main execution'''
 
+    def on_timings(self, timer):
+        ''' Hook executed at the end of run with phase timings, if enabled
+
+        Timing is enabled by QUICKCLI_TIMING environment variable or hidden
+        --quickcli-timing[=json|trace] flag, or programmatically via
+        self.timer.enable(). By default timings are written to stderr, with
+        'trace' format they are written to a Chrome trace-event JSON file.
+        '''
+        timer.report(process_name=self.info.program_name)
+
+    def use_async(self, args):
+        ''' Check if invocation with args needs to run in an event loop
+
+        Set ASYNC to True or False to force, by default it is True if any
+        app hook, or any hook of actions on dispatched path, is a coroutine
+        function
+        '''
+        if self.ASYNC is not None:
+            return self.ASYNC
+        for hook in (self.post_parsing, self.pre_execute,
+                     self.on_keyboard_interrupt):
+            if is_coroutine_function(hook):
+                return True
+        for wrapper in self.command.dispatch_path(args):
+            if wrapper.command.is_async:
+                return True
+        return False
+
     def _process_args(self, args):
         ''' Process Arguments '''
         self.context.set('args_ns', args)  # Do we need this?
         self.context.set('args', vars(args))
+        if self.args.get('clear_cache') and self.result_cache is not None:
+            LOG.debug("Clearing result cache")
+            self.result_cache.clear()
         self.process_args()
 
     def run(self, argv=None):
@@ -99,37 +352,147 @@ class QuickCLIApp(QuickCLIAppBaseInfo, Action):
             argv = sys.argv
         else:
             sys.argv.extend(argv)
+        return self.invoke(sys.argv[1:])
+
+    def invoke(self, argv, parser=None, context=None):
+        ''' Run a single invocation of this CLI with a list of arguments
+
+        If parser is given, it is used instead of building a new one. If
+        context is given, it replaces app context for this invocation.
+        Timings are recorded afresh for every invocation, and the timing
+        flag only enables them for the invocation it is given to.
+        '''
+        if context is not None:
+            self.context = context
+        argv, timing_format = extract_timing_flag(argv)
+        if argv and argv[0] == self.COMPLETION_FLAG:
+            from .completion import completion_command
+            return completion_command(self, argv)
+        timer = self.timer
+        saved_format = timer.format
+        if timing_format:
+            timer.enable(timing_format)
+        timer.reset()
 
         try:
-            self.pre_parser_config()
-
-            parser = self.parser()
-
-            parser = self.command.configure_parser(parser)
-            self.pre_parsing()
-            args = parser.parse_args()
-            self.post_parsing(args)
-
-            self._process_args(args)
-
-            self.pre_execute()
-            return self.command.execute(self.args)
+            with timer.phase("pre_parser_config"):
+                self.pre_parser_config()
+
+            with timer.phase("build_parser"):
+                if parser is None:
+                    parser = self.build_parser(argv)
+            with timer.phase("pre_parsing"):
+                self.pre_parsing()
+            with timer.phase("config"):
+                self.apply_config(parser, argv)
+            with timer.phase("parse_args"):
+                args = parser.parse_args(argv)
+            if self.use_async(vars(args)):
+                from .aio import run_async
+                return run_async(self, args, timer)
+
+            with timer.phase("post_parsing"):
+                self.post_parsing(args)
+
+            with timer.phase("process_args"):
+                self._process_args(args)
+
+            with timer.phase("pre_execute"):
+                self.pre_execute()
+            with timer.phase("execute"):
+                return self.command.execute(self.args)
 
         except KeyboardInterrupt:
             ### handle keyboard interrupt ###
             return self._on_keyboard_interrupt()
         except Exception as ex:  # pylint: disable=broad-except
             return self._on_error(ex)
+        finally:
+            if timer.enabled:
+                self.on_timings(timer)
+            timer.enable(saved_format)
+
+    def invoke_isolated(self, argv, parser=None):
+        ''' Run an invocation in a fresh context, returning its exit code
+
+        Unlike invoke(), argparse errors and --help (SystemExit) are
+        returned as exit codes, and app context is restored afterwards
+        '''
+        context = self.context
+        try:
+            return exit_code(self.invoke(argv, parser=parser,
+                                         context=self.new_context()))
+        except SystemExit as ex:
+            return exit_code(ex.code)
+        finally:
+            self.context = context
+
+    def on_batch_result(self, lineno, line, code):
+        ''' Hook executed after each batch line with its exit code '''
+        if code:
+            sys.stderr.write("%s: line %d: exit code %d: %s\n" % (
+                self.info.program_name, lineno, code, line))
+
+    def run_batch(self, source='-', stop_on_error=False):
+        ''' Run command lines from a file (or stdin, if '-') in one process
+
+        Lines are read one at a time, split shell-style, and each is run by
+        invoke_isolated() with a single, prebuilt parser. Empty lines and
+        lines starting with '#' are skipped. Returns 0 if all lines
+        succeeded, otherwise exit code of the last failed line.
+        '''
+        import shlex
+        parser = self.build_parser()
+        stream = sys.stdin if source == '-' else open(source)
+        result = 0
+        try:
+            for lineno, line in enumerate(iter(stream.readline, ''), 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    argv = shlex.split(line)
+                except ValueError as ex:
+                    sys.stderr.write("%s: line %d: %s\n" % (
+                        self.info.program_name, lineno, ex))
+                    code = 2
+                else:
+                    code = self.invoke_isolated(argv, parser)
+                self.on_batch_result(lineno, line, code)
+                if code:
+                    result = code
+                    if stop_on_error:
+                        break
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        return result
+
+    def run_shell(self, prompt=None, history_file=None, stdin=None):
+        ''' Run an interactive shell for this CLI, see quick_cli.shell '''
+        from .shell import QuickCLIShell
+        return QuickCLIShell(self, prompt=prompt, history_file=history_file,
+                             stdin=stdin).run()
+
+    def serve(self, socket_path):
+        ''' Serve this CLI on a Unix socket, see quick_cli.server '''
+        from .server import QuickCLIServer
+        return QuickCLIServer(self, socket_path).serve_forever()
 
 
 class QuickCLIAppLogged(QuickCLIApp):
     ''' QuickCLI Top Level Application Class, with Logging support '''
 
     DEBUG = False
+    LOG_QUEUE = False
+    LOG_FILE = None
+    LOG_JSON_FILE = None
+    LOG_FORMAT = logging.BASIC_FORMAT
 
     def __init__(self, **kwargs):
         ''' Constructor for QuickCLIApp '''
         QuickCLIApp.__init__(self, **kwargs)
+        self._log_queue = None
 
     def parser(self):
         parser = super(QuickCLIAppLogged, self).parser()
@@ -146,10 +509,45 @@ class QuickCLIAppLogged(QuickCLIApp):
             return logging.INFO
         return logging.WARNING
 
+    def log_handlers(self):
+        ''' Get handlers to write log records to
+
+        Writes to stderr, and to LOG_FILE and LOG_JSON_FILE (as JSON lines),
+        if set
+        '''
+        from .log_queue import log_handlers
+        return log_handlers(self.LOG_FILE, self.LOG_JSON_FILE, self.LOG_FORMAT)
+
     def initialize_logging(self):
-        ''' Initialize Logging '''
+        ''' Initialize Logging
+
+        If LOG_QUEUE is set, log records are passed through a queue to a
+        background thread writing them to log_handlers(), so logging does
+        not block actions (see quick_cli.log_queue). Queued records are
+        flushed at the end of every invocation. Root log level is set from
+        get_log_level() on every call.
+        '''
         loglevel = self.get_log_level()
-        logging.basicConfig(level=loglevel)
+        if not (self.LOG_QUEUE or self.LOG_FILE or self.LOG_JSON_FILE):
+            logging.basicConfig(level=loglevel)
+            return
+        root = logging.getLogger()
+        root.setLevel(loglevel)
+        if self._log_queue is None:
+            from .log_queue import QueueLogging
+            self._log_queue = QueueLogging(self.log_handlers(),
+                                           use_queue=self.LOG_QUEUE).start(root)
+
+    def flush_logging(self):
+        ''' Wait until queued log records are written '''
+        if self._log_queue is not None:
+            self._log_queue.flush()
+
+    def invoke(self, argv, parser=None, context=None):
+        try:
+            return super(QuickCLIAppLogged, self).invoke(argv, parser, context)
+        finally:
+            self.flush_logging()
 
     def pre_execute(self):
         ''' Hook for execution after parsing arguments '''
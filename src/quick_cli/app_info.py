@@ -1,7 +1,7 @@
 ''' App Info Classes '''
-from datetime import datetime
 import os.path
 import sys
+import time
 
 APACHE_LICENSE_INFO = '''
   Licensed under the Apache License 2.0
@@ -14,7 +14,13 @@ APACHE_LICENSE_INFO = '''
 
 
 class QuickCLIAppInfo(object):
-    ''' Application Info '''
+    ''' Application Info
+
+    Info items are resolved on first access (from overrides, app
+    attributes or getters, <name>_default getters, or INFO defaults) and
+    memoized. Set items via set() or attribute assignment, or call
+    invalidate() after changing anything they are computed from.
+    '''
 
     INFO = {
         'program_name': 'prog',
@@ -25,7 +31,7 @@ class QuickCLIAppInfo(object):
         'program_shortdesc': 'Short Description',
         'program_creator': 'unknown',
         'program_org': 'unknown',
-        'program_copyright_year': datetime.now().year,
+        'program_copyright_year': None,
         'program_license_desc': '''
 
 ''',
@@ -35,8 +41,9 @@ class QuickCLIAppInfo(object):
 
     def __init__(self, app, **kwargs):
         ''' Constructor '''
-        self.app = app
-        self.info = {}
+        object.__setattr__(self, 'app', app)
+        object.__setattr__(self, 'info', {})
+        object.__setattr__(self, '_resolved', {})
         for item, value in kwargs.items():
             if item in self.INFO:
                 self.info[item] = value
@@ -49,10 +56,26 @@ class QuickCLIAppInfo(object):
             return item()
         return item
 
-    def __getattr__(self, name):
-        ''' Get attribute by name '''
+    def set(self, name, value):
+        ''' Override an info item '''
         if name not in self.INFO:
             raise AttributeError("Invalid App Info item '%s'" % name)
+        self.info[name] = value
+        self.invalidate()
+
+    def invalidate(self):
+        ''' Forget resolved items, so they are resolved again on next access
+
+        All items are forgotten, as items may be computed from other items
+        '''
+        self._resolved.clear()
+
+    def snapshot(self):
+        ''' Get dict of all info items, resolving them if needed '''
+        return dict((name, getattr(self, name)) for name in self.INFO)
+
+    def _resolve(self, name):
+        ''' Resolve info item by name '''
         if name in self.info:
             return self.info[name]
 
@@ -72,6 +95,22 @@ class QuickCLIAppInfo(object):
 
         return default_value if not callable(default_value) else default_value(default_value_base)
 
+    def __getattr__(self, name):
+        ''' Get attribute by name '''
+        if name not in self.INFO:
+            raise AttributeError("Invalid App Info item '%s'" % name)
+        resolved = self._resolved
+        if name not in resolved:
+            resolved[name] = self._resolve(name)
+        return resolved[name]
+
+    def __setattr__(self, name, value):
+        ''' Set attribute, overriding info item if name is one '''
+        if name in self.INFO:
+            self.set(name, value)
+        else:
+            object.__setattr__(self, name, value)
+
 
 class QuickCLIAppBaseInfo(object):
     ''' Base for QuickCLIApp Class for Info '''
@@ -89,6 +128,10 @@ class QuickCLIAppBaseInfo(object):
             return name
         return default_value
 
+    def program_copyright_year_default(self, default_value):
+        ''' Program Copyright Year Default - current year '''
+        return time.localtime().tm_year
+
     def program_org_default(self, default_value):
         '''  Program Organization Default '''
         return self.info.program_creator
@@ -136,6 +136,38 @@ class TestQuickCLI(unittest.TestCase):
         self.assertEqual(app.info.from_main('testvalue'), "tester")
         self.assertIsNone(app.info.from_main('unset'))
 
+    def test_memoized(self):
+        ''' Test items are resolved once, until invalidated'''
+        class App(QuickCLIAppBaseInfo):
+            ''' '''
+            calls = 0
+
+            def program_version(self):
+                ''' Generate Program Version, counting calls '''
+                App.calls += 1
+                return "v%d" % App.calls
+
+        app = App()
+        self.assertEqual(app.info.program_version, "v1")
+        self.assertEqual(app.info.program_version_message, "%(prog)s vv1 (2019-08-12)")
+        self.assertEqual(App.calls, 1)
+        app.info.invalidate()
+        self.assertEqual(app.info.program_version, "v2")
+
+    def test_set_invalidates(self):
+        ''' Test overriding items invalidates dependent items'''
+        class App(QuickCLIAppBaseInfo):
+            ''' '''
+
+        app = App(program_creator="creator")
+        self.assertEqual(app.info.program_org, "creator")
+        app.info.program_creator = "other"
+        self.assertEqual(app.info.program_org, "other")
+        app.info.set('program_org', "org")
+        self.assertEqual(app.info.snapshot()['program_org'], "org")
+        with self.assertRaises(AttributeError):
+            app.info.set('program_name1', "name")
+
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG)
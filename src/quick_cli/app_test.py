@@ -0,0 +1,148 @@
+''' Unit Tests For QuickCLI Application '''
+
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from .actions import Action
+from .app import QuickCLIApp
+
+
+def add(args, wrapper):
+    ''' Add numbers, exit code being the sum '''
+    wrapper.app.context.set('calls', wrapper.app.context.get('calls', 0) + 1)
+    wrapper.app.results.append(
+        (sum(args['numbers']), wrapper.app.context.get('calls')))
+    return 0 if args['numbers'] else 3
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    ACTIONS = [Action("add", action=add,
+                      args=[dict(flags='numbers', nargs='*', type=int)])]
+
+    def __init__(self, **kwargs):
+        QuickCLIApp.__init__(self, **kwargs)
+        self.results = []
+        self.batch_results = []
+
+    def on_batch_result(self, lineno, line, code):
+        self.batch_results.append((lineno, code))
+
+
+class TestBatch(unittest.TestCase):
+    ''' Batch mode tests '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.saved_stderr = sys.stderr
+        sys.stderr = open(os.devnull, 'w')
+
+    def tearDown(self):
+        sys.stderr.close()
+        sys.stderr = self.saved_stderr
+        shutil.rmtree(self.tmpdir)
+
+    def write_batch(self, content):
+        ''' Write batch file '''
+        filename = os.path.join(self.tmpdir, 'batch.txt')
+        with open(filename, 'w') as output:
+            output.write(content)
+        return filename
+
+    def test_batch(self):
+        ''' Test all lines run with fresh context and exit codes reported '''
+        app = App()
+        filename = self.write_batch(
+            "add 1 2\n\n# comment\nadd\nbogus\nadd '4'\n")
+        self.assertEqual(app.run_batch(filename), 2)
+        self.assertEqual(app.batch_results, [(1, 0), (4, 3), (5, 2), (6, 0)])
+        self.assertEqual(app.results, [(3, 1), (0, 1), (4, 1)])
+
+    def test_batch_stop_on_error(self):
+        ''' Test batch stops on first failure '''
+        app = App()
+        filename = self.write_batch("add 1\nadd\nadd 2\n")
+        self.assertEqual(app.run_batch(filename, stop_on_error=True), 3)
+        self.assertEqual(app.batch_results, [(1, 0), (2, 3)])
+
+    def test_batch_parser_error(self):
+        ''' Test batch file is not opened if parser can not be built '''
+        app = App()
+
+        def fail(argv=None):
+            ''' Fail to build parser '''
+            raise ValueError("bad parser")
+        app.build_parser = fail
+        with self.assertRaises(ValueError):
+            app.run_batch(self.write_batch("add 1\n") + ".missing")
+
+
+@unittest.skipUnless(sys.version_info >= (3, 5), "async requires Python 3.5+")
+class TestAsync(unittest.TestCase):
+    ''' Async action tests '''
+
+    def make_app(self):
+        ''' Make app with async hooks, defined in exec to support Python 2 '''
+        namespace = {'Action': Action, 'QuickCLIApp': QuickCLIApp}
+        exec('''
+import asyncio
+
+async def prep(args, wrapper):
+    await asyncio.sleep(0)
+    wrapper.app.calls.append('prep')
+
+async def run(args, wrapper):
+    await asyncio.sleep(0)
+    wrapper.app.calls.append('run')
+    return 5
+
+async def interrupt(args, wrapper):
+    raise KeyboardInterrupt()
+
+class AsyncApp(QuickCLIApp):
+    ACTIONS = [Action("run", action=run, prep_command=prep),
+               Action("sync", action=lambda args, wrapper: 6),
+               Action("interrupt", action=interrupt)]
+
+    def __init__(self):
+        QuickCLIApp.__init__(self)
+        self.calls = []
+
+    async def pre_execute(self):
+        self.calls.append('pre_execute')
+
+    async def on_keyboard_interrupt(self):
+        self.calls.append('interrupted')
+        return 130
+''', namespace)
+        return namespace['AsyncApp']()
+
+    def test_async_action(self):
+        ''' Test coroutine hooks are awaited in order '''
+        app = self.make_app()
+        self.assertTrue(app.use_async({'action': 'run'}))
+        self.assertEqual(app.invoke(['run']), 5)
+        self.assertEqual(app.calls, ['pre_execute', 'prep', 'run'])
+
+    def test_sync_action_in_async_app(self):
+        ''' Test sync actions still run in an app with async hooks '''
+        self.assertEqual(self.make_app().invoke(['sync']), 6)
+
+    def test_keyboard_interrupt(self):
+        ''' Test KeyboardInterrupt is routed to on_keyboard_interrupt '''
+        app = self.make_app()
+        self.assertEqual(app.invoke(['interrupt']), 130)
+        self.assertEqual(app.calls, ['pre_execute', 'interrupted'])
+
+    def test_sync_app_not_async(self):
+        ''' Test apps without coroutine hooks do not use event loop '''
+        self.assertFalse(App().use_async({'action': 'add'}))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,258 @@
+''' Lazy Argument Types
+
+Argument types (for type= of Action args) whose values defer opening
+files until an action first uses them, rather than when arguments are
+parsed:
+
+    Action("checksum", action=checksum,
+           args=[dict(flags='source', type=MappedFileType()),
+                 dict(flags='--log', type=LazyFileType('w'))])
+
+LazyFileType gives a LazyFile, which opens the file on first access and
+otherwise behaves like the file object. MappedFileType gives a MappedFile,
+a read-only memory map of the file, available as mmap or as a zero-copy
+memoryview. Files that were opened are closed after the top level
+ActionWrapper.execute returns (see release_args), and can not be used
+after that.
+'''
+import logging
+import os
+import sys
+import threading
+
+LOG = logging.getLogger(__name__)
+
+IS_PYTHON2 = sys.version_info[0] == 2
+
+
+class LazyArgument(object):
+    ''' Base of argument values holding resources acquired on first use '''
+
+    def release(self):
+        ''' Release resources acquired so far '''
+
+    def cache_key(self):
+        ''' Get value identifying argument in result cache keys
+
+        None if results of actions using it can not be cached
+        '''
+        return repr(self)
+
+
+def file_state(name):
+    ''' Get (name, modification time, size) of a file, for cache keys '''
+    try:
+        stat = os.stat(name)
+    except OSError:
+        return (name, None, None)
+    return (name, stat.st_mtime, stat.st_size)
+
+
+def release_args(args):
+    ''' Release all lazy argument values in args dict, including lists '''
+    for value in args.values():
+        values = value if isinstance(value, (list, tuple)) else (value,)
+        for item in values:
+            if isinstance(item, LazyArgument):
+                try:
+                    item.release()
+                except Exception as ex:  # pylint: disable=broad-except
+                    LOG.warning("Failed to release %r: %s", item, ex)
+
+
+def _check_readable(string):
+    ''' Raise ArgumentTypeError if file to be read does not exist '''
+    if not os.path.isfile(string):
+        from argparse import ArgumentTypeError
+        raise ArgumentTypeError("can't open '%s': No such file" % string)
+
+
+class LazyFile(LazyArgument):
+    ''' File opened on first access
+
+    Attributes, iteration and "with" are passed on to the file object,
+    opening it if needed. "-" is stdin (or stdout, for write modes), or its
+    binary buffer for binary modes, which is never closed. Once released
+    (i.e. at the end of "with"), accessing the file raises ValueError rather
+    than opening (or truncating) it again.
+
+    Fan-out items running in threads share the same file object, which is
+    only opened once; reads and writes of items are not synchronized.
+    '''
+
+    def __init__(self, name, mode='r', bufsize=-1, encoding=None, errors=None):
+        ''' Constructor '''
+        self.name = name
+        self.mode = mode
+        self.bufsize = bufsize
+        self.encoding = encoding
+        self.errors = errors
+        self._file = None
+        self._released = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        ''' Check if file was opened '''
+        return self._file is not None
+
+    @property
+    def file(self):
+        ''' Get file object, opening file on first access '''
+        if self._file is None:
+            with self._lock:
+                if self._released:
+                    raise ValueError("I/O operation on released file %s" % self.name)
+                if self._file is None:
+                    self._file = self._open()
+        return self._file
+
+    def _open(self):
+        ''' Open file (or get std stream, for "-") '''
+        if self.name == '-':
+            stream = sys.stdout if 'w' in self.mode or 'a' in self.mode else sys.stdin
+            return getattr(stream, 'buffer', stream) if 'b' in self.mode else stream
+        LOG.debug("Opening %s (%s)", self.name, self.mode)
+        if self.encoding is None and self.errors is None:
+            return open(self.name, self.mode, self.bufsize)
+        import io
+        return io.open(self.name, self.mode, self.bufsize, self.encoding, self.errors)
+
+    def release(self):
+        ''' Close file, if it was opened. File can not be used after this '''
+        with self._lock:
+            self._released = True
+            handle, self._file = self._file, None
+        if handle is not None and self.name != '-':
+            handle.close()
+
+    def cache_key(self):
+        ''' Get file state if read, None for stdin and files written '''
+        if self.name == '-' or 'r' not in self.mode or '+' in self.mode:
+            return None
+        return ('LazyFile', self.mode) + file_state(self.name)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.file, name)
+
+    def __iter__(self):
+        return iter(self.file)
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, *exc_info):
+        self.release()
+        return False
+
+    def __repr__(self):
+        return "LazyFile(%r, %r)" % (self.name, self.mode)
+
+
+class LazyFileType(object):
+    ''' Argument type for LazyFile, a deferred argparse.FileType
+
+    Files to be read are checked to exist when arguments are parsed, so
+    missing files are still reported as argument errors
+    '''
+
+    def __init__(self, mode='r', bufsize=-1, encoding=None, errors=None):
+        ''' Constructor '''
+        self.mode = mode
+        self.bufsize = bufsize
+        self.encoding = encoding
+        self.errors = errors
+
+    def __call__(self, string):
+        if string != '-' and 'r' in self.mode and '+' not in self.mode:
+            _check_readable(string)
+        return LazyFile(string, self.mode, self.bufsize, self.encoding,
+                        self.errors)
+
+    def __repr__(self):
+        return "LazyFileType(%r)" % self.mode
+
+
+class MappedFile(LazyArgument):
+    ''' Read-only memory map of a file, mapped on first access
+
+    Use mmap for an mmap.mmap object (searchable, sliceable), or view for
+    a zero-copy memoryview (a buffer on Python 2, where memory maps do not
+    support memoryview). Views taken from either must not be kept after
+    the action returns, as the map is closed then, and accessing the file
+    after that raises ValueError.
+    '''
+
+    def __init__(self, name):
+        ''' Constructor '''
+        self.name = name
+        self._mmap = None
+        self._view = None
+        self._released = False
+
+    @property
+    def mmap(self):
+        ''' Get memory map of file, mapping it on first access
+
+        Empty files can not be mapped, and are given as empty bytes
+        '''
+        if self._mmap is None:
+            if self._released:
+                raise ValueError("I/O operation on released file %s" % self.name)
+            import mmap
+            with open(self.name, 'rb') as source:
+                if os.fstat(source.fileno()).st_size == 0:
+                    self._mmap = b''
+                else:
+                    LOG.debug("Mapping %s", self.name)
+                    self._mmap = mmap.mmap(source.fileno(), 0,
+                                           access=mmap.ACCESS_READ)
+        return self._mmap
+
+    @property
+    def view(self):
+        ''' Get zero-copy memoryview of file contents '''
+        if self._view is None:
+            mapped = self.mmap
+            if IS_PYTHON2 and not isinstance(mapped, bytes):
+                self._view = buffer(mapped)  # pylint: disable=undefined-variable
+            else:
+                self._view = memoryview(mapped)
+        return self._view
+
+    def __len__(self):
+        return len(self.mmap)
+
+    def release(self):
+        ''' Release view and close memory map, if mapped. File can not be used after this '''
+        self._released = True
+        view, self._view = self._view, None
+        if view is not None and hasattr(view, 'release'):
+            view.release()
+        mapped, self._mmap = self._mmap, None
+        if mapped is not None and hasattr(mapped, 'close'):
+            try:
+                mapped.close()
+            except BufferError:
+                LOG.warning("Memory map of %s is still in use, not closing it",
+                            self.name)
+
+    def cache_key(self):
+        ''' Get file state '''
+        return ('MappedFile',) + file_state(self.name)
+
+    def __repr__(self):
+        return "MappedFile(%r)" % self.name
+
+
+class MappedFileType(object):
+    ''' Argument type for MappedFile '''
+
+    def __call__(self, string):
+        _check_readable(string)
+        return MappedFile(string)
+
+    def __repr__(self):
+        return "MappedFileType()"
@@ -0,0 +1,145 @@
+''' Unit Tests For Lazy Argument Types '''
+
+from argparse import ArgumentTypeError
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+from .actions import Action
+from .app import QuickCLIApp
+from .arg_types import (LazyFile, LazyFileType, MappedFile, MappedFileType,
+                        release_args)
+
+
+def count(args, wrapper):
+    ''' Count lines of source, keeping arguments for inspection '''
+    wrapper.app.seen = dict(args)
+    if args['quick']:
+        return 0
+    wrapper.app.lines = bytes(args['source'].view).count(b'\n')
+    with args['output'] as output:
+        output.write("%d\n" % wrapper.app.lines)
+    return 0
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    ACTIONS = [Action("count", action=count,
+                      args=[dict(flags='source', type=MappedFileType()),
+                            dict(flags='output', type=LazyFileType('w')),
+                            dict(flags='--quick', action='store_true')])]
+
+
+class TestArgTypes(unittest.TestCase):
+    ''' Lazy argument type tests '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = self.write_file('source.txt', b"one\ntwo\nthree\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_file(self, name, data):
+        ''' Write file in temporary directory '''
+        filename = os.path.join(self.tmpdir, name)
+        with open(filename, 'wb') as output:
+            output.write(data)
+        return filename
+
+    def test_lazy_file(self):
+        ''' Test file is opened on first access and closed on release '''
+        lazy = LazyFileType()(self.source)
+        self.assertFalse(lazy.is_open)
+        self.assertEqual(lazy.readline(), "one\n")
+        self.assertEqual(list(lazy), ["two\n", "three\n"])
+        handle = lazy.file
+        release_args({'source': [lazy], 'other': 1})
+        self.assertTrue(handle.closed)
+        self.assertFalse(lazy.is_open)
+
+    def test_released(self):
+        ''' Test released files are not opened again '''
+        output = LazyFileType('w')(os.path.join(self.tmpdir, 'output.txt'))
+        with output as handle:
+            handle.write("kept\n")
+        with self.assertRaises(ValueError):
+            output.write("lost\n")
+        output.release()
+        with open(output.name) as result:
+            self.assertEqual(result.read(), "kept\n")
+        mapped = MappedFile(self.source)
+        mapped.release()
+        with self.assertRaises(ValueError):
+            len(mapped)
+
+    def test_shared(self):
+        ''' Test file shared by threads is opened once '''
+        lazy = LazyFileType()(self.source)
+        handles = []
+        threads = [threading.Thread(target=lambda: handles.append(lazy.file))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(handles), 4)
+        self.assertTrue(all(handle is handles[0] for handle in handles))
+        lazy.release()
+
+    def test_lazy_std_streams(self):
+        ''' Test "-" is stdin or stdout, and is not closed '''
+        self.assertIs(LazyFile('-').file, sys.stdin)
+        lazy = LazyFile('-', 'w')
+        self.assertIs(lazy.file, sys.stdout)
+        lazy.release()
+        self.assertFalse(sys.stdout.closed)
+        stdout = sys.stdout
+        self.assertIs(LazyFile('-', 'wb').file, getattr(stdout, 'buffer', stdout))
+        self.assertIs(LazyFile('-', 'rb').file, getattr(sys.stdin, 'buffer', sys.stdin))
+
+    def test_missing_file(self):
+        ''' Test missing files to read are rejected when parsed '''
+        missing = os.path.join(self.tmpdir, 'missing')
+        with self.assertRaises(ArgumentTypeError):
+            LazyFileType()(missing)
+        with self.assertRaises(ArgumentTypeError):
+            MappedFileType()(missing)
+        self.assertFalse(LazyFileType('w')(missing).is_open)
+
+    def test_mapped_file(self):
+        ''' Test memory map and view of a file '''
+        mapped = MappedFile(self.source)
+        self.assertEqual(len(mapped), 14)
+        self.assertEqual(mapped.mmap.find(b"two"), 4)
+        self.assertEqual(bytes(mapped.view[4:7]), b"two")
+        handle = mapped.mmap
+        mapped.release()
+        with self.assertRaises(ValueError):
+            handle.find(b"two")
+        empty = MappedFile(self.write_file('empty', b""))
+        self.assertEqual(len(empty.view), 0)
+        empty.release()
+
+    def test_app(self):
+        ''' Test files are opened by action and released after execution '''
+        output = os.path.join(self.tmpdir, 'output.txt')
+        app = App()
+        self.assertEqual(app.invoke(['count', self.source, output, '--quick']), 0)
+        self.assertFalse(app.seen['output'].is_open)
+        self.assertFalse(os.path.exists(output))
+
+        self.assertEqual(app.invoke(['count', self.source, output]), 0)
+        self.assertEqual(app.lines, 3)
+        with open(output) as result:
+            self.assertEqual(result.read(), "3\n")
+        self.assertIsNone(app.seen['source']._mmap)  # pylint: disable=protected-access
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,103 @@
+''' QuickCLI Server Client
+
+Tiny client for QuickCLIServer. Forwards argv, environment, working
+directory and stdio file descriptors to the server and exits with the
+exit code of the invocation:
+
+    python -m quick_cli.client SOCKET_PATH [ARGS...]
+
+or, with QUICKCLI_SOCKET set in the environment:
+
+    python -m quick_cli.client [ARGS...]
+
+Only standard library modules needed for the request are imported, so the
+client starts in a fraction of the time it takes to import an application.
+'''
+import array
+import json
+import os
+import socket
+import struct
+import sys
+
+SOCKET_ENV = 'QUICKCLI_SOCKET'
+HEADER = struct.Struct('!I')
+EXIT_CODE = struct.Struct('!i')
+STDIO_FDS = (0, 1, 2)
+
+
+def recv_exact(sock, size):
+    ''' Receive exactly size bytes from socket. Short result means EOF '''
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_request(sock, argv, env, cwd, fds):
+    ''' Send invocation request, passing file descriptors along '''
+    payload = json.dumps({'argv': list(argv), 'env': dict(env),
+                          'cwd': cwd}).encode('utf-8')
+    sock.sendmsg([HEADER.pack(len(payload))],
+                 [(socket.SOL_SOCKET, socket.SCM_RIGHTS,
+                   array.array('i', fds).tobytes())])
+    sock.sendall(payload)
+
+
+def recv_request(sock):
+    ''' Receive invocation request. Returns request dict and list of fds '''
+    fds = array.array('i')
+    header, ancdata, _flags, _addr = sock.recvmsg(
+        HEADER.size, socket.CMSG_LEN(len(STDIO_FDS) * fds.itemsize))
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+    header += recv_exact(sock, HEADER.size - len(header))
+    if len(header) != HEADER.size:
+        raise IOError("Incomplete request header")
+    size = HEADER.unpack(header)[0]
+    payload = recv_exact(sock, size)
+    if len(payload) != size:
+        raise IOError("Incomplete request")
+    return json.loads(payload.decode('utf-8')), list(fds)
+
+
+def call(argv, socket_path=None, env=None, cwd=None, fds=STDIO_FDS):
+    ''' Run an invocation on a QuickCLIServer, returning its exit code '''
+    socket_path = socket_path or os.environ[SOCKET_ENV]
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        send_request(sock, argv, os.environ if env is None else env,
+                     os.getcwd() if cwd is None else cwd, fds)
+        data = recv_exact(sock, EXIT_CODE.size)
+    finally:
+        sock.close()
+    if len(data) != EXIT_CODE.size:
+        raise IOError("Server closed connection without exit code")
+    return EXIT_CODE.unpack(data)[0]
+
+
+def main(argv=None):
+    ''' Client entry point '''
+    argv = sys.argv[1:] if argv is None else argv
+    socket_path = os.environ.get(SOCKET_ENV)
+    if not socket_path:
+        if not argv:
+            sys.stderr.write("usage: %s SOCKET_PATH [ARGS...]\n" % sys.argv[0])
+            return 2
+        socket_path, argv = argv[0], argv[1:]
+    try:
+        return call(argv, socket_path)
+    except (IOError, OSError) as ex:
+        sys.stderr.write("quick_cli client: %s: %s\n" % (socket_path, ex))
+        return 255
+
+
+if __name__ == "__main__":
+    sys.exit(main())
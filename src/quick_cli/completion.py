@@ -0,0 +1,194 @@
+''' Precomputed Shell Completion Index
+
+Completion is driven by a static index file exported from the full parser,
+which bash/zsh completion scripts consult with awk, without starting
+Python on every TAB press. Index is a tab separated text file:
+
+    #quick_cli-completion <version> <fingerprint>
+    W <node> <word> <word> ...       words to complete at a node
+    T <node> <token> <child node>    action name or alias leading to child
+    O <node> <flag>                  flag that takes a value
+    C <node> <flag> <choice> ...     choices for a flag value
+
+Nodes are action paths, i.e. "/" for the app and "/one/uno" for actions.
+
+Commands (handled by QuickCLIApp.invoke before parsing, flag name is set by
+QuickCLIApp.COMPLETION_FLAG):
+
+    prog --quickcli-completion index [FILE]    export index
+    prog --quickcli-completion bash [FILE]     print bash completion script
+    prog --quickcli-completion zsh [FILE]      print zsh completion script
+    prog --quickcli-completion check [FILE]    exit 1 if index is stale
+
+Scripts regenerate a missing index, or one older than the program, in the
+background. Use check (i.e. after upgrades) to detect changes in modules.
+'''
+from argparse import SUPPRESS
+import logging
+import os
+import os.path
+import re
+import sys
+
+from .parser_cache import app_fingerprint, default_cache_dir
+
+LOG = logging.getLogger(__name__)
+
+INDEX_VERSION = '1'
+
+BASH_SCRIPT = r'''# %(prog)s bash completion generated by QuickCLI
+_quickcli_complete_%(func)s() {
+    local index=%(index)s
+    local prog_path
+    prog_path=$(command -v %(prog)s 2>/dev/null)
+    if [ ! -r "$index" ] || { [ -n "$prog_path" ] && [ "$prog_path" -nt "$index" ]; }; then
+        ( %(prog)s %(flag)s index "$index" >/dev/null 2>&1 & )
+        [ -r "$index" ] || return 0
+    fi
+    local cur="${COMP_WORDS[COMP_CWORD]}"
+    local words
+    words=$(awk -F'\t' -v line="${COMP_WORDS[*]:1:COMP_CWORD-1}" '
+        $1 == "W" { words[$2] = $3; next }
+        $1 == "T" { trans[$2, $3] = $4; next }
+        $1 == "O" { takes[$2, $3] = 1; next }
+        $1 == "C" { choices[$2, $3] = $4; next }
+        END {
+            node = "/"; skip = 0; last = ""
+            count = split(line, tokens, " ")
+            for (i = 1; i <= count; i++) {
+                token = tokens[i]; last = token
+                if (skip) { skip = 0; continue }
+                if ((node, token) in trans) node = trans[node, token]
+                else if ((node, token) in takes) skip = 1
+            }
+            if (skip) { if ((node, last) in choices) print choices[node, last] }
+            else print words[node]
+        }' "$index")
+    COMPREPLY=( $(compgen -W "$words" -- "$cur") )
+}
+complete -o default -F _quickcli_complete_%(func)s %(prog)s
+'''
+
+ZSH_PRELUDE = '''# %(prog)s zsh completion generated by QuickCLI
+autoload -U +X bashcompinit && bashcompinit
+'''
+
+
+def default_index_path(app):
+    ''' Get default completion index file for an app '''
+    return os.path.join(default_cache_dir(),
+                        "%s.completion" % app.info.program_name)
+
+
+def _flag_words(parser):
+    ''' Get completable option strings of a parser '''
+    words = []
+    for action in parser._actions:  # pylint: disable=protected-access
+        if action.help is SUPPRESS:
+            continue
+        words.extend(action.option_strings)
+    return words
+
+
+def _index_parser(parser, node, lines):
+    ''' Add index lines for a parser and its sub-parsers '''
+    words = _flag_words(parser)
+    children = []
+    for action in parser._actions:  # pylint: disable=protected-access
+        if action.option_strings:
+            if action.nargs != 0:
+                for flag in action.option_strings:
+                    lines.append("O\t%s\t%s" % (node, flag))
+                    if action.choices:
+                        lines.append("C\t%s\t%s\t%s" % (
+                            node, flag, " ".join(str(choice) for choice in action.choices)))
+            continue
+        parsers = getattr(action, '_name_parser_map', None)
+        if parsers is None:
+            if action.choices:
+                words.extend(str(choice) for choice in action.choices)
+            continue
+        names = {}
+        for token, subparser in parsers.items():
+            # Name is added to map before its aliases
+            name = names.setdefault(id(subparser), token)
+            child = "%s/%s" % (node.rstrip("/"), name)
+            words.append(token)
+            lines.append("T\t%s\t%s\t%s" % (node, token, child))
+            if name == token:
+                children.append((subparser, child))
+    lines.append("W\t%s\t%s" % (node, " ".join(words)))
+    for subparser, child in children:
+        _index_parser(subparser, child, lines)
+
+
+def build_index(app, parser=None):
+    ''' Build completion index lines for an app '''
+    if parser is None:
+        parser = app.command.configure_parser(app.parser())
+    lines = ["#quick_cli-completion %s %s" % (INDEX_VERSION, app_fingerprint(app))]
+    _index_parser(parser, "/", lines)
+    return lines
+
+
+def write_index(app, filename, parser=None):
+    ''' Write completion index for an app to a file, atomically '''
+    lines = build_index(app, parser)
+    directory = os.path.dirname(filename)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp_filename = "%s.%s.tmp" % (filename, os.getpid())
+    with open(tmp_filename, 'w') as output:
+        output.write("\n".join(lines) + "\n")
+    os.rename(tmp_filename, filename)
+
+
+def is_stale(app, filename):
+    ''' Check if completion index file is missing or stale '''
+    try:
+        with open(filename) as index:
+            header = index.readline().split()
+    except (IOError, OSError):
+        return True
+    return header[1:] != [INDEX_VERSION, app_fingerprint(app)]
+
+
+def completion_script(app, shell, filename):
+    ''' Get completion script for a shell, consulting index in filename '''
+    prog = app.info.program_name
+    values = {
+        'prog': prog,
+        'func': re.sub(r'[^A-Za-z0-9_]', '_', prog),
+        'index': "'%s'" % filename.replace("'", "'\\''"),
+        'flag': app.COMPLETION_FLAG,
+    }
+    script = BASH_SCRIPT % values
+    if shell == 'zsh':
+        script = ZSH_PRELUDE % values + script
+    return script
+
+
+def completion_command(app, argv):
+    ''' Handle completion command, argv[0] being the flag. Returns exit code '''
+    command = argv[1] if len(argv) > 1 else 'index'
+    filename = argv[2] if len(argv) > 2 else None
+    if command == 'index':
+        if filename:
+            write_index(app, filename)
+        else:
+            sys.stdout.write("\n".join(build_index(app)) + "\n")
+        return 0
+    filename = os.path.abspath(filename or default_index_path(app))
+    if command == 'check':
+        if is_stale(app, filename):
+            sys.stderr.write("Completion index %s is stale\n" % filename)
+            return 1
+        return 0
+    if command in ('bash', 'zsh'):
+        if is_stale(app, filename):
+            write_index(app, filename)
+        sys.stdout.write(completion_script(app, command, filename))
+        return 0
+    sys.stderr.write("Unknown completion command '%s', expected one of: "
+                     "index, bash, zsh, check\n" % command)
+    return 2
@@ -0,0 +1,105 @@
+''' Unit Tests For Shell Completion Index '''
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from .action_wrapper import IS_PYTHON2
+from .actions import Action
+from .app import QuickCLIApp
+from .completion import build_index, completion_script, is_stale, write_index
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    ACTIONS = [
+        Action("deploy", aliases=['d'], args=[
+            dict(flags='--env', choices=['prod', 'dev']),
+            dict(flags='--force', action='store_true')],
+            actions=[Action('app'), Action('db')]),
+        Action("status"),
+    ]
+
+
+def has_bash():
+    ''' Check if bash is available '''
+    try:
+        return subprocess.call(['bash', '-c', 'true']) == 0
+    except OSError:
+        return False
+
+
+class TestCompletion(unittest.TestCase):
+    ''' Completion Index tests '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.index = os.path.join(self.tmpdir, 'app.completion')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_index(self):
+        ''' Test index contents '''
+        lines = build_index(App(program_name='app'))
+        self.assertIn("T\t/\tdeploy\t/deploy", lines)
+        self.assertIn("O\t/deploy\t--env", lines)
+        self.assertIn("C\t/deploy\t--env\tprod dev", lines)
+        self.assertIn("W\t/deploy\t-h --help --env --force app db", lines)
+        self.assertIn("W\t/deploy/db\t-h --help", lines)
+
+    @unittest.skipIf(IS_PYTHON2, "sub-parser aliases require Python 3")
+    def test_index_aliases(self):
+        ''' Test aliases are indexed as targets of the aliased action '''
+        lines = build_index(App(program_name='app'))
+        self.assertIn("T\t/\td\t/deploy", lines)
+
+    def test_staleness(self):
+        ''' Test stale index detection '''
+        app = App(program_name='app')
+        self.assertTrue(is_stale(app, self.index))
+        write_index(app, self.index)
+        self.assertFalse(is_stale(app, self.index))
+
+        class OtherApp(App):
+            ''' Changed App '''
+            ACTIONS = App.ACTIONS + [Action("new")]
+        self.assertTrue(is_stale(OtherApp(program_name='app'), self.index))
+
+    def complete(self, *words):
+        ''' Run bash completion script for words, returning sorted replies '''
+        app = App(program_name='app')
+        write_index(app, self.index)
+        script = os.path.join(self.tmpdir, 'complete.sh')
+        with open(script, 'w') as output:
+            output.write(completion_script(app, 'bash', self.index))
+        command = ('source %s; COMP_WORDS=(app %s); COMP_CWORD=%d; '
+                   '_quickcli_complete_app; echo "${COMPREPLY[*]}"' % (
+                       script, " ".join("'%s'" % word for word in words),
+                       len(words)))
+        output = subprocess.check_output(['bash', '-c', command])
+        return sorted(output.decode('utf-8').split())
+
+    @unittest.skipUnless(has_bash(), "bash is not available")
+    def test_bash_script(self):
+        ''' Test bash completion script against index '''
+        self.assertEqual(self.complete('s'), ['status'])
+        self.assertEqual(self.complete('deploy', ''), ['--env', '--force', '--help',
+                                                       '-h', 'app', 'db'])
+        self.assertEqual(self.complete('deploy', '--env', ''), ['dev', 'prod'])
+        self.assertEqual(self.complete('deploy', '--env', 'dev', 'a'), ['app'])
+
+    @unittest.skipIf(IS_PYTHON2, "sub-parser aliases require Python 3")
+    @unittest.skipUnless(has_bash(), "bash is not available")
+    def test_bash_script_aliases(self):
+        ''' Test bash completion script completes after an alias '''
+        self.assertEqual(self.complete('d', ''), ['--env', '--force', '--help',
+                                                  '-h', 'app', 'db'])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,191 @@
+''' Config File Argument Defaults
+
+Config files (YAML, or JSON if the file name ends with .json) provide
+defaults for arguments, by dest name, structured by action path:
+
+    verbose: true          # default for app level arguments
+    deploy:                # section for "deploy" action
+      env: prod
+      app:                 # section for "deploy app" action
+        force: true
+
+A value applies to arguments of the action whose section it is in, and
+of all its sub actions, with deeper sections taking precedence. Keys
+naming a sub action are always treated as sections, and keys matching no
+argument are ignored. Values are set as parser defaults before arguments
+are parsed, so explicit command line arguments always win.
+
+Parsed files are cached in pickled form, keyed on file path, mtime and
+size, so YAML is only parsed when a config file changes.
+'''
+import hashlib
+import logging
+import os
+import os.path
+import pickle
+
+from .parser_cache import _file_stamp, default_cache_dir
+
+LOG = logging.getLogger(__name__)
+
+
+def parse_file(filename):
+    ''' Parse a YAML or JSON config file '''
+    with open(filename, 'rb') as config_file:
+        content = config_file.read().decode('utf-8')
+    if filename.endswith('.json'):
+        import json
+        return json.loads(content)
+    import yaml
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(content, Loader=loader)
+
+
+def merge(base, override):
+    ''' Recursively merge override dict into a copy of base dict '''
+    result = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            value = merge(result[key], value)
+        result[key] = value
+    return result
+
+
+class ConfigCache(object):
+    ''' Cache of parsed config files
+
+    Cache entries are keyed by absolute path, and hold the mtime and size
+    of the file they were parsed from, so a changed file is parsed again.
+    '''
+    FORMAT_VERSION = 1
+
+    def __init__(self, cache_dir=None):
+        ''' Constructor '''
+        self.cache_dir = cache_dir if cache_dir else default_cache_dir()
+
+    def filename(self, config_file):
+        ''' Get cache file name for a config file '''
+        key = hashlib.sha1(config_file.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, "config-%s.cache" % key)
+
+    def load(self, config_file, stamp):
+        ''' Load parsed config from cache. Return None if missing or stale '''
+        try:
+            with open(self.filename(config_file), 'rb') as cache_file:
+                version, filename, cached_stamp, data = pickle.load(cache_file)
+        except (IOError, OSError):
+            return None
+        except Exception as ex:  # pylint: disable=broad-except
+            LOG.debug("Ignoring unreadable config cache for %s: %s",
+                      config_file, ex)
+            return None
+        if (version, filename, cached_stamp) != (self.FORMAT_VERSION,
+                                                 config_file, stamp):
+            return None
+        return data
+
+    def save(self, config_file, stamp, data):
+        ''' Save parsed config to cache. Return True if saved '''
+        filename = self.filename(config_file)
+        tmp_filename = "%s.%s.tmp" % (filename, os.getpid())
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(tmp_filename, 'wb') as cache_file:
+                pickle.dump((self.FORMAT_VERSION, config_file, stamp, data),
+                            cache_file, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_filename, filename)
+            return True
+        except Exception as ex:  # pylint: disable=broad-except
+            LOG.debug("Unable to save config cache %s: %s", filename, ex)
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            return False
+
+
+def load_file(filename, cache=None):
+    ''' Load a config file, using cache if given. Return None if missing '''
+    filename = os.path.abspath(filename)
+    stamp = _file_stamp(filename)
+    if stamp is None:
+        LOG.debug("Config file %s not found", filename)
+        return None
+    data = cache.load(filename, stamp) if cache is not None else None
+    if data is not None:
+        return data
+    LOG.debug("Parsing config file %s", filename)
+    try:
+        data = parse_file(filename)
+    except (IOError, OSError):
+        return None
+    except Exception as ex:
+        raise ValueError("Invalid config file %s: %s" % (filename, ex))
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise ValueError("Invalid config file %s: expected a mapping, got %s" %
+                         (filename, type(data).__name__))
+    if cache is not None:
+        cache.save(filename, stamp, data)
+    return data
+
+
+def load_config(filenames, cache=None):
+    ''' Load and merge config files, later files taking precedence '''
+    config = {}
+    for filename in filenames:
+        data = load_file(filename, cache)
+        if data:
+            config = merge(config, data)
+    return config
+
+
+def _parser_dests(parser):
+    ''' Get dests of arguments of parser, other than sub-parser selection '''
+    # pylint: disable=protected-access
+    return set(action.dest for action in parser._actions
+               if getattr(action, '_name_parser_map', None) is None)
+
+
+def _apply_section(parser, wrapper, section, inherited, tokens, applied, keys):
+    ''' Set defaults of parser from config section, and recurse into sub-parsers '''
+    sub_actions = wrapper.actions_idx if wrapper.has_actions else {}
+    values = dict(inherited)
+    for key, value in section.items():
+        if key not in sub_actions:
+            values[key] = value
+            keys.add(key)
+    dests = _parser_dests(parser)
+    defaults = dict((key, value) for key, value in values.items() if key in dests)
+    if defaults:
+        parser.set_defaults(**defaults)
+        applied.update(defaults)
+    for action in parser._actions:  # pylint: disable=protected-access
+        choices = getattr(action, '_name_parser_map', None)
+        if choices is None:
+            continue
+        for sub_wrapper in wrapper.actions:
+            subparser = choices.get(sub_wrapper.name)
+            if subparser is None or not sub_wrapper.is_selected(tokens):
+                continue
+            sub_section = section.get(sub_wrapper.name)
+            _apply_section(subparser, sub_wrapper,
+                           sub_section if isinstance(sub_section, dict) else {},
+                           values, tokens, applied, keys)
+
+
+def apply_defaults(parser, wrapper, config, argv):
+    ''' Set config values as defaults of parser and sub-parsers selected by argv
+
+    Only sub-parsers of actions named in argv are visited, so the cost
+    does not grow with size of the action tree. Returns dict of defaults
+    that were set
+    '''
+    applied = {}
+    keys = set()
+    _apply_section(parser, wrapper, config, {}, frozenset(argv), applied, keys)
+    ignored = keys.difference(applied)
+    if ignored:
+        LOG.debug("Ignoring config keys matching no argument: %s",
+                  ", ".join(sorted(ignored)))
+    return applied
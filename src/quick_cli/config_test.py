@@ -0,0 +1,144 @@
+''' Unit Tests For Config File Argument Defaults '''
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from .actions import Action
+from .app import QuickCLIApp
+from .config import ConfigCache, load_config, load_file, merge
+
+
+def record(args, wrapper):
+    ''' Record args in app '''
+    wrapper.app.recorded = dict(args)
+    return 0
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    ACTIONS = [
+        Action("deploy", args=[dict(flags='--env', default='dev')], actions=[
+            Action("app", action=record, args=[
+                dict(flags='--force', action='store_true'),
+                dict(flags='--count', type=int)]),
+            Action("db", action=record)]),
+        Action("status", action=record),
+    ]
+
+    def __init__(self, **kwargs):
+        QuickCLIApp.__init__(self, **kwargs)
+        self.recorded = None
+
+
+class TestConfig(unittest.TestCase):
+    ''' Config tests '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = ConfigCache(os.path.join(self.tmpdir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, content):
+        ''' Write config file '''
+        filename = os.path.join(self.tmpdir, name)
+        with open(filename, 'w') as output:
+            output.write(content)
+        return filename
+
+    def make_app(self, *filenames):
+        ''' Make app using config files and test cache '''
+        app = App()
+        app.CONFIG_FILES = list(filenames)
+        app.CONFIG_CACHE = self.cache.cache_dir
+        return app
+
+    def test_merge(self):
+        ''' Test recursive merge '''
+        self.assertEqual(merge({'a': {'b': 1, 'c': 2}, 'd': 3},
+                               {'a': {'b': 4}, 'd': {'e': 5}}),
+                         {'a': {'b': 4, 'c': 2}, 'd': {'e': 5}})
+
+    def test_load_config(self):
+        ''' Test YAML and JSON files are merged, missing files ignored '''
+        yaml_file = self.write('app.yaml', "top: 1\ndeploy:\n  env: prod\n")
+        json_file = self.write('app.json', json.dumps({'deploy': {'env': 'qa'}}))
+        self.assertEqual(load_config([yaml_file, json_file, '/nonexistent']),
+                         {'top': 1, 'deploy': {'env': 'qa'}})
+
+    def test_invalid_config(self):
+        ''' Test invalid config files raise ValueError '''
+        with self.assertRaises(ValueError):
+            load_file(self.write('list.yaml', "- a\n- b\n"))
+        with self.assertRaises(ValueError):
+            load_file(self.write('bad.json', "{"))
+
+    def test_cache(self):
+        ''' Test parsed config is cached until file changes '''
+        filename = self.write('app.yaml', "key: value\n")
+        self.assertEqual(load_file(filename, self.cache), {'key': 'value'})
+        stamp = (os.stat(filename).st_mtime, os.stat(filename).st_size)
+        # Replace cached data to detect that file is not parsed again
+        self.cache.save(os.path.abspath(filename), stamp, {'key': 'cached'})
+        self.assertEqual(load_file(filename, self.cache), {'key': 'cached'})
+
+        self.write('app.yaml', "key: changed\n")
+        self.assertEqual(load_file(filename, self.cache), {'key': 'changed'})
+
+    def test_path_defaults(self):
+        ''' Test config defaults apply along dispatched path, below explicit args '''
+        filename = self.write('app.yaml', "\n".join([
+            "verbose: true",
+            "deploy:",
+            "  env: prod",
+            "  count: 1",
+            "  app:",
+            "    force: true",
+            "    count: 2",
+            "  db:",
+            "    count: 3",
+            ""]))
+        app = self.make_app(filename)
+        self.assertEqual(app.invoke(['deploy', 'app']), 0)
+        self.assertEqual(app.recorded['env'], 'prod')
+        self.assertEqual(app.recorded['force'], True)
+        self.assertEqual(app.recorded['count'], 2)
+        self.assertNotIn('verbose', app.recorded)
+        self.assertNotIn('db', app.recorded)
+        self.assertEqual(app.context.get('config')['deploy']['env'], 'prod')
+
+        app.invoke(['deploy', '--env', 'qa', 'app', '--count', '5'])
+        self.assertEqual((app.recorded['env'], app.recorded['count']), ('qa', 5))
+
+        app.invoke(['deploy', 'db'])
+        self.assertEqual(app.recorded, {'action': 'deploy', 'deploy_action': 'db',
+                                        'env': 'prod'})
+
+        app.invoke(['status'])
+        self.assertEqual(app.recorded, {'action': 'status'})
+
+    def test_explicit_default_values(self):
+        ''' Test explicit args equal to argument defaults win over config '''
+        filename = self.write('app.yaml', "deploy:\n  env: prod\n  count: 5\n")
+        app = self.make_app(filename)
+        parser = app.build_parser()
+        app.invoke(['deploy', '--env', 'dev', 'app', '--count', '0'], parser)
+        self.assertEqual((app.recorded['env'], app.recorded['count']), ('dev', 0))
+        app.invoke(['deploy', 'app'], parser)
+        self.assertEqual((app.recorded['env'], app.recorded['count']), ('prod', 5))
+
+    def test_no_config(self):
+        ''' Test apps without config files are unaffected '''
+        app = App()
+        app.invoke(['status'])
+        self.assertEqual(app.recorded, {'action': 'status'})
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -1,12 +1,54 @@
 ''' QuickCLI Context '''
+import copy
 import logging
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # pragma: no cover
+    from collections import MutableMapping
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # pragma: no cover
+    ContextVar = None
+
 
 LOG = logging.getLogger(__name__)
 
+# Marker of a key deleted in a child context, or missing
+_DELETED = object()
+
+# Types of values copied into child layer when changed through setdefault()
+_MUTABLE_TYPES = (dict, list, set)
+
+
+class _NullTimer(object):
+    ''' Timer of contexts without an app timer, recording nothing '''
+
+    @staticmethod
+    def phase(name, category=None, args=None):
+        ''' Get a context manager doing nothing '''
+        return _NULL_PHASE
+
+
+class _NullPhase(object):
+    ''' Context manager doing nothing '''
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+_NULL_TIMER = _NullTimer()
+
 
 class QuickCLIContextConfig(object):
     ''' Application Context Config '''
+    __slots__ = ('context', 'config')
+
     PARAMS = {
         'allow_unset': (bool, True),
         'unset_value': (str, '')
@@ -25,12 +67,65 @@ class QuickCLIContextConfig(object):
             "No Such Attribute '%s' in QuickCLIContextConfig" % name)
 
 
+class ContextSlot(object):
+    ''' Holder of current value, isolated per thread and asyncio task
+
+    Uses contextvars where available, falling back to thread locals.
+    '''
+    __slots__ = ('_default', '_var', '_local')
+
+    def __init__(self, name, default=None):
+        ''' Constructor '''
+        self._default = default
+        self._var = ContextVar(name) if ContextVar is not None else None
+        self._local = None
+        if ContextVar is None:
+            import threading
+            self._local = threading.local()
+
+    def get(self):
+        ''' Get current value '''
+        if self._var is not None:
+            return self._var.get(self._default)
+        return getattr(self._local, 'value', self._default)
+
+    def set(self, value):
+        ''' Set current value '''
+        if self._var is not None:
+            self._var.set(value)
+        else:
+            self._local.value = value
+
+    def bind(self, func):
+        ''' Bind func to current value, i.e. to run it in another thread '''
+        value = self.get()
+
+        def bound(*args, **kwargs):
+            ''' Run func with value bound at creation '''
+            self.set(value)
+            return func(*args, **kwargs)
+        return bound
+
+
 class QuickCLIContext(object):
-    ''' Application Context '''
+    ''' Application Context
 
-    def __init__(self, app=None, config=None, **kwargs):
+    Contexts are layered: a child context (see child()) starts out empty
+    and looks up keys it does not have in its parent, while writes and
+    deletes only ever touch its own layer. This makes per-invocation
+    contexts cheap to create, and leaves app defaults and configuration
+    in parent layers unchanged between invocations. Mutable values (dicts,
+    lists and sets) from parent layers returned by setdefault() are copied
+    into the child layer first, so changing them in place is also kept to
+    the child.
+    '''
+    __slots__ = ('_app', '_config', '_parent', '_layer')
+
+    def __init__(self, app=None, config=None, parent=None, **kwargs):
         ''' Constructor for context '''
         self._app = app
+        self._parent = parent
+        self._layer = dict(kwargs)
         config = config if config is not None else {}
         if isinstance(config, QuickCLIContextConfig):
             self._config = config
@@ -40,16 +135,72 @@ class QuickCLIContext(object):
             LOG.warning(
                 "Invalid type for QuickCLIContext config: %s", type(config))
             self._config = QuickCLIContextConfig(self)
-        self.data = dict(kwargs)
+
+    def child(self, **kwargs):
+        ''' Create a child context layered on top of this one '''
+        return QuickCLIContext(self._app, config=self._config, parent=self,
+                               **kwargs)
+
+    def copy(self):
+        ''' Create a flat copy of this context, with its own data '''
+        context = QuickCLIContext(self._app, config=self._config)
+        context._layer = self.flatten()  # pylint: disable=protected-access
+        return context
+
+    @property
+    def parent(self):
+        ''' Get parent context '''
+        return self._parent
+
+    def flatten(self):
+        ''' Get all data visible in this context as a new dict '''
+        layers = []
+        context = self
+        while context is not None:
+            layers.append(context._layer)  # pylint: disable=protected-access
+            context = context._parent  # pylint: disable=protected-access
+        data = {}
+        for layer in reversed(layers):
+            data.update(layer)
+        return dict((key, value) for key, value in data.items()
+                    if value is not _DELETED)
+
+    @property
+    def data(self):
+        ''' Get all data visible in this context, as a mutable mapping
+
+        Writes and deletes go to this context, as they do on the context
+        itself
+        '''
+        return ContextData(self)
+
+    @data.setter
+    def data(self, data):
+        ''' Replace all data visible in this context '''
+        layer = dict.fromkeys(self._parent.flatten() if self._parent is not None
+                              else (), _DELETED)
+        layer.update(data)
+        self._layer = layer
+
+    def _lookup(self, key):
+        ''' Get value of key from first layer that has it, or _DELETED '''
+        context = self
+        while context is not None:
+            layer = context._layer  # pylint: disable=protected-access
+            if key in layer:
+                return layer[key]
+            context = context._parent  # pylint: disable=protected-access
+        return _DELETED
 
     def update(self, context):
         ''' Update context from a dictinary '''
         if context is None:
             return
         if isinstance(context, dict):
-            self.data.update(context)
+            self._layer.update(context)
         else:
-            print("Invalid data type '%s', unable to update context", type(context))
+            LOG.warning("Invalid data type '%s', unable to update context",
+                        type(context))
 
     @property
     def app(self):
@@ -63,57 +214,108 @@ class QuickCLIContext(object):
 
     def set(self, key, value):
         ''' Set value in context '''
-        self.data[key] = value
+        self._layer[key] = value
 
     def setdefault(self, key, value):
         ''' Set value if not already set. Return value '''
-        if key not in self.data:
-            print("initializing %s in context" % key)
-            self.data[key] = value
-        return self.get(key)
+        current = self._lookup(key)
+        if current is _DELETED:
+            LOG.debug("initializing %s in context", key)
+            self._layer[key] = value
+            return value
+        if key not in self._layer and isinstance(current, _MUTABLE_TYPES):
+            # Copy on write, as value may be changed in place
+            current = copy.copy(current)
+            self._layer[key] = current
+        return current
+
+    def span(self, name, **args):
+        ''' Time a user defined span, as a context manager
+
+        Spans are recorded by app timer (if it is enabled), and are shown
+        along with dispatch phases in timings and traces, with args
+        '''
+        timer = getattr(self._app, 'timer', None)
+        if timer is None:
+            timer = _NULL_TIMER
+        return timer.phase(name, 'span', args or None)
 
     def get(self, key, default_value=None):
         ''' Get Value from Context '''
-        value = self.data.get(key, default_value)
-        return value
+        value = self._lookup(key)
+        return default_value if value is _DELETED else value
 
     def __repr__(self):
         ''' Representation of this context '''
-        return "{Context::%s}" % self.data
+        return "{Context::%s}" % self.flatten()
 
     def __getattr__(self, name):
         ''' Get context attribute '''
-        if name in self.data:
-            return self.data.get(name, None)
+        value = self._lookup(name)
+        if value is not _DELETED:
+            return value
         elif self._config.allow_unset:
             return self._config.unset_value
         raise AttributeError("Invalid QuickCLIContext attribute '%s' " % name)
 
     def __len__(self):
         ''' Number of Context Items '''
-        return len(self.data)
+        return len(self.flatten())
 
     def __getitem__(self, key):
         ''' Get item by index key '''
-        return self.data.get(key, self.config.unset_value)
+        return self.get(key, self._config.unset_value)
 
     def __setitem__(self, key, value):
         ''' Set context item by index key '''
-        self.data[key] = value
+        self._layer[key] = value
 
     def __delitem__(self, key):
         ''' Del item by index key '''
-        if key in self.data:
-            del self.data[key]
+        if self._parent is not None and key in self._parent:
+            self._layer[key] = _DELETED
+        else:
+            self._layer.pop(key, None)
 
     def __iter__(self):
         ''' Iterator for context data '''
-        return self.data.__iter__()
+        return iter(self.flatten())
 
     def __contains__(self, item):
         ''' Check if  item is in context '''
-        return item in self.data
+        return self._lookup(item) is not _DELETED
 
     def __missing__(self, item):
         ''' Check if item is not in context '''
         return not self.__contains__(item)
+
+
+class ContextData(MutableMapping):
+    ''' Mutable mapping view of data visible in a QuickCLIContext '''
+    __slots__ = ('_context',)
+
+    def __init__(self, context):
+        ''' Constructor '''
+        self._context = context
+
+    def __getitem__(self, key):
+        if key not in self._context:
+            raise KeyError(key)
+        return self._context.get(key)
+
+    def __setitem__(self, key, value):
+        self._context[key] = value
+
+    def __delitem__(self, key):
+        if key not in self._context:
+            raise KeyError(key)
+        del self._context[key]
+
+    def __iter__(self):
+        return iter(self._context)
+
+    def __len__(self):
+        return len(self._context)
+
+    def __repr__(self):
+        return repr(self._context.flatten())
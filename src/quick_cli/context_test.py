@@ -0,0 +1,151 @@
+''' Unit Tests For QuickCLI Context '''
+
+import logging
+import threading
+import unittest
+
+from .actions import Action
+from .app import QuickCLIApp
+from .context import ContextSlot, QuickCLIContext
+
+
+class TestContext(unittest.TestCase):
+    ''' Context tests '''
+
+    def test_child_layers(self):
+        ''' Test child contexts read through to parents, and write their own layer '''
+        base = QuickCLIContext(None, a=1, b=2)
+        config = base.child(b=3)
+        invocation = config.child()
+        invocation.set('c', 4)
+        invocation['a'] = 5
+
+        self.assertEqual(invocation.get('a'), 5)
+        self.assertEqual(invocation.b, 3)
+        self.assertEqual(invocation['c'], 4)
+        self.assertEqual(invocation.data, {'a': 5, 'b': 3, 'c': 4})
+        self.assertEqual(len(invocation), 3)
+        self.assertEqual(sorted(invocation), ['a', 'b', 'c'])
+        self.assertIs(invocation.parent, config)
+        self.assertEqual(base.data, {'a': 1, 'b': 2})
+        self.assertEqual(config.data, {'a': 1, 'b': 3})
+
+    def test_delete(self):
+        ''' Test deleting in child hides parent value only in child '''
+        base = QuickCLIContext(None, a=1)
+        child = base.child()
+        del child['a']
+        self.assertNotIn('a', child)
+        self.assertIsNone(child.get('a'))
+        self.assertEqual(child.data, {})
+        self.assertEqual(child.setdefault('a', 2), 2)
+        self.assertEqual(base.get('a'), 1)
+
+    def test_setdefault(self):
+        ''' Test setdefault returns existing value, copying mutable parent values '''
+        base = QuickCLIContext(None, a=[], n=1)
+        child = base.child()
+        self.assertIs(child.setdefault('a', None), child.get('a'))
+        child.setdefault('a', None).append(1)
+        self.assertEqual(child.get('a'), [1])
+        self.assertEqual(base.get('a'), [])
+        self.assertEqual(child.setdefault('n', 2), 1)
+        self.assertEqual(child.setdefault('b', 1), 1)
+        self.assertEqual(child.get('b'), 1)
+
+    def test_data(self):
+        ''' Test data is a writable view of context '''
+        base = QuickCLIContext(None, a=1, b=2)
+        child = base.child()
+        child.data['c'] = 3
+        del child.data['a']
+        self.assertEqual(child.data, {'b': 2, 'c': 3})
+        self.assertEqual(child.get('c'), 3)
+        self.assertEqual(base.data, {'a': 1, 'b': 2})
+        with self.assertRaises(KeyError):
+            _ = child.data['a']
+        child.data = {'d': 4}
+        self.assertEqual(dict(child.data), {'d': 4})
+        self.assertEqual(base.data, {'a': 1, 'b': 2})
+
+    def test_copy(self):
+        ''' Test copy flattens layers into independent context '''
+        child = QuickCLIContext(None, a=1).child(b=2)
+        copy = child.copy()
+        copy.set('a', 3)
+        self.assertIsNone(copy.parent)
+        self.assertEqual(copy.data, {'a': 3, 'b': 2})
+        self.assertEqual(child.data, {'a': 1, 'b': 2})
+
+    def test_unset(self):
+        ''' Test unset attributes '''
+        self.assertEqual(QuickCLIContext(None).child().missing, '')
+        context = QuickCLIContext(None, config=dict(allow_unset=False))
+        with self.assertRaises(AttributeError):
+            _ = context.child().missing
+
+
+class TestContextSlot(unittest.TestCase):
+    ''' Context slot tests '''
+
+    def test_threads(self):
+        ''' Test value set in a thread is not seen by others, unless bound '''
+        slot = ContextSlot('test', 'default')
+        slot.set('main')
+        seen = []
+
+        def read():
+            ''' Read value in thread '''
+            seen.append(slot.get())
+            slot.set('thread')
+
+        for target in (read, slot.bind(read)):
+            thread = threading.Thread(target=target)
+            thread.start()
+            thread.join()
+        self.assertEqual(seen, ['default', 'main'])
+        self.assertEqual(slot.get(), 'main')
+
+
+def count(args, wrapper):
+    ''' Count calls in context, waiting for other thread to do the same '''
+    app = wrapper.app
+    app.context.set('calls', app.context.get('calls', 0) + 1)
+    app.barrier.wait()
+    app.results.append((args['name'], app.context.get('calls')))
+    return 0
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    ACTIONS = [Action("count", action=count, args=[dict(flags='name')])]
+
+    def __init__(self, **kwargs):
+        QuickCLIApp.__init__(self, **kwargs)
+        self.results = []
+        self.barrier = threading.Barrier(2) if hasattr(threading, 'Barrier') else None
+
+
+@unittest.skipUnless(hasattr(threading, 'Barrier'), "Requires threading.Barrier")
+class TestConcurrentInvocations(unittest.TestCase):
+    ''' Concurrent invocation tests '''
+
+    def test_concurrent_invocations(self):
+        ''' Test concurrent invocations each see their own context '''
+        app = App(calls=10)
+        parser = app.build_parser()
+        threads = [threading.Thread(target=app.invoke_isolated,
+                                    args=(['count', name], parser))
+                   for name in ('a', 'b')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(app.results), [('a', 11), ('b', 11)])
+        self.assertEqual(app.context.get('calls'), 10)
+        self.assertNotIn('args', app.context)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
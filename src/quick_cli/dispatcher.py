@@ -0,0 +1,111 @@
+''' Fast Path Action Dispatcher '''
+from argparse import _HelpAction, _VersionAction
+import logging
+
+LOG = logging.getLogger(__name__)
+
+
+def _consumed_tokens(parser, token):
+    ''' Get number of tokens following an option token that belong to it
+
+    Returns None if option is not known to the parser, or if it can not be
+    determined without the full argparse machinery.
+    '''
+    option_actions = parser._option_string_actions  # pylint: disable=protected-access
+    if '=' in token:
+        option = token.split('=', 1)[0]
+        return 0 if option in option_actions else None
+
+    action = option_actions.get(token)
+    if action is None:
+        if token[1:2] in parser.prefix_chars or token[:2] not in option_actions:
+            return None
+        # Cluster of single character flags, i.e. -vvv or -cVALUE
+        for pos in range(1, len(token)):
+            action = option_actions.get(token[0] + token[pos])
+            if action is None or _is_exiting_action(action):
+                return None
+            if action.nargs != 0:
+                return 0 if pos < len(token) - 1 else _nargs_count(action)
+        return 0
+    return _nargs_count(action)
+
+
+def _nargs_count(action):
+    ''' Get number of tokens consumed by an action, or None if variable '''
+    if action.nargs == 0:
+        return 0
+    if action.nargs is None:
+        return 1
+    if isinstance(action.nargs, int):
+        return action.nargs
+    return None
+
+
+def _is_exiting_action(action):
+    ''' Check if action is one that prints and exits (--help, --version) '''
+    return isinstance(action, (_HelpAction, _VersionAction))
+
+
+def build_path_parser(app, argv):
+    ''' Build a parser containing only the action path selected by argv
+
+    Walks argv against actions_idx of each level, skipping over that
+    level's options, and builds a sub-parser only for the selected action
+    at each level. Parsing the result is equivalent to parsing with the
+    full parser, but the cost is proportional to the selected path rather
+    than the whole tree.
+
+    Returns None if argv can not be resolved unambiguously (unknown
+    tokens, positional arguments or variable length options before an
+    action, help requests on intermediate levels, etc.), in which case the
+    full parser should be used, so errors and help are reported as usual.
+    '''
+    parser = app.parser()
+    wrapper = app.command
+    level_parser = wrapper.parser_args(parser)
+    pos = 0
+    while True:
+        compiled = wrapper.compiled
+        if not compiled.actions:
+            return parser
+        for action in level_parser._actions:  # pylint: disable=protected-access
+            if not action.option_strings:
+                LOG.debug("Positional arguments in %s, not using fast path",
+                          wrapper.path)
+                return None
+
+        selected = None
+        while pos < len(argv):
+            token = argv[pos]
+            pos += 1
+            if token[:1] in level_parser.prefix_chars and token not in ('-', '--'):
+                action = level_parser._option_string_actions.get(  # pylint: disable=protected-access
+                    token)
+                if action is not None and _is_exiting_action(action):
+                    return None
+                consumed = _consumed_tokens(level_parser, token)
+                if consumed is None:
+                    return None
+                pos += consumed
+                continue
+            selected = wrapper.resolve_action(token)
+            if selected is None:
+                return None
+            break
+
+        subparsers = level_parser.add_subparsers(dest=compiled.dest,
+                                                 help=compiled.actions_desc,
+                                                 title=compiled.actions_title,
+                                                 metavar=compiled.actions_metavar)
+        if selected is None:
+            # No action selected, add stubs for on_missing_action handling
+            for action in compiled.actions:
+                subparsers.add_parser(action.name, **action.subparser_args())
+            return parser
+
+        LOG.debug("Fast path selected %s", selected.path)
+        subparser = subparsers.add_parser(
+            selected.name, **selected.subparser_args())
+        wrapper = selected
+        level_parser = wrapper.parser_args(subparser)
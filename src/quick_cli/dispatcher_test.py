@@ -0,0 +1,72 @@
+''' Unit Tests For Fast Path Dispatcher '''
+
+from argparse import PARSER
+import logging
+import unittest
+
+from .action_wrapper import IS_PYTHON2
+from .actions import Action
+from .app import QuickCLIAppLogged
+from .dispatcher import build_path_parser
+
+
+class App(QuickCLIAppLogged):
+    ''' Test App '''
+    ACTIONS = [
+        Action("one", aliases=['o'], args=[dict(flags='-c', dest='config')],
+               actions=[Action('uno', args=[dict(flags='--x', dest='x')]),
+                        Action('dos')]),
+        Action("two", args=[dict(flags='-t', dest='two_flag'),
+                            dict(flags='files', nargs='*')]),
+    ]
+
+
+class TestDispatcher(unittest.TestCase):
+    ''' Fast Path Dispatcher tests '''
+
+    def assert_same_args(self, argv):
+        ''' Check fast path parser parses argv same as full parser '''
+        app = App()
+        fast = build_path_parser(app, argv)
+        self.assertIsNotNone(fast)
+        full = app.command.configure_parser(app.parser())
+        self.assertEqual(vars(full.parse_args(argv)),
+                         vars(fast.parse_args(argv)))
+        return fast
+
+    def test_same_as_full_parser(self):
+        ''' Test fast path parses same as full parser '''
+        self.assert_same_args(['one', '-c', 'cfg', 'uno', '--x', '1'])
+        self.assert_same_args(['-vvv', 'one', '-c=cfg', 'dos'])
+        self.assert_same_args(['--verbose', 'two', '-t', 'x', 'a', 'b'])
+
+    @unittest.skipIf(IS_PYTHON2, "Sub-commands are required on Python 2")
+    def test_missing_action(self):
+        ''' Test fast path parses argv without action same as full parser '''
+        self.assert_same_args(['one'])
+        self.assert_same_args([])
+
+    @unittest.skipIf(IS_PYTHON2, "Aliases are not supported on Python 2")
+    def test_alias(self):
+        ''' Test fast path parses aliases same as full parser '''
+        self.assert_same_args(['o', '-c', 'cfg', 'uno', '--x', '1'])
+
+    def test_only_path_is_built(self):
+        ''' Test only the selected path is in the parser '''
+        parser = self.assert_same_args(['two'])
+        choices = [action.choices for action in parser._actions  # pylint: disable=protected-access
+                   if action.nargs == PARSER][0]
+        self.assertEqual(list(choices), ['two'])
+
+    def test_fallback(self):
+        ''' Test argv that can not be resolved falls back to full parser '''
+        app = App()
+        self.assertIsNone(build_path_parser(app, ['three']))
+        self.assertIsNone(build_path_parser(app, ['--unknown', 'one']))
+        self.assertIsNone(build_path_parser(app, ['--help']))
+        self.assertIsNone(build_path_parser(app, ['one', 'tres']))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
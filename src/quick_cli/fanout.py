@@ -0,0 +1,254 @@
+''' Parallel Fan-Out Execution
+
+An action may mark one of its args with fan_out=True, i.e.:
+
+    Action("ping", action=ping,
+           args=[dict(flags='hosts', fan_out=True, help="Hosts to ping")])
+
+Action is then executed once per value of that argument, with the value
+in place of the list, and gets a -j/--jobs flag to run items in parallel.
+Items run in a pool of threads, or forked processes if action's fan_out_pool
+property (or FAN_OUT_POOL) is "process". Output of each item is captured
+and written out as a whole once the item completes, so output of parallel
+items does not interleave. Exit code is the largest (by magnitude) exit
+code of all items.
+
+Items of async actions (see quick_cli.aio) run as concurrent tasks in the
+event loop instead, at most jobs at a time, whatever fan_out_pool is.
+'''
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from .context import ContextSlot
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue  # pylint: disable=import-error
+
+LOG = logging.getLogger(__name__)
+
+JOBS_DEST = 'fan_out_jobs'
+POOLS = ('thread', 'process')
+
+
+def arg_dest(flags, arg):
+    ''' Get argparse dest of an argument declared with flags and arg kwargs '''
+    if 'dest' in arg:
+        return arg['dest']
+    if flags and not flags[0].startswith('-'):
+        return flags[0]
+    long_flags = [flag for flag in flags if flag.startswith('--')]
+    flag = long_flags[0] if long_flags else flags[0]
+    return flag.lstrip('-').replace('-', '_')
+
+
+def aggregate_exit_code(codes):
+    ''' Aggregate exit codes of items, picking the largest by magnitude '''
+    return max(codes, key=abs) if codes else 0
+
+
+class _CapturingStream(object):
+    ''' Stream proxy that writes to a per-thread (or task) buffer, if one is set '''
+
+    def __init__(self, stream):
+        ''' Constructor '''
+        self.stream = stream
+        self._buffer = ContextSlot('quick_cli.fanout.buffer')
+
+    def capture(self):
+        ''' Start capturing writes in current thread or task '''
+        self._buffer.set([])
+
+    def release(self):
+        ''' Stop capturing writes in current thread or task, returning captured text '''
+        buffer = self._buffer.get()
+        self._buffer.set(None)
+        return "".join(buffer or [])
+
+    def write(self, data):
+        ''' Write data to capture buffer or underlying stream '''
+        buffer = self._buffer.get()
+        if buffer is None:
+            return self.stream.write(data)
+        buffer.append(data)
+        return len(data)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class FanOut(object):
+    ''' Fan-out execution of a wrapped action over values of an argument '''
+
+    def __init__(self, wrapper, args):
+        ''' Constructor '''
+        self.wrapper = wrapper
+        self.args = args
+        self.dest = wrapper.compiled.fan_out
+        self.items = list(args.get(self.dest) or [])
+        self.jobs = max(1, args.get(JOBS_DEST) or 1)
+        self.pool = wrapper.command.fan_out_pool
+        if self.pool not in POOLS:
+            raise ValueError("Unknown fan-out pool '%s', expected one of: %s" %
+                             (self.pool, ", ".join(POOLS)))
+        self.codes = [None] * len(self.items)
+        self._lock = threading.Lock()
+
+    def item_args(self, item):
+        ''' Get args of execution for a single item '''
+        item_args = dict(self.args)
+        item_args[self.dest] = item
+        return item_args
+
+    def run_item(self, item):
+        ''' Execute action for a single item, returning its exit code '''
+        from .app import exit_code
+        item_args = self.item_args(item)
+        try:
+            return exit_code(self.wrapper.output(
+                item_args, self.wrapper.command.execute(item_args, self.wrapper)))
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception("Failed to execute %s for %r",
+                          self.wrapper.delimited_path(' '), item)
+            return 1
+
+    def report(self, index, code):
+        ''' Record exit code of an item and pass it to the result hook '''
+        self.codes[index] = code
+        self.wrapper.command.on_fan_out_result(
+            self.args, self.wrapper, self.items[index], code)
+
+    def execute(self):
+        ''' Execute action for all items, returning aggregated exit code '''
+        jobs = min(self.jobs, len(self.items))
+        LOG.debug("Fan-out of %s over %d items, %d %s jobs",
+                  self.wrapper.delimited_path(' '), len(self.items), jobs,
+                  self.pool)
+        if jobs <= 1:
+            for index, item in enumerate(self.items):
+                self.report(index, self.run_item(item))
+        elif self.pool == 'process':
+            self._execute_forked(jobs)
+        else:
+            self._execute_threaded(jobs)
+        return aggregate_exit_code(self.codes)
+
+    def _execute_threaded(self, jobs):
+        ''' Execute items in a pool of threads '''
+        items = queue.Queue()
+        for index, item in enumerate(self.items):
+            items.put((index, item))
+        stdout = _CapturingStream(sys.stdout)
+        stderr = _CapturingStream(sys.stderr)
+
+        def worker():
+            ''' Run items until queue is empty '''
+            while True:
+                try:
+                    index, item = items.get_nowait()
+                except queue.Empty:
+                    return
+                stdout.capture()
+                stderr.capture()
+                try:
+                    code = self.run_item(item)
+                finally:
+                    output, errors = stdout.release(), stderr.release()
+                with self._lock:
+                    stdout.stream.write(output)
+                    stdout.stream.flush()
+                    stderr.stream.write(errors)
+                    stderr.stream.flush()
+                    self.report(index, code)
+
+        sys.stdout, sys.stderr = stdout, stderr
+        try:
+            threads = [threading.Thread(target=self.wrapper.app.bind_context(worker))
+                       for _ in range(jobs)]
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.1)
+        finally:
+            sys.stdout, sys.stderr = stdout.stream, stderr.stream
+
+    def _fork_item(self, item, output, errors):
+        ''' Run item in a forked child with stdout and stderr redirected '''
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid:
+            return pid
+        code = 1
+        try:
+            os.dup2(output.fileno(), 1)
+            os.dup2(errors.fileno(), 2)
+            sys.stdout = os.fdopen(os.dup(1), 'w')
+            sys.stderr = os.fdopen(os.dup(2), 'w')
+            code = self.run_item(item)
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code & 0xff)  # pylint: disable=protected-access
+
+    @staticmethod
+    def _copy_output(source, stream):
+        ''' Copy captured output from a temporary file to a stream '''
+        source.seek(0)
+        data = source.read()
+        source.close()
+        if data:
+            stream.flush()
+            buffer = getattr(stream, 'buffer', None)
+            if buffer is not None:
+                buffer.write(data)
+            else:
+                stream.write(data.decode('utf-8', 'replace'))
+            stream.flush()
+
+    @staticmethod
+    def _wait_any(pids):
+        ''' Wait for any of the forked pids to exit, returning (pid, status)
+
+        Other child processes (i.e. started by the app or action) are left
+        alone, so their exit status is not taken from them
+        '''
+        if len(pids) == 1:
+            return os.waitpid(pids[0], 0)
+        delay = 0.001
+        while True:
+            for pid in pids:
+                done, status = os.waitpid(pid, os.WNOHANG)
+                if done:
+                    return done, status
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def _execute_forked(self, jobs):
+        ''' Execute items in forked processes, at most jobs at a time '''
+        pending = list(enumerate(self.items))
+        pending.reverse()
+        running = {}
+        while pending or running:
+            while pending and len(running) < jobs:
+                index, item = pending.pop()
+                output = tempfile.TemporaryFile()
+                errors = tempfile.TemporaryFile()
+                running[self._fork_item(item, output, errors)] = (
+                    index, output, errors)
+            pid, status = self._wait_any(list(running))
+            index, output, errors = running.pop(pid)
+            if os.WIFEXITED(status):
+                code = os.WEXITSTATUS(status)
+            else:
+                code = 128 + os.WTERMSIG(status)
+            self._copy_output(output, sys.stdout)
+            self._copy_output(errors, sys.stderr)
+            self.report(index, code)
@@ -0,0 +1,167 @@
+''' Unit Tests For Fan-Out Execution '''
+
+import logging
+import os
+import sys
+import time
+import unittest
+
+from .actions import Action
+from .app import QuickCLIApp
+from .fanout import arg_dest, aggregate_exit_code
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+def ping(args, wrapper):
+    ''' Write a few lines per host, exit code being length of host name '''
+    for line in range(3):
+        sys.stdout.write("%s %d\n" % (args['hosts'], line))
+        time.sleep(0.001)
+    sys.stderr.write("%s done\n" % args['hosts'])
+    return len(args['hosts']) if args['hosts'] != 'ok' else 0
+
+
+class PingAction(Action):
+    ''' Ping Action, recording fan-out results in app '''
+
+    def on_fan_out_result(self, args, wrapper, item, code):
+        wrapper.app.items.append((item, code))
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    ACTIONS = [
+        PingAction("ping", action=ping,
+                   args=[dict(flags='hosts', fan_out=True)]),
+        PingAction("fork", action=ping, fan_out_pool='process',
+                   args=[dict(flags=['-H', '--host'], dest='hosts',
+                              action='append', fan_out=True)]),
+    ]
+
+    def __init__(self, **kwargs):
+        QuickCLIApp.__init__(self, **kwargs)
+        self.items = []
+
+
+class TestFanOut(unittest.TestCase):
+    ''' Fan-Out tests '''
+
+    def setUp(self):
+        self.saved = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = StringIO(), StringIO()
+
+    def tearDown(self):
+        sys.stdout, sys.stderr = self.saved
+
+    def invoke(self, app, argv):
+        ''' Invoke app, returning exit code, stdout and stderr '''
+        code = app.invoke(argv)
+        return code, sys.stdout.getvalue(), sys.stderr.getvalue()
+
+    def assert_grouped(self, output, hosts):
+        ''' Assert output of each host is not interleaved with others '''
+        lines = output.splitlines()
+        self.assertEqual(len(lines), 3 * len(hosts))
+        groups = [lines[index:index + 3] for index in range(0, len(lines), 3)]
+        self.assertEqual(sorted(group[0].split()[0] for group in groups),
+                         sorted(hosts))
+        for group in groups:
+            host = group[0].split()[0]
+            self.assertEqual(group, ["%s %d" % (host, line) for line in range(3)])
+
+    def test_arg_dest(self):
+        ''' Test dest is derived from flags as argparse does '''
+        self.assertEqual(arg_dest(['hosts'], {}), 'hosts')
+        self.assertEqual(arg_dest(['-H', '--host-name'], {}), 'host_name')
+        self.assertEqual(arg_dest(['-H'], {}), 'H')
+        self.assertEqual(arg_dest(['-H'], {'dest': 'hosts'}), 'hosts')
+
+    def test_aggregate_exit_code(self):
+        ''' Test aggregated exit code '''
+        self.assertEqual(aggregate_exit_code([]), 0)
+        self.assertEqual(aggregate_exit_code([0, 2, 0, 1]), 2)
+        self.assertEqual(aggregate_exit_code([0, -1]), -1)
+
+    def test_sequential(self):
+        ''' Test items run in order without -j '''
+        app = App()
+        code, output, _ = self.invoke(app, ['ping', 'ok', 'abc'])
+        self.assertEqual(code, 3)
+        self.assertEqual(output.splitlines()[0], "ok 0")
+        self.assertEqual(app.items, [('ok', 0), ('abc', 3)])
+
+    def test_threads(self):
+        ''' Test parallel items in threads have grouped output '''
+        app = App()
+        hosts = ['ok', 'a', 'bb', 'ccc', 'dddd']
+        code, output, errors = self.invoke(app, ['ping', '-j', '3'] + hosts)
+        self.assertEqual(code, 4)
+        self.assert_grouped(output, hosts)
+        self.assertEqual(sorted(errors.splitlines()),
+                         sorted("%s done" % host for host in hosts))
+        self.assertEqual(sorted(app.items),
+                         [('a', 1), ('bb', 2), ('ccc', 3), ('dddd', 4), ('ok', 0)])
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "Process pool requires fork")
+    def test_processes(self):
+        ''' Test parallel items in forked processes have grouped output '''
+        app = App()
+        hosts = ['ok', 'a', 'bb', 'ccc']
+        argv = ['fork', '--jobs', '2']
+        for host in hosts:
+            argv.extend(['-H', host])
+        code, output, errors = self.invoke(app, argv)
+        self.assertEqual(code, 3)
+        self.assert_grouped(output, hosts)
+        self.assertEqual(sorted(errors.splitlines()),
+                         sorted("%s done" % host for host in hosts))
+        self.assertEqual(sorted(app.items),
+                         [('a', 1), ('bb', 2), ('ccc', 3), ('ok', 0)])
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "Process pool requires fork")
+    def test_other_children(self):
+        ''' Test exit status of other child processes is left to their owner '''
+        child = os.fork()
+        if child == 0:
+            os._exit(7)  # pylint: disable=protected-access
+        try:
+            code, _, _ = self.invoke(App(), ['fork', '-j', '2', '-H', 'a', '-H', 'bb'])
+        finally:
+            pid, status = os.waitpid(child, 0)
+        self.assertEqual(code, 2)
+        self.assertEqual((pid, os.WEXITSTATUS(status)), (child, 7))
+
+    @unittest.skipIf(sys.version_info < (3, 5), "async actions require Python 3.5+")
+    def test_async(self):
+        ''' Test items of async actions run as tasks with grouped output '''
+        namespace = {'Action': PingAction, 'QuickCLIApp': App, 'sys': sys}
+        exec('''
+import asyncio
+
+async def ping(args, wrapper):
+    for line in range(3):
+        sys.stdout.write("%s %d\\n" % (args['hosts'], line))
+        await asyncio.sleep(0)
+    return len(args['hosts'])
+
+class AsyncApp(QuickCLIApp):
+    ACTIONS = [Action("ping", action=ping, args=[dict(flags='hosts', fan_out=True)])]
+''', namespace)
+        app = namespace['AsyncApp']()
+        hosts = ['a', 'bb', 'ccc']
+        code, output, _ = self.invoke(app, ['ping'] + hosts)
+        self.assertEqual(code, 3)
+        self.assertEqual(app.items, [('a', 1), ('bb', 2), ('ccc', 3)])
+        sys.stdout = StringIO()
+        code, output, _ = self.invoke(namespace['AsyncApp'](), ['ping', '-j', '3'] + hosts)
+        self.assertEqual(code, 3)
+        self.assert_grouped(output, hosts)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
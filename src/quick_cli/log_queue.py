@@ -0,0 +1,151 @@
+''' Queue Based Logging
+
+Log records are put on a queue by a QueueHandler installed on a logger
+(the root logger, by default), and written to the actual handlers (i.e.
+stderr, a log file and a JSON lines file) by a background listener thread,
+so logging calls in action code do not wait for formatting and I/O.
+'''
+import atexit
+import logging
+import os
+
+try:
+    from logging.handlers import QueueHandler, QueueListener
+except ImportError:  # pragma: no cover - Python 2
+    QueueHandler = QueueListener = None
+
+try:
+    import queue
+except ImportError:  # pragma: no cover - Python 2
+    import Queue as queue
+
+LOG = logging.getLogger(__name__)
+
+
+class JsonFormatter(logging.Formatter):
+    ''' Log formatter writing records as JSON objects, one per line '''
+
+    def format(self, record):
+        import json
+        data = {
+            'time': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+            'process': record.process,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc_info'] = record.exc_text
+        return json.dumps(data, default=str, sort_keys=True)
+
+
+def log_handlers(log_file=None, json_file=None, fmt=logging.BASIC_FORMAT,
+                 stream=None):
+    ''' Create handlers for stderr (or stream) and optional log file sinks
+
+    log_file gets records formatted with fmt, like stderr, and json_file
+    gets them as JSON lines (see JsonFormatter)
+    '''
+    handlers = [logging.StreamHandler(stream)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(fmt))
+    if json_file:
+        handler = logging.FileHandler(json_file)
+        handler.setFormatter(JsonFormatter())
+        handlers.append(handler)
+    return handlers
+
+
+class QueueLogging(object):
+    ''' Logger handlers fed through a queue by a background listener thread
+
+    If use_queue is False (or the Python version has no QueueHandler),
+    handlers are installed on the logger directly. Forked children (i.e.
+    fan-out process pool) have no listener thread, so they switch to
+    writing to the handlers directly too.
+    '''
+
+    def __init__(self, handlers, use_queue=True):
+        ''' Constructor '''
+        self.handlers = list(handlers)
+        self.use_queue = use_queue and QueueHandler is not None
+        self.logger = None
+        self.queue = None
+        self.handler = None
+        self.listener = None
+
+    @property
+    def is_running(self):
+        ''' Check if listener thread is running '''
+        return self.listener is not None
+
+    def start(self, logger=None):
+        ''' Install handlers on logger (root logger by default) '''
+        self.logger = logger if logger is not None else logging.getLogger()
+        if not self.use_queue:
+            self._install_handlers()
+            return self
+        self.queue = queue.Queue(-1)
+        self.handler = QueueHandler(self.queue)
+        self.listener = QueueListener(self.queue, *self.handlers,
+                                      respect_handler_level=True)
+        self.listener.start()
+        self.logger.addHandler(self.handler)
+        atexit.register(self.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+        return self
+
+    def _install_handlers(self):
+        ''' Install handlers on logger directly '''
+        for handler in self.handlers:
+            self.logger.addHandler(handler)
+
+    def _remove_queue_handler(self):
+        ''' Replace queue handler on logger with handlers themselves '''
+        self.logger.removeHandler(self.handler)
+        self._install_handlers()
+        self.handler = None
+
+    def _after_fork(self):
+        ''' Write records directly in a forked child '''
+        if self.listener is None:
+            return
+        self.listener = None
+        self.queue = None
+        self._remove_queue_handler()
+
+    def flush(self):
+        ''' Wait until all queued records are written '''
+        if self.listener is not None:
+            self.queue.join()
+        for handler in self.handlers:
+            handler.flush()
+
+    def stop(self):
+        ''' Write queued records and stop listener thread
+
+        Handlers stay installed on the logger directly, so records logged
+        later (i.e. by other exit handlers) are still written
+        '''
+        listener = self.listener
+        if listener is None:
+            return
+        self.listener = None
+        self._remove_queue_handler()
+        listener.stop()
+        for handler in self.handlers:
+            handler.flush()
+
+    def close(self):
+        ''' Stop listener thread, remove and close handlers '''
+        self.stop()
+        if self.logger is not None:
+            for handler in self.handlers:
+                self.logger.removeHandler(handler)
+                handler.close()
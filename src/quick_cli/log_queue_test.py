@@ -0,0 +1,142 @@
+''' Unit Tests For Queue Based Logging '''
+
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+from .actions import Action
+from .app import QuickCLIAppLogged
+from .log_queue import JsonFormatter, QueueHandler, QueueLogging, log_handlers
+
+LOG = logging.getLogger(__name__)
+
+
+class ListHandler(logging.Handler):
+    ''' Handler collecting records and threads they were handled in '''
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record.getMessage(), threading.current_thread()))
+
+
+def chatty(args, wrapper):
+    ''' Log at all levels '''
+    LOG.debug("debug %s", args['count'])
+    LOG.warning("warning %s", args['count'])
+    return 0
+
+
+class App(QuickCLIAppLogged):
+    ''' Test App '''
+    LOG_QUEUE = True
+    ACTIONS = [Action("chatty", action=chatty,
+                      args=[dict(flags='count', type=int)])]
+
+
+@unittest.skipIf(QueueHandler is None, "QueueHandler requires Python 3.2+")
+class TestQueueLogging(unittest.TestCase):
+    ''' Queue based logging tests '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.logger = logging.getLogger('quick_cli.log_queue_test.queue')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_queue(self):
+        ''' Test records are written by listener thread, and after stop '''
+        handler = ListHandler()
+        logging_queue = QueueLogging([handler]).start(self.logger)
+        try:
+            self.assertTrue(logging_queue.is_running)
+            self.logger.info("one %d", 1)
+            logging_queue.flush()
+            self.assertEqual(handler.records[0][0], "one 1")
+            self.assertIsNot(handler.records[0][1], threading.current_thread())
+            logging_queue.stop()
+            self.assertFalse(logging_queue.is_running)
+            self.logger.info("two")
+            self.assertEqual(handler.records[1],
+                             ("two", threading.current_thread()))
+        finally:
+            logging_queue.close()
+        self.assertNotIn(handler, self.logger.handlers)
+
+    def test_no_queue(self):
+        ''' Test handlers are installed directly without queue '''
+        handler = ListHandler()
+        logging_queue = QueueLogging([handler], use_queue=False).start(self.logger)
+        try:
+            self.assertFalse(logging_queue.is_running)
+            self.assertIn(handler, self.logger.handlers)
+        finally:
+            logging_queue.close()
+
+    def test_sinks(self):
+        ''' Test log file and JSON lines sinks '''
+        log_file = os.path.join(self.tmpdir, 'app.log')
+        json_file = os.path.join(self.tmpdir, 'app.jsonl')
+        handlers = log_handlers(log_file, json_file, fmt="%(levelname)s %(message)s",
+                                stream=open(os.devnull, 'w'))
+        logging_queue = QueueLogging(handlers).start(self.logger)
+        try:
+            self.logger.warning("hello %s", "world")
+            logging_queue.flush()
+        finally:
+            logging_queue.close()
+            handlers[0].stream.close()
+        with open(log_file) as source:
+            self.assertEqual(source.read(), "WARNING hello world\n")
+        with open(json_file) as source:
+            record = json.loads(source.readline())
+        self.assertEqual(record['level'], 'WARNING')
+        self.assertEqual(record['message'], 'hello world')
+        self.assertEqual(record['logger'], self.logger.name)
+
+    def test_json_exception(self):
+        ''' Test JSON formatter includes exception '''
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            record = self.logger.makeRecord(self.logger.name, logging.ERROR,
+                                            __file__, 1, "failed", (), sys.exc_info())
+        data = json.loads(JsonFormatter().format(record))
+        self.assertIn("ValueError: bad", data['exc_info'])
+
+    def test_app(self):
+        ''' Test app logs through queue, flushed at end of invocation '''
+        json_file = os.path.join(self.tmpdir, 'app.jsonl')
+        app = App(init_logging=True)
+        app.LOG_JSON_FILE = json_file
+        app.log_handlers = lambda: log_handlers(json_file=json_file,
+                                                stream=open(os.devnull, 'w'))
+        root = logging.getLogger()
+        level = root.level
+        try:
+            self.assertEqual(app.invoke(['chatty', '1']), 0)
+            self.assertEqual(root.level, logging.WARNING)
+            self.assertEqual(app.invoke(['-vvv', 'chatty', '2']), 0)
+            self.assertEqual(root.level, logging.DEBUG)
+        finally:
+            app._log_queue.close()  # pylint: disable=protected-access
+            root.setLevel(level)
+        with open(json_file) as source:
+            messages = [json.loads(line)['message'] for line in source
+                        if json.loads(line)['logger'] == __name__]
+        self.assertEqual(messages, ["warning 1", "debug 2", "warning 2"])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
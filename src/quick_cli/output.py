@@ -0,0 +1,327 @@
+''' Structured Output Formatters
+
+Actions may return (or yield) records instead of an exit code: a dict, a
+generator (or other iterator), a non-empty list or tuple of dicts, or any
+iterable wrapped in Records. Actions with output_fields declare that they
+output records, so any iterable they return is records. Other results, e.g.
+lists of strings, are passed on as before. Records are rendered to stdout by
+a formatter selected by name (see FORMATTERS): "table", "json", "jsonl" or
+"csv".
+
+Records are written as they are produced, through a buffer flushed every
+BUFFER_SIZE characters (or every record, if output is a terminal), so
+generators producing millions of records are never held in memory. If the
+reader of a pipe goes away (i.e. `app list | head`), the generator is
+closed, and exit code is 141, as if killed by SIGPIPE. If the generator
+raises, records produced so far are still written before the error is
+passed on.
+'''
+import errno
+import logging
+import os
+import sys
+
+LOG = logging.getLogger(__name__)
+
+BUFFER_SIZE = 65536
+EXIT_BROKEN_PIPE = 128 + 13
+
+
+try:
+    _TEXT_TYPES = (str, bytes, unicode)
+except NameError:
+    _TEXT_TYPES = (str, bytes)
+
+
+class Records(object):
+    ''' Marker for an iterable to output as records, i.e. a list of strings '''
+
+    def __init__(self, iterable):
+        ''' Constructor '''
+        self.iterable = iterable
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+
+def _is_record(item):
+    ''' Check if list item is a record with named fields '''
+    return isinstance(item, dict) or hasattr(item, '_asdict')
+
+
+def is_records(result, declared=False):
+    ''' Check if an action result is records to output, not an exit code
+
+    If declared is True (action has output_fields), any iterable is records
+    '''
+    if result is None or isinstance(result, (int,) + _TEXT_TYPES):
+        return False
+    if isinstance(result, (dict, Records)):
+        return True
+    if not hasattr(result, '__iter__'):
+        return False
+    if declared or iter(result) is result:
+        return True
+    if isinstance(result, (list, tuple)):
+        return bool(result) and all(_is_record(item) for item in result)
+    return False
+
+
+def as_dict(record):
+    ''' Get record as a dict, for formatters with named columns '''
+    if isinstance(record, dict):
+        return record
+    if hasattr(record, '_asdict'):
+        return record._asdict()
+    return {'value': record}
+
+
+def as_document(record):
+    ''' Get record for JSON formatters, named tuples as objects like in tables '''
+    if hasattr(record, '_asdict'):
+        return record._asdict()
+    return record
+
+
+class BufferedStream(object):
+    ''' Write buffer in front of a text stream '''
+
+    def __init__(self, stream, size=BUFFER_SIZE):
+        ''' Constructor '''
+        self.stream = stream
+        isatty = getattr(stream, 'isatty', None)
+        self.size = 1 if isatty is not None and isatty() else size
+        self._parts = []
+        self._length = 0
+
+    def write(self, text):
+        ''' Write text, flushing if buffer is full '''
+        self._parts.append(text)
+        self._length += len(text)
+        if self._length >= self.size:
+            self.flush()
+
+    def flush(self):
+        ''' Write buffered text to stream '''
+        if self._parts:
+            text = ''.join(self._parts)
+            self._parts = []
+            self._length = 0
+            self.stream.write(text)
+        self.stream.flush()
+
+
+class Formatter(object):
+    ''' Base of record formatters
+
+    begin() is called before the first record (single is True if the
+    result was a single record rather than a sequence), write() for every
+    record and end() after the last one. fields, if given, are the
+    columns (and their order) for formatters with named columns.
+    '''
+
+    def __init__(self, stream, fields=None):
+        ''' Constructor '''
+        self.stream = stream
+        self.fields = list(fields) if fields else None
+
+    def begin(self, single=False):
+        ''' Start output '''
+
+    def write(self, record):
+        ''' Write a record '''
+        raise NotImplementedError()
+
+    def end(self):
+        ''' End output '''
+
+
+class JsonLinesFormatter(Formatter):
+    ''' One JSON document per record, per line '''
+
+    def __init__(self, stream, fields=None):
+        ''' Constructor '''
+        import json
+        Formatter.__init__(self, stream, fields)
+        self.encoder = json.JSONEncoder(default=str)
+
+    def write(self, record):
+        self.stream.write(self.encoder.encode(as_document(record)))
+        self.stream.write("\n")
+
+
+class JsonFormatter(JsonLinesFormatter):
+    ''' JSON array of records, or a JSON object for a single record '''
+
+    def __init__(self, stream, fields=None):
+        ''' Constructor '''
+        JsonLinesFormatter.__init__(self, stream, fields)
+        self.single = False
+        self.count = 0
+
+    def begin(self, single=False):
+        self.single = single
+        if not single:
+            self.stream.write("[")
+
+    def write(self, record):
+        if not self.single:
+            self.stream.write(",\n  " if self.count else "\n  ")
+        self.stream.write(self.encoder.encode(as_document(record)))
+        self.count += 1
+
+    def end(self):
+        if not self.single:
+            self.stream.write("\n]" if self.count else "]")
+        self.stream.write("\n")
+
+
+class CsvFormatter(Formatter):
+    ''' CSV with a header row, columns taken from fields or first record '''
+
+    def __init__(self, stream, fields=None):
+        ''' Constructor '''
+        Formatter.__init__(self, stream, fields)
+        self.writer = None
+
+    def write(self, record):
+        record = as_dict(record)
+        if self.writer is None:
+            import csv
+            self.writer = csv.DictWriter(self.stream, self.fields or list(record),
+                                         extrasaction='ignore', lineterminator='\n')
+            self.writer.writeheader()
+        self.writer.writerow(record)
+
+
+class TableFormatter(Formatter):
+    ''' Text table with aligned columns
+
+    Column widths are computed from the first SAMPLE_SIZE records, which
+    are held back until then, so later records are streamed without
+    re-aligning (wider values just extend their row)
+    '''
+    SAMPLE_SIZE = 100
+    SEPARATOR = "  "
+
+    def __init__(self, stream, fields=None):
+        ''' Constructor '''
+        Formatter.__init__(self, stream, fields)
+        self.pending = []
+        self.widths = None
+
+    def write(self, record):
+        record = as_dict(record)
+        if self.widths is not None:
+            self._write_row([record.get(field, '') for field in self.fields])
+            return
+        self.pending.append(record)
+        if len(self.pending) >= self.SAMPLE_SIZE:
+            self._write_pending()
+
+    def _write_pending(self):
+        ''' Compute columns and widths from pending records and write them '''
+        if self.fields is None:
+            self.fields = []
+            for record in self.pending:
+                self.fields.extend(key for key in record if key not in self.fields)
+        rows = [[record.get(field, '') for field in self.fields]
+                for record in self.pending]
+        self.widths = [len(str(field)) for field in self.fields]
+        for row in rows:
+            self.widths = [max(width, len(str(value)))
+                           for width, value in zip(self.widths, row)]
+        self._write_row(self.fields)
+        self._write_row(['-' * width for width in self.widths])
+        for row in rows:
+            self._write_row(row)
+        self.pending = []
+
+    def _write_row(self, values):
+        ''' Write a row of values, padded to column widths '''
+        cells = [str(value).ljust(width) for value, width in zip(values, self.widths)]
+        self.stream.write(self.SEPARATOR.join(cells).rstrip() + "\n")
+
+    def end(self):
+        if self.widths is None and (self.pending or self.fields):
+            self._write_pending()
+
+
+FORMATTERS = {
+    'table': TableFormatter,
+    'json': JsonFormatter,
+    'jsonl': JsonLinesFormatter,
+    'csv': CsvFormatter,
+}
+
+
+def register_formatter(name, formatter_class):
+    ''' Register a Formatter subclass under a name '''
+    FORMATTERS[name] = formatter_class
+
+
+def _discard_output(stream):
+    ''' Point stream's file descriptor at /dev/null after a broken pipe
+
+    Avoids another broken pipe error when stream is flushed at exit
+    '''
+    try:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, stream.fileno())
+        os.close(devnull)
+    except (AttributeError, ValueError, IOError, OSError):
+        pass
+
+
+def _is_broken_pipe(ex):
+    ''' Check if exception is a write to a pipe closed by its reader '''
+    return isinstance(ex, IOError) and ex.errno == errno.EPIPE
+
+
+def _write_partial(formatter, output):
+    ''' Write records held back by formatter, when producing records failed '''
+    try:
+        formatter.end()
+        output.flush()
+    except Exception as ex:  # pylint: disable=broad-except
+        LOG.debug("Unable to write partial output: %s", ex)
+
+
+def write_records(result, output_format='table', stream=None,
+                  buffer_size=BUFFER_SIZE, fields=None):
+    ''' Write records of an action result, returning exit code
+
+    Returns EXIT_BROKEN_PIPE if stream is a pipe closed by its reader
+    '''
+    try:
+        formatter_class = FORMATTERS[output_format]
+    except KeyError:
+        raise ValueError("Unknown output format '%s', expected one of: %s" % (
+            output_format, ', '.join(sorted(FORMATTERS))))
+    stream = stream if stream is not None else sys.stdout
+    output = BufferedStream(stream, buffer_size)
+    formatter = formatter_class(output, fields)
+    single = isinstance(result, dict)
+    records = iter((result,) if single else result)
+    try:
+        formatter.begin(single)
+        completed = False
+        try:
+            for record in records:
+                formatter.write(record)
+            completed = True
+        finally:
+            if not completed and not _is_broken_pipe(sys.exc_info()[1]):
+                _write_partial(formatter, output)
+        formatter.end()
+        output.flush()
+    except IOError as ex:
+        if ex.errno != errno.EPIPE:
+            raise
+        LOG.debug("Output closed by reader, stopping")
+        close = getattr(records, 'close', None)
+        if close is not None:
+            close()
+        _discard_output(stream)
+        return EXIT_BROKEN_PIPE
+    return 0
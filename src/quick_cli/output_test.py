@@ -0,0 +1,213 @@
+''' Unit Tests For Structured Output Formatters '''
+
+import errno
+import json
+import logging
+import sys
+import unittest
+
+from .actions import Action
+from .app import QuickCLIApp
+from .output import EXIT_BROKEN_PIPE, Records, is_records, write_records
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+RECORDS = [{'name': 'web', 'count': 3}, {'name': 'database', 'count': 12}]
+
+
+class PipeStream(object):
+    ''' Stream accepting limit writes, then failing like a closed pipe '''
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.writes = []
+
+    def write(self, text):
+        if len(self.writes) >= self.limit:
+            raise IOError(errno.EPIPE, "Broken pipe")
+        self.writes.append(text)
+
+    def flush(self):
+        ''' Flush '''
+
+
+class TestOutput(unittest.TestCase):
+    ''' Output formatter tests '''
+
+    def render(self, result, output_format, **kwargs):
+        ''' Render result to a string '''
+        stream = StringIO()
+        self.assertEqual(write_records(result, output_format, stream, **kwargs), 0)
+        return stream.getvalue()
+
+    def test_is_records(self):
+        ''' Test exit codes, messages and other values are not records '''
+        for result in (None, 0, 3, "error", b"error", [], ['a'], ('a', 1), set(RECORDS[0])):
+            self.assertFalse(is_records(result))
+        for result in ({}, RECORDS, tuple(RECORDS), iter(RECORDS), Records(['a'])):
+            self.assertTrue(is_records(result))
+        self.assertTrue(is_records(['a'], declared=True))
+        self.assertFalse(is_records("error", declared=True))
+
+    def test_table(self):
+        ''' Test aligned table '''
+        self.assertEqual(self.render(RECORDS, 'table', fields=['name', 'count']),
+                         "name      count\n"
+                         "--------  -----\n"
+                         "web       3\n"
+                         "database  12\n")
+        self.assertEqual(self.render(RECORDS, 'table', fields=['count']),
+                         "count\n-----\n3\n12\n")
+        self.assertEqual(self.render(['a', 'b'], 'table'),
+                         "value\n-----\na\nb\n")
+
+    def test_json(self):
+        ''' Test JSON array, object and lines '''
+        self.assertEqual(json.loads(self.render(iter(RECORDS), 'json')), RECORDS)
+        self.assertEqual(self.render([], 'json'), "[]\n")
+        self.assertEqual(json.loads(self.render(RECORDS[0], 'json')), RECORDS[0])
+        lines = self.render(RECORDS, 'jsonl').splitlines()
+        self.assertEqual([json.loads(line) for line in lines], RECORDS)
+
+    def test_csv(self):
+        ''' Test CSV with header '''
+        self.assertEqual(self.render(RECORDS, 'csv', fields=['name', 'count']),
+                         "name,count\nweb,3\ndatabase,12\n")
+
+    def test_failing_generator(self):
+        ''' Test records held back are written when generator fails '''
+        def generate():
+            ''' Generate records, then fail '''
+            for record in RECORDS:
+                yield record
+            raise RuntimeError("failed")
+        for output_format, expected in (
+                ('table', "name      count\n--------  -----\nweb       3\n"
+                          "database  12\n"),
+                ('csv', "name,count\nweb,3\ndatabase,12\n")):
+            stream = StringIO()
+            with self.assertRaises(RuntimeError):
+                write_records(generate(), output_format, stream, fields=['name', 'count'])
+            self.assertEqual(stream.getvalue(), expected)
+
+    def test_named_tuples(self):
+        ''' Test named tuples have the same fields in all formats '''
+        from collections import namedtuple
+        Service = namedtuple('Service', ['name', 'count'])
+        services = [Service('web', 3), Service('database', 12)]
+        self.assertEqual(json.loads(self.render(services, 'json')), RECORDS)
+        lines = self.render(services, 'jsonl').splitlines()
+        self.assertEqual([json.loads(line) for line in lines], RECORDS)
+        self.assertEqual(self.render(services, 'csv'), "name,count\nweb,3\ndatabase,12\n")
+
+    def test_unknown_format(self):
+        ''' Test unknown format is rejected '''
+        with self.assertRaises(ValueError):
+            write_records(RECORDS, 'xml', StringIO())
+
+    def test_streaming(self):
+        ''' Test records are written while generator is running '''
+        stream = StringIO()
+        seen = []
+
+        def generate():
+            ''' Generate records, recording output written so far '''
+            for index in range(5):
+                seen.append(len(stream.getvalue()))
+                yield {'index': index}
+        write_records(generate(), 'jsonl', stream, buffer_size=20)
+        self.assertEqual(seen[0], 0)
+        self.assertGreater(seen[-1], 0)
+        self.assertEqual(len(stream.getvalue().splitlines()), 5)
+
+    def test_broken_pipe(self):
+        ''' Test closed pipe stops generator with exit code 141 '''
+        state = {'produced': 0, 'closed': False}
+
+        def generate():
+            ''' Generate endless records '''
+            try:
+                while True:
+                    state['produced'] += 1
+                    yield {'index': state['produced']}
+            finally:
+                state['closed'] = True
+        stream = PipeStream(2)
+        self.assertEqual(write_records(generate(), 'jsonl', stream, buffer_size=1),
+                         EXIT_BROKEN_PIPE)
+        self.assertTrue(state['closed'])
+        self.assertLess(state['produced'], 5)
+
+
+def services(args, wrapper):
+    ''' List services '''
+    for record in RECORDS:
+        yield record
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    OUTPUT_FORMAT_FLAG = '--output-format'
+    ACTIONS = [Action("services", action=services, output_fields=['name']),
+               Action("fail", action=lambda args, wrapper: 4),
+               Action("names", action=lambda args, wrapper: ['web', 'database']),
+               Action("declared", action=lambda args, wrapper: ['web', 'database'],
+                      output_fields=[])]
+
+
+class TestAppOutput(unittest.TestCase):
+    ''' App output tests '''
+
+    def setUp(self):
+        self.saved_stdout = sys.stdout
+        sys.stdout = StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.saved_stdout
+
+    def test_output(self):
+        ''' Test action records are written in selected format '''
+        app = App()
+        self.assertEqual(app.invoke(['services']), 0)
+        self.assertEqual(sys.stdout.getvalue(), "name\n--------\nweb\ndatabase\n")
+        sys.stdout = StringIO()
+        self.assertEqual(app.invoke(['--output-format', 'jsonl', 'services']), 0)
+        lines = sys.stdout.getvalue().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], RECORDS)
+
+    def test_undeclared(self):
+        ''' Test lists of plain values are only records if declared '''
+        app = App()
+        self.assertEqual(app.invoke(['names']), ['web', 'database'])
+        self.assertEqual(app.invoke(['--output-format', 'jsonl', 'declared']), 0)
+        self.assertEqual(sys.stdout.getvalue(), '"web"\n"database"\n')
+
+    def test_flag_is_opt_in(self):
+        ''' Test apps without OUTPUT_FORMAT_FLAG keep their own output_format '''
+
+        class OwnFlagApp(QuickCLIApp):
+            ''' Test App with own output format flag '''
+            ACTIONS = [Action("services", action=services)]
+            OUTPUT_FORMAT = 'jsonl'
+
+            def parser(self):
+                parser = QuickCLIApp.parser(self)
+                parser.add_argument('--output-format', dest='output_format')
+                return parser
+        app = OwnFlagApp()
+        self.assertEqual(app.invoke(['--output-format', 'xml', 'services']), 0)
+        lines = sys.stdout.getvalue().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], RECORDS)
+
+    def test_exit_code(self):
+        ''' Test exit codes are passed through '''
+        self.assertEqual(App().invoke(['fail']), 4)
+        self.assertEqual(sys.stdout.getvalue(), "")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,219 @@
+''' QuickCLI Argument Parser '''
+from argparse import ArgumentError, ArgumentParser, _SubParsersAction, _VersionAction
+import logging
+
+LOG = logging.getLogger(__name__)
+
+
+def resolve(value):
+    ''' Resolve a lazy value, given as a callable with no arguments '''
+    return value() if callable(value) else value
+
+
+class LazyText(object):
+    ''' Text computed on first use, by calling func with no arguments
+
+    Used for help strings, which are only needed for help output. Behaves
+    enough like a str for plain argparse formatters. Pickles as plain text
+    once computed, otherwise along with func (which must then be
+    picklable), so caching parsers does not compute it.
+    '''
+    __slots__ = ('_func', '_text')
+
+    def __init__(self, func):
+        ''' Constructor '''
+        self._func = func
+        self._text = None
+
+    def __call__(self):
+        ''' Get text, computing it if needed '''
+        if self._func is not None:
+            self._text = self._func()
+            self._func = None
+        return self._text
+
+    def __str__(self):
+        return str(self())
+
+    def __mod__(self, values):
+        return self() % values
+
+    def __contains__(self, text):
+        return text in self()
+
+    def __bool__(self):
+        return bool(self())
+
+    __nonzero__ = __bool__
+
+    def __getattr__(self, name):
+        return getattr(self(), name)
+
+    def __reduce__(self):
+        if self._func is None:
+            return (str, (self._text,))
+        return (LazyText, (self._func,))
+
+
+class QuickCLISubParsersAction(_SubParsersAction):
+    ''' Sub-parsers action passing help cache on to sub-parsers
+
+    If abbreviations is True, a sub-parser may also be selected by a unique
+    prefix of its name or alias (i.e. "dep" for "deploy"). Invalid choices
+    are reported with the closest names (see quick_cli.trie.Trie.suggest),
+    rather than a list of all choices.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        ''' Constructor '''
+        self.help_cache = kwargs.pop('help_cache', None)
+        self.abbreviations = kwargs.pop('abbreviations', False)
+        self._trie = None
+        _SubParsersAction.__init__(self, *args, **kwargs)
+
+    def add_parser(self, name, **kwargs):
+        if self.help_cache is not None:
+            kwargs.setdefault('help_cache', self.help_cache)
+        if self.abbreviations:
+            kwargs.setdefault('abbreviations', self.abbreviations)
+        self._trie = None
+        return _SubParsersAction.add_parser(self, name, **kwargs)
+
+    @property
+    def trie(self):
+        ''' Get trie of sub-parser names and aliases, to their parser's name '''
+        if self._trie is None:
+            from .trie import Trie
+            names = {}
+            self._trie = Trie((key, names.setdefault(id(parser), key))
+                              for key, parser in self._name_parser_map.items())
+        return self._trie
+
+    def resolve(self, name):
+        ''' Get name of sub-parser selected by name, or None if there is none '''
+        if name in self._name_parser_map:
+            return name
+        if self.abbreviations:
+            return self.trie.unique(name)
+        return None
+
+    def invalid_choice_message(self, name):
+        ''' Get error message for a name not selecting any sub-parser '''
+        if self.abbreviations:
+            matches = self.trie.matches(name)
+            if len(matches) > 1:
+                return "ambiguous choice: %r could match %s" % (
+                    name, ', '.join(map(repr, matches)))
+        suggestions = self.trie.suggest(name)
+        if suggestions:
+            return "invalid choice: %r (did you mean %s?)" % (
+                name, ' or '.join(map(repr, suggestions)))
+        return "invalid choice: %r (choose from %s)" % (
+            name, ', '.join(map(repr, self._name_parser_map)))
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        name = self.resolve(values[0])
+        if name is not None and name != values[0]:
+            LOG.debug("Expanded abbreviation '%s' to '%s'", values[0], name)
+            values = [name] + list(values[1:])
+        return _SubParsersAction.__call__(self, parser, namespace, values,
+                                          option_string)
+
+
+class LazyVersionAction(_VersionAction):
+    ''' Version action, whose version may be a callable resolved when used '''
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        self.version = resolve(self.version)
+        return _VersionAction.__call__(self, parser, namespace, values,
+                                       option_string)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['version'] = resolve(self.version)
+        return state
+
+
+class QuickCLIArgumentParser(ArgumentParser):
+    ''' ArgumentParser with lazy description, epilog and help strings
+
+    Description and epilog may be given as callables, and argument help as
+    LazyText, which are resolved (once) only when they are needed, i.e. for
+    --help output.
+
+    If help_cache (see quick_cli.parser_cache.HelpCache) is given, it is
+    passed on to sub-parsers, and rendered help is cached in it by prog.
+
+    If abbreviations is True, sub-parsers may be selected by unique
+    prefixes of their names (see QuickCLISubParsersAction).
+    '''
+
+    def __init__(self, *args, **kwargs):
+        ''' Constructor '''
+        self.help_cache = kwargs.pop('help_cache', None)
+        self.abbreviations = kwargs.pop('abbreviations', False)
+        ArgumentParser.__init__(self, *args, **kwargs)
+        self.register('action', 'parsers', QuickCLISubParsersAction)
+
+    def add_subparsers(self, **kwargs):
+        if self.help_cache is not None:
+            kwargs.setdefault('help_cache', self.help_cache)
+        if self.abbreviations:
+            kwargs.setdefault('abbreviations', self.abbreviations)
+        return ArgumentParser.add_subparsers(self, **kwargs)
+
+    def _check_value(self, action, value):
+        if isinstance(action, QuickCLISubParsersAction):
+            if action.resolve(value) is None:
+                raise ArgumentError(action, action.invalid_choice_message(value))
+            return
+        ArgumentParser._check_value(self, action, value)
+
+    @property
+    def description(self):
+        ''' Get description, resolving it if needed '''
+        self._description = resolve(self._description)
+        return self._description
+
+    @description.setter
+    def description(self, value):
+        ''' Set description, or callable returning it '''
+        self._description = value
+
+    @property
+    def epilog(self):
+        ''' Get epilog, resolving it if needed '''
+        self._epilog = resolve(self._epilog)
+        return self._epilog
+
+    @epilog.setter
+    def epilog(self, value):
+        ''' Set epilog, or callable returning it '''
+        self._epilog = value
+
+    def _resolve_help(self):
+        ''' Resolve lazy help strings of arguments and sub-parsers '''
+        # pylint: disable=protected-access
+        for action in self._actions:
+            if isinstance(action.help, LazyText):
+                action.help = action.help()
+            for choice in getattr(action, '_choices_actions', ()):
+                if isinstance(choice.help, LazyText):
+                    choice.help = choice.help()
+
+    def format_help(self):
+        cache = self.help_cache
+        defaults = self._defaults
+        text = cache.load(self.prog, defaults) if cache is not None else None
+        if text is None:
+            self._resolve_help()
+            text = ArgumentParser.format_help(self)
+            if cache is not None:
+                cache.save(self.prog, text, defaults)
+        return text
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_description'] = self.description
+        state['_epilog'] = self.epilog
+        return state
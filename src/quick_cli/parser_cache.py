@@ -0,0 +1,309 @@
+''' Persistent On-Disk Cache For Built Argument Parsers '''
+import argparse
+import hashlib
+import logging
+import os
+import os.path
+import pickle
+import sys
+
+from .actions import ActionRef
+
+LOG = logging.getLogger(__name__)
+
+REBUILD_ENV = 'QUICKCLI_REBUILD_CACHE'
+
+
+def default_cache_dir():
+    ''' Get default cache directory for QuickCLI '''
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'quick_cli')
+
+
+def _identity(string):
+    ''' Replacement for argparse's local identity type function '''
+    return string
+
+
+def _is_argparse_identity(obj):
+    ''' Check if object is argparse's (unpicklable) local identity function '''
+    return (callable(obj) and getattr(obj, '__module__', None) == 'argparse' and
+            getattr(obj, '__name__', None) == 'identity')
+
+
+class _ParserPickler(pickle.Pickler):
+    ''' Pickler that can handle argparse internals '''
+
+    def persistent_id(self, obj):  # pylint: disable=method-hidden
+        if obj is argparse.SUPPRESS:
+            # argparse checks for SUPPRESS by identity
+            return 'argparse.SUPPRESS'
+        if _is_argparse_identity(obj):
+            return 'argparse.identity'
+        return None
+
+
+class _ParserUnpickler(pickle.Unpickler):
+    ''' Unpickler that can handle argparse internals '''
+
+    def persistent_load(self, pid):  # pylint: disable=method-hidden
+        if pid == 'argparse.SUPPRESS':
+            return argparse.SUPPRESS
+        if pid == 'argparse.identity':
+            return _identity
+        raise pickle.UnpicklingError("Unsupported persistent id: %s" % pid)
+
+
+def _module_file(name):
+    ''' Get source file of a module, without importing it if possible '''
+    module = sys.modules.get(name)
+    if module is not None:
+        return getattr(module, '__file__', None)
+    try:
+        from importlib.util import find_spec
+        spec = find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    return spec.origin if spec is not None else None
+
+
+def _file_stamp(filename):
+    ''' Get a (mtime, size) stamp for a file, if it exists '''
+    try:
+        stat = os.stat(filename)
+    except (OSError, TypeError):
+        return None
+    return (stat.st_mtime, stat.st_size)
+
+
+def _stable_repr(value):
+    ''' Get repr of a declared value that is the same across processes
+
+    Functions and classes are given by their import path. Objects without
+    a repr of their own keep their address, which makes fingerprints
+    differ, so caches are (safely) not used for them.
+    '''
+    if isinstance(value, dict):
+        return "{%s}" % ", ".join("%s: %s" % (_stable_repr(key), _stable_repr(value[key]))
+                                  for key in sorted(value, key=repr))
+    if isinstance(value, (list, tuple)):
+        return "[%s]" % ", ".join(_stable_repr(item) for item in value)
+    name = getattr(value, '__qualname__', None) or getattr(value, '__name__', None)
+    module = getattr(value, '__module__', None)
+    if callable(value) and name and module:
+        return "%s:%s" % (module, name)
+    return repr(value)
+
+
+def _action_definition(action):
+    ''' Get stable repr of action's properties and registered arguments '''
+    # pylint: disable=protected-access
+    return _stable_repr([action.name, action.aliases, getattr(action, '_properties', None),
+                         getattr(action, '_args', None)])
+
+
+def _action_sources(action, path):
+    ''' Generate (path, definition, source, module) of action and its descendants
+
+    definition covers name, aliases, properties (i.e. desc) and registered
+    arguments (flags, help...) of the action. Works on actions as declared,
+    without wrapping or compiling them, and without descending into (or
+    importing) ActionRef targets
+    '''
+    if isinstance(action, ActionRef):
+        yield path, _action_definition(action), action.target, action.target_module
+        return
+    cls = action.__class__
+    yield (path, _action_definition(action), "%s:%s" % (cls.__module__, cls.__name__),
+           cls.__module__)
+    for sub_action in action.actions:
+        for item in _action_sources(sub_action, path + [sub_action.name]):
+            yield item
+
+
+def app_fingerprint(app, salt=None):
+    ''' Compute fingerprint of application and its action tree
+
+    Fingerprint covers Python version, application name and version, name,
+    aliases, properties, arguments and class (or ActionRef target) of every
+    action, so changes to actions declared anywhere are detected, and mtime
+    and size of every module defining those classes. ActionRef targets are
+    not imported, their module is stamped instead, so the fingerprint is
+    the same whether or not they were resolved.
+    '''
+    digest = hashlib.sha1()
+    modules = set([__name__, 'quick_cli.app', 'quick_cli.action_wrapper',
+                   'quick_cli.actions'])
+    digest.update(repr((salt, sys.version, app.info.program_name,
+                        app.info.program_version,
+                        getattr(app, 'ABBREVIATIONS', False))).encode('utf-8'))
+    for path, definition, source, module in _action_sources(app, []):
+        modules.add(module)
+        digest.update(repr((path, definition, source)).encode('utf-8'))
+    for name in sorted(modules):
+        stamp = _file_stamp(_module_file(name))
+        digest.update(repr((name, stamp)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ParserCache(object):
+    ''' Cache of a fully built parser for a QuickCLIApp
+
+    Cache entry is keyed by cache format version and app_fingerprint().
+    Any mismatch (or an unreadable cache file) causes the parser to be
+    rebuilt and the cache to be rewritten. Set QUICKCLI_REBUILD_CACHE
+    environment variable, or call clear(), to force a rebuild.
+
+    Note that on a cache hit, neither QuickCLIApp.parser() nor any
+    parser_args() is called. Trees generated dynamically at runtime should
+    bump program_version when they change, or not use the cache. On
+    Python 2, argparse parsers can not be pickled, so nothing is cached.
+    '''
+    FORMAT_VERSION = 1
+
+    def __init__(self, app, cache_dir=None):
+        ''' Constructor '''
+        self.app = app
+        self.cache_dir = cache_dir if cache_dir else default_cache_dir()
+        self._fingerprint = None
+
+    @property
+    def filename(self):
+        ''' Get cache file name '''
+        main_file = getattr(sys.modules.get('__main__'), '__file__', '')
+        key = hashlib.sha1(repr((main_file, self.app.__class__.__module__,
+                                 self.app.__class__.__name__)).encode('utf-8'))
+        return os.path.join(self.cache_dir, "%s-%s.parser" % (
+            self.app.info.program_name, key.hexdigest()[:12]))
+
+    @property
+    def fingerprint(self):
+        ''' Get fingerprint of application and its action tree '''
+        if self._fingerprint is None:
+            self._fingerprint = app_fingerprint(self.app, self.FORMAT_VERSION)
+        return self._fingerprint
+
+    def load(self):
+        ''' Load parser from cache. Return None if missing or stale '''
+        if os.environ.get(REBUILD_ENV):
+            LOG.debug("Parser cache rebuild forced by %s", REBUILD_ENV)
+            return None
+        try:
+            with open(self.filename, 'rb') as cache_file:
+                version, fingerprint, parser = _ParserUnpickler(
+                    cache_file).load()
+        except (IOError, OSError):
+            return None
+        except Exception as ex:  # pylint: disable=broad-except
+            LOG.debug("Ignoring unreadable parser cache %s: %s",
+                      self.filename, ex)
+            return None
+        if version != self.FORMAT_VERSION or fingerprint != self.fingerprint:
+            LOG.debug("Parser cache %s is stale", self.filename)
+            return None
+        return parser
+
+    def save(self, parser):
+        ''' Save parser to cache. Return True if saved '''
+        filename = self.filename
+        tmp_filename = "%s.%s.tmp" % (filename, os.getpid())
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(tmp_filename, 'wb') as cache_file:
+                _ParserPickler(cache_file, pickle.HIGHEST_PROTOCOL).dump(
+                    (self.FORMAT_VERSION, self.fingerprint, parser))
+            os.rename(tmp_filename, filename)
+            return True
+        except Exception as ex:  # pylint: disable=broad-except
+            LOG.debug("Unable to save parser cache %s: %s", filename, ex)
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            return False
+
+    def clear(self):
+        ''' Remove cache file '''
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+
+def _help_width():
+    ''' Get terminal width, that argparse formats help for '''
+    try:
+        import shutil
+        return shutil.get_terminal_size().columns
+    except (ImportError, AttributeError):
+        return os.environ.get('COLUMNS')
+
+
+class HelpCache(object):
+    ''' Cache of rendered help text of an app's parsers
+
+    Entries are keyed by app_fingerprint(), parser prog (which identifies
+    the action path), defaults set on the parser (i.e. from config files,
+    see quick_cli.config) and terminal width. Call clear() to remove entries,
+    including stale ones left behind by earlier versions of the app.
+    '''
+    FORMAT_VERSION = 1
+
+    def __init__(self, app, cache_dir=None):
+        ''' Constructor '''
+        self.app = app
+        self.cache_dir = cache_dir if cache_dir else default_cache_dir()
+        self._fingerprint = None
+
+    @property
+    def help_dir(self):
+        ''' Get directory holding help entries '''
+        return os.path.join(self.cache_dir, 'help')
+
+    @property
+    def fingerprint(self):
+        ''' Get fingerprint of application and its action tree '''
+        if self._fingerprint is None:
+            self._fingerprint = app_fingerprint(
+                self.app, ('help', self.FORMAT_VERSION))
+        return self._fingerprint
+
+    def filename(self, prog, defaults=None):
+        ''' Get cache file name for help of a parser, with defaults set on it '''
+        key = hashlib.sha1(repr((self.fingerprint, prog, _stable_repr(defaults or {}),
+                                 _help_width())).encode('utf-8')).hexdigest()
+        return os.path.join(self.help_dir, "%s.txt" % key[:20])
+
+    def load(self, prog, defaults=None):
+        ''' Load rendered help. Return None if missing '''
+        try:
+            with open(self.filename(prog, defaults), 'rb') as cache_file:
+                return cache_file.read().decode('utf-8')
+        except (IOError, OSError):
+            return None
+
+    def save(self, prog, text, defaults=None):
+        ''' Save rendered help. Return True if saved '''
+        filename = self.filename(prog, defaults)
+        tmp_filename = "%s.%s.tmp" % (filename, os.getpid())
+        try:
+            if not os.path.isdir(self.help_dir):
+                os.makedirs(self.help_dir)
+            with open(tmp_filename, 'wb') as cache_file:
+                cache_file.write(text.encode('utf-8'))
+            os.rename(tmp_filename, filename)
+            return True
+        except Exception as ex:  # pylint: disable=broad-except
+            LOG.debug("Unable to save help cache %s: %s", filename, ex)
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            return False
+
+    def clear(self):
+        ''' Remove all cached help '''
+        if os.path.isdir(self.help_dir):
+            for name in os.listdir(self.help_dir):
+                os.remove(os.path.join(self.help_dir, name))
+
+    def __getstate__(self):
+        # Pickled with cached parsers, which do not need the app
+        return {'app': None, 'cache_dir': self.cache_dir,
+                '_fingerprint': self.fingerprint}
@@ -0,0 +1,171 @@
+''' Unit Tests For Parser Cache '''
+
+from argparse import PARSER
+import logging
+import os
+import shutil
+import tempfile
+import sys
+import unittest
+
+from .actions import Action, ActionRef
+from .app import QuickCLIApp
+from .parser_cache import ParserCache, REBUILD_ENV, app_fingerprint
+
+IS_PYTHON2 = sys.version_info[0] == 2
+
+
+def build_app(cache_dir, actions=None, help_cache=None):
+    ''' Build an app using parser cache '''
+    class App(QuickCLIApp):
+        ''' Test App '''
+        PARSER_CACHE = cache_dir
+        HELP_CACHE = help_cache
+        ACTIONS = actions if actions is not None else [
+            Action("one", aliases=['o'], args=[
+                dict(flags='-n', dest='count', type=int, default=1)]),
+            Action("two")
+        ]
+    return App(program_name="cached")
+
+
+class TestParserCache(unittest.TestCase):
+    ''' Parser Cache tests '''
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        os.environ.pop(REBUILD_ENV, None)
+
+    @unittest.skipIf(IS_PYTHON2, "argparse parsers can not be pickled on Python 2")
+    def test_round_trip(self):
+        ''' Test cached parser parses same as built parser '''
+        app = build_app(self.cache_dir)
+        built = app.build_parser()
+        self.assertTrue(os.path.exists(app.parser_cache.filename))
+
+        cached = build_app(self.cache_dir).parser_cache.load()
+        self.assertIsNotNone(cached)
+        argv = ['o', '-n', '5']
+        self.assertEqual(vars(built.parse_args(argv)),
+                         vars(cached.parse_args(argv)))
+        self.assertEqual(built.format_help(), cached.format_help())
+
+    def test_stale_on_tree_change(self):
+        ''' Test cache is invalidated when action tree changes '''
+        build_app(self.cache_dir).build_parser()
+        app = build_app(self.cache_dir, actions=[Action("three")])
+        self.assertIsNone(app.parser_cache.load())
+
+    def test_stale_on_definition_change(self):
+        ''' Test fingerprint covers arguments, help and descriptions of actions '''
+        def fingerprint(args, desc="One"):
+            ''' Get fingerprint of app with action one having args '''
+            return app_fingerprint(build_app(self.cache_dir, actions=[
+                Action("one", desc=desc, args=args),
+                ActionRef("lazy", "quick_cli.no_such_module:Action", desc="Lazy")]))
+        base = [dict(flags='-n', type=int, help="Count")]
+        self.assertEqual(fingerprint(base), fingerprint(base))
+        for args in ([dict(flags='-n', type=int, help="Number")],
+                     [dict(flags='-n', type=str, help="Count")],
+                     base + [dict(flags='--beta')]):
+            self.assertNotEqual(fingerprint(args), fingerprint(base))
+        self.assertNotEqual(fingerprint(base, desc="Other"), fingerprint(base))
+
+    def test_fingerprint_is_lazy(self):
+        ''' Test fingerprint neither compiles actions nor imports references '''
+        app = build_app(self.cache_dir, actions=[
+            Action("one", actions=[Action("nested")]),
+            ActionRef("lazy", "quick_cli.no_such_module:Action")])
+        fingerprint = app_fingerprint(app)
+        self.assertIsNone(app.command._compiled)  # pylint: disable=protected-access
+        self.assertNotIn('quick_cli.no_such_module', sys.modules)
+        self.assertNotEqual(app_fingerprint(build_app(self.cache_dir)), fingerprint)
+
+    @unittest.skipIf(IS_PYTHON2, "argparse parsers can not be pickled on Python 2")
+    def test_unresolved_help(self):
+        ''' Test caching parser does not import references for their help '''
+        actions = [ActionRef("lazy", "quick_cli.no_such_module:Action"), Action("two")]
+        app = build_app(self.cache_dir, actions=actions)
+        cache = ParserCache(app, self.cache_dir)
+        self.assertTrue(cache.save(app.command.configure_parser(app.parser(), ['two'])))
+        cached = build_app(self.cache_dir, actions=actions).parser_cache.load()
+        self.assertNotIn('quick_cli.no_such_module', sys.modules)
+        self.assertEqual(vars(cached.parse_args(['two'])), {'action': 'two'})
+        with self.assertRaises(ImportError):
+            cached.format_help()
+
+    def test_force_rebuild(self):
+        ''' Test cache rebuild can be forced '''
+        build_app(self.cache_dir).build_parser()
+        os.environ[REBUILD_ENV] = '1'
+        self.assertIsNone(build_app(self.cache_dir).parser_cache.load())
+
+    def test_clear(self):
+        ''' Test clearing cache '''
+        app = build_app(self.cache_dir)
+        app.build_parser()
+        app.parser_cache.clear()
+        self.assertFalse(os.path.exists(app.parser_cache.filename))
+
+    def test_unpicklable_not_saved(self):
+        ''' Test parser with unpicklable types is not cached '''
+        app = build_app(self.cache_dir, actions=[
+            Action("one", args=[dict(flags='-x', type=lambda x: x)])])
+        cache = ParserCache(app, self.cache_dir)
+        self.assertFalse(cache.save(app.command.configure_parser(app.parser())))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+class TestHelpCache(unittest.TestCase):
+    ''' Help Cache tests '''
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    @unittest.skipIf(IS_PYTHON2, "argparse parsers can not be pickled on Python 2")
+    def test_cached_help(self):
+        ''' Test rendered help is cached per prog, also with cached parser '''
+        app = build_app(None, help_cache=self.cache_dir)
+        parser = app.build_parser()
+        help_text = parser.format_help()
+        self.assertIn("{action}", help_text)
+        filename = app.help_cache.filename(parser.prog)
+        self.assertTrue(os.path.exists(filename))
+        with open(filename, 'w') as cache_file:
+            cache_file.write("cached help")
+        self.assertEqual(parser.format_help(), "cached help")
+        self.assertNotEqual(app.help_cache.filename("cached one"), filename)
+
+        app = build_app(self.cache_dir, help_cache=self.cache_dir)
+        app.build_parser()
+        cached = build_app(self.cache_dir, help_cache=self.cache_dir).build_parser()
+        self.assertIsNone(cached.help_cache.app)
+        self.assertEqual(cached.format_help(), "cached help")
+
+        app.help_cache.clear()
+        self.assertEqual(cached.format_help(), help_text)
+
+    def test_defaults_in_key(self):
+        ''' Test help is cached per defaults set on parser, i.e. from config '''
+        app = build_app(None, help_cache=self.cache_dir, actions=[
+            Action("one", args=[dict(flags='-n', dest='count', default=1,
+                                     help="Count (default: %(default)s)")])])
+        parser = app.build_parser()
+        sub_parser = [action for action in parser._actions  # pylint: disable=protected-access
+                      if action.nargs == PARSER][0].choices['one']
+        self.assertIn("default: 1", sub_parser.format_help())
+        sub_parser.set_defaults(count=5)
+        self.assertIn("default: 5", sub_parser.format_help())
+        self.assertNotEqual(app.help_cache.filename(sub_parser.prog, {'count': 5}),
+                            app.help_cache.filename(sub_parser.prog))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
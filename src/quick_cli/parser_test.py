@@ -0,0 +1,72 @@
+''' Unit Tests For QuickCLI Argument Parser '''
+
+from io import BytesIO
+import logging
+import unittest
+
+from .parser import LazyVersionAction, QuickCLIArgumentParser
+from .parser_cache import _ParserPickler, _ParserUnpickler
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+class TestLazyParser(unittest.TestCase):
+    ''' Lazy Parser tests '''
+
+    def setUp(self):
+        self.calls = []
+
+    def lazy(self, value):
+        ''' Make lazy value, recording when it is resolved '''
+        def resolve():
+            ''' Resolve value '''
+            self.calls.append(value)
+            return value
+        return resolve
+
+    def make_parser(self):
+        ''' Make parser with lazy description, epilog and version '''
+        parser = QuickCLIArgumentParser(prog='prog',
+                                        description=self.lazy("Description"),
+                                        epilog=self.lazy("Epilog"))
+        parser.add_argument('-V', '--version', action=LazyVersionAction,
+                            version=self.lazy("%(prog)s 1.0"))
+        return parser
+
+    def test_lazy(self):
+        ''' Test lazy values are only resolved for help '''
+        parser = self.make_parser()
+        parser.parse_args([])
+        self.assertEqual(self.calls, [])
+        help_text = parser.format_help()
+        self.assertIn("Description", help_text)
+        self.assertIn("Epilog", help_text)
+        parser.format_help()
+        self.assertEqual(sorted(self.calls), ["Description", "Epilog"])
+
+    def test_version(self):
+        ''' Test lazy version is resolved when requested '''
+        parser = self.make_parser()
+        output = StringIO()
+        parser._print_message = lambda message, file=None: output.write(message)
+        with self.assertRaises(SystemExit):
+            parser.parse_args(['-V'])
+        self.assertEqual(output.getvalue().strip(), "prog 1.0")
+
+    def test_pickle(self):
+        ''' Test lazy values are resolved when pickled for parser cache '''
+        data = BytesIO()
+        _ParserPickler(data).dump(self.make_parser())
+        data.seek(0)
+        parser = _ParserUnpickler(data).load()
+        self.assertEqual(parser.description, "Description")
+        self.assertEqual(parser.epilog, "Epilog")
+        self.assertEqual(parser._actions[-1].version, "%(prog)s 1.0")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
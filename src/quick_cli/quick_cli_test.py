@@ -1,9 +1,22 @@
 ''' Unit Tests '''
 
 import logging
+import os
+import subprocess
+import sys
 import unittest
 
 
+def imported_modules(statement):
+    ''' Get modules imported by statement, run in a new process '''
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=src_dir)
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        "import sys; %s; print(' '.join(sys.modules))" % statement], env=env)
+    return set(output.decode('utf-8').split())
+
+
 class TestQuickCLI(unittest.TestCase):
     """Config unit test stubs"""
 
@@ -12,6 +25,20 @@ class TestQuickCLI(unittest.TestCase):
         actual = True
         self.assertTrue(actual)
 
+    @unittest.skipIf(sys.version_info < (3, 7), "Requires module __getattr__")
+    def test_lazy_package_import(self):
+        ''' Test importing package does not import submodules '''
+        modules = imported_modules("import quick_cli")
+        self.assertNotIn('quick_cli.app', modules)
+        self.assertNotIn('argparse', modules)
+
+    def test_lazy_app_import(self):
+        ''' Test importing app does not import argparse or datetime '''
+        modules = imported_modules("from quick_cli import QuickCLIApp")
+        self.assertIn('quick_cli.app', modules)
+        self.assertNotIn('argparse', modules)
+        self.assertNotIn('datetime', modules)
+
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG)
@@ -0,0 +1,150 @@
+''' Streaming Record Input
+
+An action may declare that it consumes records, i.e.:
+
+    Action("load", action=load, records='jsonl', records_batch=1000)
+
+It then gets positional FILE arguments (stdin if none, or if '-'), and
+args['records'] is a RecordReader: an iterable of records read from those
+files in turn, decoded per records format:
+
+    lines   each line, without line ending
+    jsonl   each non-blank line, parsed as JSON
+    csv     each row, as a dict keyed by the file's header row
+
+Files are read in CHUNK_SIZE chunks, one record at a time, so input of
+any size is never held in memory. Stdin is read the same way, decoded
+with records_encoding. With records_batch, records come in lists of (at
+most) that many records, for vectorized processing. Files left open (i.e.
+if the action stops early) are closed after execution.
+
+Actions with input records can not have a fan-out argument, nor an
+argument of their own with dest "records".
+'''
+from itertools import islice
+import io
+import logging
+import sys
+
+from .arg_types import LazyArgument
+
+LOG = logging.getLogger(__name__)
+
+RECORDS_DEST = 'records'
+FILES_DEST = 'record_files'
+FORMATS = ('lines', 'jsonl', 'csv')
+CHUNK_SIZE = 1 << 16
+
+
+def batched(iterable, size):
+    ''' Group items of iterable into lists of (at most) size items '''
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def decode_lines(stream, name):
+    ''' Decode lines, without line endings '''
+    for line in stream:
+        yield line.rstrip('\r\n')
+
+
+def decode_jsonl(stream, name):
+    ''' Decode non-blank lines as JSON documents '''
+    import json
+    for lineno, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as ex:
+            raise ValueError("%s:%d: invalid JSON: %s" % (name, lineno, ex))
+
+
+def decode_csv(stream, name):
+    ''' Decode CSV rows as dicts keyed by header row '''
+    import csv
+    for row in csv.DictReader(stream):
+        yield row
+
+
+DECODERS = {
+    'lines': decode_lines,
+    'jsonl': decode_jsonl,
+    'csv': decode_csv,
+}
+
+
+class RecordReader(LazyArgument):
+    ''' Iterable of records read from files (or stdin), see module docstring '''
+
+    def __init__(self, files=None, record_format='lines', batch_size=None,
+                 encoding='utf-8', chunk_size=CHUNK_SIZE):
+        ''' Constructor '''
+        if record_format is True:
+            record_format = 'lines'
+        if record_format not in DECODERS:
+            raise ValueError("Unknown records format '%s', expected one of: %s" % (
+                record_format, ', '.join(FORMATS)))
+        self.files = list(files) if files else ['-']
+        self.record_format = record_format
+        self.batch_size = batch_size
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self._generators = []
+
+    def _open(self, name):
+        ''' Open a file (or stdin, for "-") for reading text
+
+        Returns stream and function closing it
+        '''
+        newline = '' if self.record_format == 'csv' else None
+        if name != '-':
+            stream = io.open(name, 'r', self.chunk_size, self.encoding, newline=newline)
+            return stream, stream.close
+        buffer = getattr(sys.stdin, 'buffer', None)
+        if buffer is not None:
+            stream = io.TextIOWrapper(io.BufferedReader(buffer, self.chunk_size),
+                                      self.encoding, newline=newline)
+            # Detach rather than close, leaving stdin open
+            return stream, lambda: stream.detach().detach()
+        try:
+            fileno = sys.stdin.fileno()
+        except (AttributeError, ValueError, IOError, io.UnsupportedOperation):
+            # Not a file, i.e. a text stream replacing stdin
+            return sys.stdin, lambda: None
+        stream = io.open(fileno, 'r', self.chunk_size, self.encoding,
+                         newline=newline, closefd=False)
+        return stream, stream.close
+
+    def _records(self):
+        ''' Generate records of all files in turn '''
+        decode = DECODERS[self.record_format]
+        for name in self.files:
+            LOG.debug("Reading %s records from %s", self.record_format, name)
+            stream, close = self._open(name)
+            try:
+                for record in decode(stream, name if name != '-' else '<stdin>'):
+                    yield record
+            finally:
+                close()
+
+    def __iter__(self):
+        records = self._records()
+        self._generators.append(records)
+        if self.batch_size:
+            return batched(records, self.batch_size)
+        return records
+
+    def release(self):
+        ''' Close files of unfinished iterations '''
+        generators, self._generators = self._generators, []
+        for generator in generators:
+            generator.close()
+
+    def __repr__(self):
+        return "RecordReader(%r, %r, %r)" % (self.files, self.record_format,
+                                             self.batch_size)
@@ -0,0 +1,140 @@
+''' Unit Tests For Streaming Record Input '''
+
+import io
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from .actions import Action
+from .app import QuickCLIApp
+from .records import RecordReader, batched
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+def collect(args, wrapper):
+    ''' Collect input records '''
+    wrapper.app.reader = args['records']
+    wrapper.app.collected = list(args['records'])
+    return 0
+
+
+def first(args, wrapper):
+    ''' Take only the first input record '''
+    wrapper.app.iterator = iter(args['records'])
+    wrapper.app.collected = next(wrapper.app.iterator)
+    return 0
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    ACTIONS = [Action("lines", action=collect, records=True),
+               Action("json", action=collect, records='jsonl', records_batch=2),
+               Action("first", action=first, records='csv')]
+
+
+class TestRecords(unittest.TestCase):
+    ''' Record input tests '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_file(self, name, text):
+        ''' Write file in temporary directory '''
+        filename = os.path.join(self.tmpdir, name)
+        with open(filename, 'w') as output:
+            output.write(text)
+        return filename
+
+    def test_batched(self):
+        ''' Test batching into fixed size lists '''
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(batched([], 2)), [])
+
+    def test_formats(self):
+        ''' Test decoding of lines, JSON lines and CSV '''
+        lines = self.write_file('lines.txt', "one\r\ntwo\n\nthree")
+        jsonl = self.write_file('data.jsonl', '{"a": 1}\n\n[2]\n')
+        table = self.write_file('data.csv', 'name,count\nweb,3\n"a,b",4\n')
+        self.assertEqual(list(RecordReader([lines])), ["one", "two", "", "three"])
+        self.assertEqual(list(RecordReader([jsonl], 'jsonl')), [{'a': 1}, [2]])
+        self.assertEqual(list(RecordReader([table], 'csv')),
+                         [{'name': 'web', 'count': '3'},
+                          {'name': 'a,b', 'count': '4'}])
+        with self.assertRaises(ValueError):
+            RecordReader([lines], 'xml')
+
+    def test_invalid_json(self):
+        ''' Test invalid JSON is reported with file and line '''
+        jsonl = self.write_file('bad.jsonl', '{"a": 1}\n{bad\n')
+        with self.assertRaises(ValueError) as raised:
+            list(RecordReader([jsonl], 'jsonl'))
+        self.assertIn("bad.jsonl:2:", str(raised.exception))
+
+    def test_files_and_stdin(self):
+        ''' Test records of several files and stdin, in turn '''
+        first_file = self.write_file('one.txt', "a\nb\n")
+        saved_stdin = sys.stdin
+        sys.stdin = StringIO("c\n")
+        try:
+            self.assertEqual(list(RecordReader([first_file, '-'])), ['a', 'b', 'c'])
+            sys.stdin = StringIO("d\n")
+            self.assertEqual(list(RecordReader()), ['d'])
+        finally:
+            sys.stdin = saved_stdin
+
+    def test_stdin_encoding(self):
+        ''' Test stdin is decoded with records encoding, and left open '''
+        saved_stdin = sys.stdin
+        sys.stdin = io.TextIOWrapper(io.BytesIO(u"caf\u00e9\n".encode('latin-1')), 'utf-8')
+        try:
+            self.assertEqual(list(RecordReader(encoding='latin-1')), [u"caf\u00e9"])
+            self.assertFalse(sys.stdin.buffer.closed)
+        finally:
+            sys.stdin = saved_stdin
+
+    def test_conflicts(self):
+        ''' Test records dest and fan-out arguments are rejected '''
+        with self.assertRaises(ValueError):
+            Action("fan", records=True, args=[dict(flags='hosts', fan_out=True)])
+
+
+        class OwnRecordsApp(QuickCLIApp):
+            ''' Test App with own records argument '''
+            ACTIONS = [Action("own", action=collect, records=True,
+                              args=[dict(flags='--records', action='store_true')])]
+        app = OwnRecordsApp()
+        self.assertNotEqual(app.invoke(['own']), 0)
+        self.assertFalse(hasattr(app, 'collected'))
+
+    def test_app(self):
+        ''' Test action gets records of its file arguments '''
+        first_file = self.write_file('one.jsonl', '1\n2\n3\n')
+        second_file = self.write_file('two.jsonl', '4\n')
+        app = App()
+        self.assertEqual(app.invoke(['json', first_file, second_file]), 0)
+        self.assertEqual(app.collected, [[1, 2], [3, 4]])
+        self.assertEqual(app.invoke(['lines', first_file]), 0)
+        self.assertEqual(app.collected, ['1', '2', '3'])
+
+    def test_release(self):
+        ''' Test files left open by action are closed after execution '''
+        table = self.write_file('data.csv', 'name\nweb\ndb\n')
+        app = App()
+        self.assertEqual(app.invoke(['first', table]), 0)
+        self.assertEqual(app.collected, {'name': 'web'})
+        self.assertIsNone(app.iterator.gi_frame)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,272 @@
+''' On-Disk Cache Of Action Results
+
+Actions declared cacheable (CACHEABLE = True, or cacheable=True property)
+have their exit code and output memoized, keyed on app name and version,
+action path and normalized args. On a hit, captured stdout and stderr are
+replayed and the cached exit code returned, without executing the action.
+
+Files given as lazy arguments (see quick_cli.arg_types) and input record
+files (see quick_cli.records) are part of the key by name, modification
+time and size, so results are recomputed when they change. Actions
+reading stdin, writing files of lazy arguments, or having other argument
+values than strings, numbers, lists and dicts (i.e. files opened by
+argparse.FileType), are not cached.
+
+Only successful executions (exit code 0) are cached, for cache_ttl
+seconds. Total size of the cache is bounded, least recently used entries
+being evicted first, and output larger than a quarter of the bound is not
+cached at all. Invocations run in an event loop use the cache the same
+way (see quick_cli.aio).
+'''
+import hashlib
+import json
+import logging
+import os
+import os.path
+import pickle
+import sys
+import time
+
+from .arg_types import file_state
+from .parser_cache import default_cache_dir
+
+LOG = logging.getLogger(__name__)
+
+NO_CACHE_DEST = 'no_cache'
+CLEAR_CACHE_DEST = 'clear_cache'
+CONTROL_DESTS = (NO_CACHE_DEST, CLEAR_CACHE_DEST)
+
+
+class _Uncacheable(Exception):
+    ''' Raised for argument values whose results can not be cached '''
+
+
+def _key_value(value):
+    ''' Get JSON serializable cache key value of an argument value
+
+    Called for values other than JSON primitives, lists and dicts, which
+    can only be cached if they give a cache_key (i.e. lazy arguments, see
+    quick_cli.arg_types). Others, such as open files (including stdin) of
+    argparse.FileType, can not be told apart by their repr.
+    '''
+    cache_key = getattr(value, 'cache_key', None)
+    if cache_key is None:
+        raise _Uncacheable(value)
+    key = cache_key()
+    if key is None:
+        raise _Uncacheable(value)
+    return key
+
+
+def normalize_args(args, inputs=()):
+    ''' Get args as canonical text, for use in cache keys
+
+    inputs are names of files read besides args, "-" being stdin. Returns
+    None if results for args can not be cached
+    '''
+    values = dict((key, value) for key, value in args.items()
+                  if key not in CONTROL_DESTS)
+    if inputs:
+        if '-' in inputs:
+            return None
+        values[' inputs'] = [file_state(name) for name in inputs]
+    try:
+        return json.dumps(values, sort_keys=True, default=_key_value)
+    except _Uncacheable:
+        return None
+
+
+class _TeeStream(object):
+    ''' Stream proxy that also captures what is written, up to a limit '''
+
+    def __init__(self, stream, limit):
+        ''' Constructor '''
+        self.stream = stream
+        self.limit = limit
+        self.parts = []
+        self.length = 0
+
+    @property
+    def text(self):
+        ''' Get captured text, or None if it exceeded the limit '''
+        return "".join(self.parts) if self.parts is not None else None
+
+    def write(self, data):
+        ''' Write data to underlying stream, capturing it '''
+        if self.parts is not None:
+            self.length += len(data)
+            if self.length > self.limit:
+                self.parts = None
+            else:
+                self.parts.append(data)
+        return self.stream.write(data)
+
+    def __getattr__(self, name):
+        if name == 'buffer':
+            # Bytes written to the buffer directly can not be captured
+            self.parts = None
+        return getattr(self.stream, name)
+
+
+class ResultCache(object):
+    ''' Cache of action exit codes and output, see module docstring '''
+    FORMAT_VERSION = 1
+
+    def __init__(self, app, cache_dir=None, max_size=32 * 1024 * 1024):
+        ''' Constructor '''
+        self.app = app
+        self.cache_dir = cache_dir if cache_dir else default_cache_dir()
+        self.max_size = max_size
+
+    @property
+    def results_dir(self):
+        ''' Get directory holding result entries '''
+        return os.path.join(self.cache_dir, 'results')
+
+    def key(self, path, args, inputs=()):
+        ''' Get cache key of an action path, its args and input files
+
+        None if results for args can not be cached (see normalize_args)
+        '''
+        normalized = normalize_args(args, inputs)
+        if normalized is None:
+            return None
+        info = self.app.info
+        return hashlib.sha1(repr((
+            self.FORMAT_VERSION, info.program_name, info.program_version,
+            tuple(path), normalized)).encode('utf-8')).hexdigest()
+
+    def filename(self, key):
+        ''' Get cache file name for a key '''
+        return os.path.join(self.results_dir, "%s.result" % key[:24])
+
+    def load(self, key, ttl):
+        ''' Load (exit code, stdout, stderr), or None if missing or expired '''
+        filename = self.filename(key)
+        try:
+            with open(filename, 'rb') as cache_file:
+                version, cached_key, created, entry = pickle.load(cache_file)
+        except (IOError, OSError):
+            return None
+        except Exception as ex:  # pylint: disable=broad-except
+            LOG.debug("Ignoring unreadable result cache %s: %s", filename, ex)
+            return None
+        if (version, cached_key) != (self.FORMAT_VERSION, key):
+            return None
+        if ttl is not None and time.time() - created > ttl:
+            LOG.debug("Result cache %s expired", filename)
+            return None
+        try:
+            # Modification time tracks last use, for LRU eviction
+            os.utime(filename, None)
+        except OSError:
+            pass
+        return entry
+
+    def save(self, key, entry):
+        ''' Save (exit code, stdout, stderr). Return True if saved '''
+        filename = self.filename(key)
+        tmp_filename = "%s.%s.tmp" % (filename, os.getpid())
+        try:
+            if not os.path.isdir(self.results_dir):
+                os.makedirs(self.results_dir)
+            with open(tmp_filename, 'wb') as cache_file:
+                pickle.dump((self.FORMAT_VERSION, key, time.time(), entry),
+                            cache_file, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_filename, filename)
+        except Exception as ex:  # pylint: disable=broad-except
+            LOG.debug("Unable to save result cache %s: %s", filename, ex)
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            return False
+        self.evict()
+        return True
+
+    def _entries(self):
+        ''' Get list of (last use, size, filename) of entries '''
+        entries = []
+        if not os.path.isdir(self.results_dir):
+            return entries
+        for name in os.listdir(self.results_dir):
+            filename = os.path.join(self.results_dir, name)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+        return entries
+
+    def evict(self):
+        ''' Remove least recently used entries until cache fits max_size '''
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, filename in entries:
+            if total <= self.max_size:
+                break
+            LOG.debug("Evicting result cache %s", filename)
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        ''' Remove all cached results '''
+        for _, _, filename in self._entries():
+            os.remove(filename)
+
+    def replay(self, path, entry):
+        ''' Write output of a cached entry, returning its exit code '''
+        LOG.debug("Result cache hit for '%s'", ' '.join(path))
+        code, output, errors = entry
+        sys.stdout.write(output)
+        sys.stderr.write(errors)
+        return code
+
+    def capture(self):
+        ''' Start capturing stdout and stderr, returning streams to restore '''
+        limit = self.max_size // 4
+        saved = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = _TeeStream(saved[0], limit), _TeeStream(saved[1], limit)
+        return saved
+
+    @staticmethod
+    def restore(saved):
+        ''' Stop capturing, returning captured (stdout, stderr) streams '''
+        captured = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = saved
+        return captured
+
+    def store(self, key, path, code, captured):
+        ''' Save exit code and captured output, if they may be cached '''
+        output, errors = captured[0].text, captured[1].text
+        if code not in (None, 0):
+            LOG.debug("Not caching result of '%s': exit code %s", ' '.join(path), code)
+        elif output is None or errors is None:
+            LOG.debug("Not caching result of '%s': output too large", ' '.join(path))
+        else:
+            self.save(key, (code, output, errors))
+
+    def call(self, path, args, ttl, func, inputs=()):
+        ''' Get result of func for action path and args, from cache if present
+
+        func is called with stdout and stderr captured on a miss, and its
+        result (if 0 or None) cached along with the output. inputs are
+        names of input files read besides args (see normalize_args)
+        '''
+        key = self.key(path, args, inputs)
+        if key is None:
+            LOG.debug("Not caching result of '%s': reads stdin or writes files",
+                      ' '.join(path))
+            return func()
+        entry = self.load(key, ttl)
+        if entry is not None:
+            return self.replay(path, entry)
+
+        saved = self.capture()
+        try:
+            code = func()
+        finally:
+            captured = self.restore(saved)
+        self.store(key, path, code, captured)
+        return code
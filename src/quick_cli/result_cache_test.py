@@ -0,0 +1,220 @@
+''' Unit Tests For Action Result Cache '''
+
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from argparse import FileType
+
+from .actions import Action
+from .app import QuickCLIApp
+from .arg_types import LazyFileType, MappedFileType
+from .result_cache import ResultCache, normalize_args
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+def lookup(args, wrapper):
+    ''' Print looked up host, counting calls '''
+    wrapper.app.calls += 1
+    sys.stdout.write("host %s\n" % args['host'])
+    sys.stderr.write("looked up\n")
+    return 0 if args['host'] != 'bad' else 3
+
+
+def count(args, wrapper):
+    ''' Print size of input, counting calls '''
+    wrapper.app.calls += 1
+    if 'opened' in args:
+        sys.stdout.write("%d bytes\n" % len(args['opened'].read()))
+    elif 'records' in args:
+        sys.stdout.write("%d records\n" % len(list(args['records'])))
+    else:
+        sys.stdout.write("%d bytes\n" % len(args['source'].read()))
+    return 0
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    ACTIONS = [Action("lookup", action=lookup, cacheable=True,
+                      args=[dict(flags='host')]),
+               Action("uncached", action=lookup, args=[dict(flags='host')]),
+               Action("size", action=count, cacheable=True,
+                      args=[dict(flags='source', type=LazyFileType())]),
+               Action("records", action=count, cacheable=True, records=True),
+               Action("opened", action=count, cacheable=True,
+                      args=[dict(flags='opened', type=FileType('r'))])]
+
+    def __init__(self, cache_dir, **kwargs):
+        self.RESULT_CACHE = cache_dir
+        QuickCLIApp.__init__(self, **kwargs)
+        self.calls = 0
+
+
+class TestResultCache(unittest.TestCase):
+    ''' Result cache tests '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.saved_streams = sys.stdout, sys.stderr
+
+    def tearDown(self):
+        sys.stdout, sys.stderr = self.saved_streams
+        shutil.rmtree(self.tmpdir)
+
+    def invoke(self, app, argv):
+        ''' Invoke app, returning exit code, stdout and stderr '''
+        sys.stdout, sys.stderr = StringIO(), StringIO()
+        try:
+            code = app.invoke(argv)
+            return code, sys.stdout.getvalue(), sys.stderr.getvalue()
+        finally:
+            sys.stdout, sys.stderr = self.saved_streams
+
+    def test_normalize_args(self):
+        ''' Test args normalization ignores order and control flags '''
+        self.assertEqual(normalize_args({'b': 1, 'a': [2], 'no_cache': True}),
+                         normalize_args({'a': [2], 'b': 1}))
+        self.assertNotEqual(normalize_args({'a': 1}), normalize_args({'a': '1'}))
+
+    def test_hit(self):
+        ''' Test cached output and exit code are replayed '''
+        app = App(self.tmpdir)
+        expected = (0, "host web\n", "looked up\n")
+        self.assertEqual(self.invoke(app, ['lookup', 'web']), expected)
+        self.assertEqual(self.invoke(app, ['lookup', 'web']), expected)
+        self.assertEqual(app.calls, 1)
+        self.assertEqual(self.invoke(App(self.tmpdir), ['lookup', 'web']), expected)
+        self.invoke(app, ['lookup', 'db'])
+        self.assertEqual(app.calls, 2)
+
+    def test_not_cached(self):
+        ''' Test failures, uncacheable actions and --no-cache are not cached '''
+        app = App(self.tmpdir)
+        for argv in (['lookup', 'bad'], ['uncached', 'web'],
+                     ['--no-cache', 'lookup', 'web']):
+            self.invoke(app, argv)
+            self.invoke(app, argv)
+        self.assertEqual(app.calls, 6)
+        self.assertEqual(self.invoke(app, ['lookup', 'bad'])[0], 3)
+
+    def test_file_args(self):
+        ''' Test files are keyed by state, and stdin is not cached '''
+        filename = os.path.join(self.tmpdir, 'input.txt')
+        with open(filename, 'w') as output:
+            output.write("a\nb\n")
+        app = App(self.tmpdir)
+        for argv in (['size', filename], ['records', filename]):
+            first = self.invoke(app, argv)
+            self.assertEqual(self.invoke(app, argv), first)
+        self.assertEqual(app.calls, 2)
+        with open(filename, 'a') as output:
+            output.write("c\n")
+        self.assertEqual(self.invoke(app, ['size', filename])[1], "6 bytes\n")
+        self.assertEqual(self.invoke(app, ['records', filename])[1], "3 records\n")
+        self.assertEqual(app.calls, 4)
+
+        saved_stdin = sys.stdin
+        try:
+            for argv in (['size', '-'], ['records'], ['records', '-']):
+                sys.stdin = StringIO("x\n")
+                self.invoke(app, argv)
+        finally:
+            sys.stdin = saved_stdin
+        self.assertEqual(app.calls, 7)
+
+    def test_file_objects(self):
+        ''' Test files opened by argparse, including stdin, are not cached '''
+        filename = os.path.join(self.tmpdir, 'input.txt')
+        with open(filename, 'w') as output:
+            output.write("one\n")
+        app = App(self.tmpdir)
+        self.assertEqual(self.invoke(app, ['opened', filename])[1], "4 bytes\n")
+        with open(filename, 'w') as output:
+            output.write("three\n")
+        self.assertEqual(self.invoke(app, ['opened', filename])[1], "6 bytes\n")
+
+        saved_stdin = sys.stdin
+        try:
+            for text, expected in (("a\n", "2 bytes\n"), ("abc\n", "4 bytes\n")):
+                sys.stdin = StringIO(text)
+                self.assertEqual(self.invoke(app, ['opened', '-'])[1], expected)
+        finally:
+            sys.stdin = saved_stdin
+        self.assertEqual(app.calls, 4)
+        self.assertIsNone(normalize_args({'stdin': sys.stdin}))
+        self.assertIsNone(normalize_args({'value': object()}))
+        self.assertIsNotNone(normalize_args({'a': [1, 'b', None, 2.5], 'c': {'d': True}}))
+
+    def test_file_state_keys(self):
+        ''' Test file arguments are keyed by name, modification time and size '''
+        filename = os.path.join(self.tmpdir, 'input.bin')
+        with open(filename, 'wb') as output:
+            output.write(b"abc")
+        mapped = normalize_args({'source': MappedFileType()(filename)})
+        self.assertNotEqual(mapped, normalize_args({'source': LazyFileType()(filename)}))
+        with open(filename, 'ab') as output:
+            output.write(b"d")
+        self.assertNotEqual(mapped, normalize_args({'source': MappedFileType()(filename)}))
+        self.assertIsNone(normalize_args({'log': LazyFileType('w')(filename)}))
+        self.assertIsNone(normalize_args({}, ['-']))
+        self.assertNotEqual(normalize_args({}, [filename]), normalize_args({}))
+
+    @unittest.skipIf(sys.version_info < (3, 5), "async actions require Python 3.5+")
+    def test_async(self):
+        ''' Test results of async actions are cached '''
+        namespace = {'Action': Action, 'App': App, 'sys': sys}
+        exec('''
+async def lookup(args, wrapper):
+    wrapper.app.calls += 1
+    sys.stdout.write("host %s\\n" % args['host'])
+    return 0
+
+class AsyncApp(App):
+    ACTIONS = [Action("lookup", action=lookup, cacheable=True, args=[dict(flags='host')])]
+''', namespace)
+        app = namespace['AsyncApp'](self.tmpdir)
+        expected = (0, "host web\n", "")
+        self.assertEqual(self.invoke(app, ['lookup', 'web']), expected)
+        self.assertEqual(self.invoke(app, ['lookup', 'web']), expected)
+        self.assertEqual(app.calls, 1)
+
+    def test_clear(self):
+        ''' Test --clear-cache removes cached results '''
+        app = App(self.tmpdir)
+        self.invoke(app, ['lookup', 'web'])
+        self.invoke(app, ['--clear-cache', 'lookup', 'web'])
+        self.assertEqual(app.calls, 2)
+
+    def test_ttl(self):
+        ''' Test expired entries are not used '''
+        cache = ResultCache(App(self.tmpdir), self.tmpdir)
+        key = cache.key(('lookup',), {'host': 'web'})
+        cache.save(key, (0, "out", ""))
+        self.assertEqual(cache.load(key, 60), (0, "out", ""))
+        self.assertIsNone(cache.load(key, -1))
+
+    def test_lru_eviction(self):
+        ''' Test least recently used entries are evicted first '''
+        cache = ResultCache(App(self.tmpdir), self.tmpdir)
+        cache.save('a', (0, "x" * 100, ""))
+        cache.save('b', (0, "x" * 100, ""))
+        cache.max_size = os.path.getsize(cache.filename('a')) * 2
+        os.utime(cache.filename('a'), (1, 1))
+        os.utime(cache.filename('b'), (2, 2))
+        self.assertIsNotNone(cache.load('a', None))
+        cache.save('c', (0, "x" * 100, ""))
+        self.assertIsNotNone(cache.load('a', None))
+        self.assertIsNone(cache.load('b', None))
+        self.assertIsNotNone(cache.load('c', None))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,130 @@
+''' QuickCLI Resident Server '''
+import errno
+import logging
+import os
+import signal
+import socket
+import sys
+
+from .client import EXIT_CODE, recv_request
+
+LOG = logging.getLogger(__name__)
+
+
+class QuickCLIServer(object):
+    ''' Resident QuickCLI Application Server
+
+    Keeps an application with its fully built parser resident, and serves
+    invocations sent by quick_cli.client over a Unix socket. Each
+    invocation runs in a forked child process with the client's stdio,
+    environment and working directory, and a fresh QuickCLIContext, so no
+    state leaks between invocations while startup cost is paid once.
+    '''
+
+    def __init__(self, app, socket_path, backlog=16):
+        ''' Constructor '''
+        self.app = app
+        self.socket_path = socket_path
+        self.backlog = backlog
+        self.parser = None
+        self._listener = None
+
+    def prepare(self):
+        ''' Build parser and compile action tree before serving '''
+        self.parser = self.app.build_parser()
+        self.app.command.compile()
+
+    def _bind(self):
+        ''' Create listening socket, replacing a stale socket file '''
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except (IOError, OSError):
+                os.remove(self.socket_path)
+            else:
+                raise IOError(errno.EADDRINUSE, "Server already running",
+                              self.socket_path)
+            finally:
+                probe.close()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            listener.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        listener.listen(self.backlog)
+        return listener
+
+    @staticmethod
+    def _reap_children(*_args):
+        ''' Reap finished invocation processes '''
+        while True:
+            try:
+                pid, _status = os.waitpid(-1, os.WNOHANG)
+            except OSError:
+                return
+            if pid == 0:
+                return
+
+    def serve_forever(self):
+        ''' Serve invocations until interrupted '''
+        if not hasattr(socket.socket, 'sendmsg'):
+            raise NotImplementedError("Server mode requires Python 3")
+        if self.parser is None:
+            self.prepare()
+        self._listener = self._bind()
+        previous_handler = signal.signal(signal.SIGCHLD, self._reap_children)
+        LOG.info("Serving %s on %s", self.app.info.program_name,
+                 self.socket_path)
+        try:
+            while True:
+                conn, _addr = self._listener.accept()
+                pid = os.fork()
+                if pid == 0:
+                    self._child(conn)
+                conn.close()
+        except KeyboardInterrupt:
+            return 0
+        finally:
+            signal.signal(signal.SIGCHLD, previous_handler)
+            self._listener.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def _child(self, conn):
+        ''' Handle a connection in forked child process. Never returns '''
+        code = 1
+        try:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            self._listener.close()
+            code = self.handle(conn)
+        except BaseException:  # pylint: disable=broad-except
+            LOG.exception("Failed to handle invocation")
+        finally:
+            os._exit(code & 0xff)  # pylint: disable=protected-access
+
+    def handle(self, conn):
+        ''' Handle an invocation request. Returns exit code '''
+        request, fds = recv_request(conn)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for target, source in enumerate(fds[:3]):
+            os.dup2(source, target)
+        for source in fds:
+            if source > 2:
+                os.close(source)
+        sys.stdin = os.fdopen(0, 'r', closefd=False)
+        sys.stdout = os.fdopen(1, 'w', closefd=False)
+        sys.stderr = os.fdopen(2, 'w', 1, closefd=False)
+
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        sys.argv = sys.argv[:1] + request['argv']
+        code = self.app.invoke_isolated(request['argv'], self.parser)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        conn.sendall(EXIT_CODE.pack(code))
+        conn.close()
+        return code
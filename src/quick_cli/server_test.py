@@ -0,0 +1,81 @@
+''' Unit Tests For Resident Server '''
+
+import logging
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import unittest
+
+from .actions import Action
+from .app import QuickCLIApp
+from .client import call
+
+
+def echo(args, wrapper):
+    ''' Echo words and a context value, and remember words in context '''
+    app = wrapper.app
+    sys.stdout.write("%s %s %s\n" % (" ".join(args['words']),
+                                     app.context.get('seen', '-'),
+                                     os.environ.get('ECHO_ENV', '')))
+    app.context.set('seen', 'leaked')
+    return len(args['words'])
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    ACTIONS = [Action("echo", action=echo,
+                      args=[dict(flags='words', nargs='*')])]
+
+
+@unittest.skipUnless(hasattr(os, 'fork') and sys.version_info[0] > 2,
+                     "Server requires fork and Python 3")
+class TestServer(unittest.TestCase):
+    ''' Resident Server tests '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmpdir, 'app.sock')
+        self.pid = os.fork()
+        if self.pid == 0:
+            try:
+                App().serve(self.socket_path)
+            finally:
+                os._exit(0)  # pylint: disable=protected-access
+        for _ in range(500):
+            if os.path.exists(self.socket_path):
+                break
+            time.sleep(0.01)
+
+    def tearDown(self):
+        os.kill(self.pid, signal.SIGINT)
+        os.waitpid(self.pid, 0)
+        shutil.rmtree(self.tmpdir)
+
+    def invoke(self, argv, env=None):
+        ''' Invoke app on server, returning exit code and stdout '''
+        read_fd, write_fd = os.pipe()
+        try:
+            code = call(argv, self.socket_path, env=env or {},
+                        cwd=self.tmpdir, fds=(0, write_fd, 2))
+        finally:
+            os.close(write_fd)
+        with os.fdopen(read_fd) as output:
+            return code, output.read()
+
+    def test_invocations_are_isolated(self):
+        ''' Test invocations get output, env and a fresh context '''
+        self.assertEqual(self.invoke(['echo', 'a', 'b'], {'ECHO_ENV': 'x'}),
+                         (2, "a b - x\n"))
+        self.assertEqual(self.invoke(['echo', 'c']), (1, "c - \n"))
+
+    def test_parser_error(self):
+        ''' Test argparse errors are returned as exit code '''
+        self.assertEqual(self.invoke(['nope'])[0], 2)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,157 @@
+''' QuickCLI Interactive Shell '''
+import logging
+import os
+import shlex
+import sys
+
+LOG = logging.getLogger(__name__)
+
+EXIT_COMMANDS = ('exit', 'quit')
+HELP_COMMANDS = ('help', '?')
+
+
+def _readline():
+    ''' Import readline, if available '''
+    try:
+        import readline
+    except ImportError:  # pragma: no cover
+        return None
+    return readline
+
+
+class QuickCLIShell(object):
+    ''' Interactive QuickCLI Application Shell
+
+    Builds the application parser and action tree once, then reads command
+    lines in a loop, running each with QuickCLIApp.invoke_isolated, so
+    every command gets fresh args and context, and argparse errors or
+    --help do not end the shell. Interactive shells get readline history
+    and TAB completion of action names and aliases.
+    '''
+
+    def __init__(self, app, prompt=None, history_file=None, stdin=None):
+        ''' Constructor '''
+        self.app = app
+        self.prompt = prompt if prompt is not None else "%s> " % app.info.program_name
+        if history_file is None:
+            history_file = os.path.join(os.path.expanduser("~"),
+                                        ".%s_history" % app.info.program_name)
+        self.history_file = history_file
+        self.stdin = stdin if stdin is not None else sys.stdin
+        self.parser = None
+        self.readline = None
+        self._matches = []
+
+    @property
+    def is_interactive(self):
+        ''' Check if shell reads commands from a terminal '''
+        isatty = getattr(self.stdin, 'isatty', None)
+        return self.stdin is sys.stdin and isatty is not None and isatty()
+
+    def prepare(self):
+        ''' Build parser and compile action tree before reading commands '''
+        self.parser = self.app.build_parser()
+        self.app.command.compile()
+        if self.is_interactive:
+            self.readline = _readline()
+        if self.readline is not None:
+            self._setup_readline()
+
+    def _setup_readline(self):
+        ''' Load history and configure completion '''
+        readline = self.readline
+        if self.history_file and os.path.exists(self.history_file):
+            try:
+                readline.read_history_file(self.history_file)
+            except (IOError, OSError) as ex:
+                LOG.debug("Failed to read history %s: %s", self.history_file, ex)
+        readline.set_completer(self.complete)
+        readline.set_completer_delims(" \t\n")
+        if 'libedit' in (readline.__doc__ or ''):
+            readline.parse_and_bind("bind ^I rl_complete")
+        else:
+            readline.parse_and_bind("tab: complete")
+
+    def _save_history(self):
+        ''' Save readline history '''
+        if self.readline is None or not self.history_file:
+            return
+        try:
+            self.readline.write_history_file(self.history_file)
+        except (IOError, OSError) as ex:
+            LOG.debug("Failed to write history %s: %s", self.history_file, ex)
+
+    def completions(self, line, text):
+        ''' Get action names and aliases completing text, after tokens in line '''
+        wrapper = self.app.command
+        for token in line.split():
+            action = wrapper.actions_idx.get(token) if wrapper.has_actions else None
+            if action is not None:
+                wrapper = action
+        words = list(wrapper.actions_idx) if wrapper.has_actions else []
+        if wrapper is self.app.command:
+            words.extend(EXIT_COMMANDS + HELP_COMMANDS)
+        return sorted(word for word in words if word.startswith(text))
+
+    def complete(self, text, state):
+        ''' Readline completer '''
+        if state == 0:
+            line = self.readline.get_line_buffer()[:self.readline.get_begidx()]
+            self._matches = self.completions(line, text)
+        try:
+            return self._matches[state]
+        except IndexError:
+            return None
+
+    def read_line(self):
+        ''' Read next command line, returning None at end of input '''
+        if self.is_interactive:
+            try:
+                read = raw_input  # pylint: disable=undefined-variable
+            except NameError:
+                read = input
+            try:
+                return read(self.prompt)
+            except EOFError:
+                sys.stdout.write("\n")
+                return None
+        line = self.stdin.readline()
+        return line if line else None
+
+    def run_line(self, line):
+        ''' Run a single command line, returning its exit code (or None) '''
+        line = line.strip()
+        if not line or line.startswith('#'):
+            return None
+        try:
+            argv = shlex.split(line)
+        except ValueError as ex:
+            sys.stderr.write("%s\n" % ex)
+            return 2
+        if argv[0] in HELP_COMMANDS:
+            argv = argv[1:] + ['--help']
+        return self.app.invoke_isolated(argv, self.parser)
+
+    def run(self):
+        ''' Run shell until end of input or exit command
+
+        Returns exit code of the last command that was run
+        '''
+        if self.parser is None:
+            self.prepare()
+        result = 0
+        try:
+            while True:
+                try:
+                    line = self.read_line()
+                    if line is None or line.strip() in EXIT_COMMANDS:
+                        break
+                    code = self.run_line(line)
+                except KeyboardInterrupt:
+                    sys.stdout.write("\n")
+                    continue
+                if code is not None:
+                    result = code
+        finally:
+            self._save_history()
+        return result
@@ -0,0 +1,87 @@
+''' Unit Tests For Interactive Shell '''
+
+import logging
+import os
+import sys
+import unittest
+
+from .action_wrapper import IS_PYTHON2
+from .actions import Action
+from .app import QuickCLIApp
+from .shell import QuickCLIShell
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+def add(args, wrapper):
+    ''' Add numbers, remembering calls in context '''
+    app = wrapper.app
+    app.context.set('calls', app.context.get('calls', 0) + 1)
+    app.results.append((sum(args['numbers']), app.context.get('calls')))
+    return 0 if args['numbers'] else 3
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    ACTIONS = [
+        Action("math", aliases=['m'], actions=[
+            Action("add", action=add,
+                   args=[dict(flags='numbers', nargs='*', type=int)]),
+            Action("average")]),
+        Action("status"),
+    ]
+
+    def __init__(self, **kwargs):
+        QuickCLIApp.__init__(self, **kwargs)
+        self.results = []
+
+
+class TestShell(unittest.TestCase):
+    ''' Shell tests '''
+
+    def setUp(self):
+        self.saved = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = StringIO(), StringIO()
+
+    def tearDown(self):
+        sys.stdout, sys.stderr = self.saved
+
+    def test_commands(self):
+        ''' Test commands run with fresh context and errors do not exit '''
+        app = App()
+        code = app.run_shell(history_file=os.devnull, stdin=StringIO(
+            "math add 1 2\n\n# comment\nbogus\nhelp math\nmath add '4'\n"
+            "math add\nexit\nmath add 5\n"))
+        self.assertEqual(code, 3)
+        self.assertEqual(app.results, [(3, 1), (4, 1), (0, 1)])
+        self.assertIn("invalid choice", sys.stderr.getvalue())
+        self.assertIn("usage:", sys.stdout.getvalue())
+
+    @unittest.skipIf(IS_PYTHON2, "Aliases are not supported on Python 2")
+    def test_alias(self):
+        ''' Test commands may use aliases '''
+        app = App()
+        self.assertEqual(app.run_shell(history_file=os.devnull,
+                                       stdin=StringIO("m add 4\n")), 0)
+        self.assertEqual(app.results, [(4, 1)])
+
+    def test_end_of_input(self):
+        ''' Test shell ends at end of input with last exit code '''
+        self.assertEqual(App().run_shell(history_file=os.devnull,
+                                         stdin=StringIO("bogus\n")), 2)
+
+    def test_completions(self):
+        ''' Test completion of action names and aliases '''
+        shell = QuickCLIShell(App(), stdin=StringIO())
+        self.assertEqual(shell.completions("", "s"), ['status'])
+        self.assertEqual(shell.completions("", "m"), ['m', 'math'])
+        self.assertEqual(shell.completions("m ", "a"), ['add', 'average'])
+        self.assertEqual(shell.completions("math add ", ""), [])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,197 @@
+''' Phase Timing Instrumentation
+
+Timings are reported as a table or JSON on stderr, or, with 'trace'
+format, written as a Chrome trace-event JSON file (QUICKCLI_TRACE_FILE,
+by default quickcli_trace.json), which can be loaded in chrome://tracing
+or Perfetto.
+'''
+from contextlib import contextmanager
+import logging
+import os
+import sys
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+
+TIMING_ENV = 'QUICKCLI_TIMING'
+TIMING_FLAG = '--quickcli-timing'
+TIMING_FORMATS = ('table', 'json', 'trace')
+TRACE_FILE_ENV = 'QUICKCLI_TRACE_FILE'
+DEFAULT_TRACE_FILE = 'quickcli_trace.json'
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+def extract_timing_flag(argv):
+    ''' Remove hidden timing flag from argv
+
+    Flag may be given as --quickcli-timing or --quickcli-timing=FORMAT.
+    Returns tuple of remaining argv and requested format (or None)
+    '''
+    remaining = []
+    timing_format = None
+    for arg in argv:
+        if arg == TIMING_FLAG:
+            timing_format = 'table'
+        elif arg.startswith(TIMING_FLAG + '='):
+            timing_format = arg.split('=', 1)[1]
+        else:
+            remaining.append(arg)
+    return remaining, timing_format
+
+
+class TimingRecord(object):
+    ''' Timing of a single phase (or user defined span) '''
+    __slots__ = ('name', 'start', 'duration', 'depth', 'thread', 'category',
+                 'args')
+
+    def __init__(self, name, start, depth, category='phase', args=None):
+        ''' Constructor '''
+        self.name = name
+        self.start = start
+        self.duration = None
+        self.depth = depth
+        self.thread = threading.current_thread().ident
+        self.category = category
+        self.args = args
+
+    def as_dict(self):
+        ''' Get record as a dictionary, with times in milliseconds '''
+        return {
+            'name': self.name,
+            'start_ms': self.start * 1000.0,
+            'duration_ms': (self.duration or 0.0) * 1000.0,
+            'depth': self.depth
+        }
+
+    def as_trace_event(self, pid):
+        ''' Get record as a Chrome trace complete event, times in microseconds '''
+        event = {
+            'name': self.name,
+            'cat': self.category,
+            'ph': 'X',
+            'ts': self.start * 1000000.0,
+            'dur': (self.duration or 0.0) * 1000000.0,
+            'pid': pid,
+            'tid': self.thread,
+        }
+        if self.args:
+            event['args'] = self.args
+        return event
+
+
+class PhaseTimer(object):
+    ''' Records high resolution timings of nested named phases
+
+    Timer is created disabled unless given a format ('table', 'json' or
+    'trace'); a disabled timer records nothing and costs a single check per
+    phase. Nesting depth is kept per thread, so phases timed concurrently
+    (i.e. by fan-out items) do not nest into each other.
+    '''
+
+    def __init__(self, timing_format=None):
+        ''' Constructor '''
+        self.format = None
+        self.records = []
+        self._local = threading.local()
+        self._origin = _clock()
+        self.enable(timing_format)
+
+    def reset(self):
+        ''' Discard recorded timings, and restart clock '''
+        self.records = []
+        self._local = threading.local()
+        self._origin = _clock()
+
+    @property
+    def enabled(self):
+        ''' Check if timer is enabled '''
+        return self.format is not None
+
+    def enable(self, timing_format='table'):
+        ''' Enable timer with output format. Falsy format disables it '''
+        if not timing_format or timing_format in ('0', 'false'):
+            self.format = None
+            return
+        if timing_format not in TIMING_FORMATS:
+            timing_format = 'table'
+        self.format = timing_format
+
+    @contextmanager
+    def phase(self, name, category='phase', args=None):
+        ''' Time a phase, as a context manager
+
+        category and args (a dict) are only used in trace output
+        '''
+        if self.format is None:
+            yield None
+            return
+        local = self._local
+        depth = getattr(local, 'depth', 0)
+        record = TimingRecord(name, _clock() - self._origin, depth,
+                              category, args)
+        self.records.append(record)
+        local.depth = depth + 1
+        try:
+            yield record
+        finally:
+            local.depth = depth
+            record.duration = _clock() - self._origin - record.start
+
+    def as_list(self):
+        ''' Get recorded timings as a list of dictionaries '''
+        return [record.as_dict() for record in self.records]
+
+    def format_table(self):
+        ''' Format recorded timings as a text table '''
+        width = max([len(record.name) + 2 * record.depth
+                     for record in self.records] + [5])
+        lines = ["%-*s %12s %12s" % (width, "phase", "start ms", "duration ms")]
+        for record in self.records:
+            lines.append("%-*s %12.3f %12.3f" % (
+                width, "  " * record.depth + record.name,
+                record.start * 1000.0, (record.duration or 0.0) * 1000.0))
+        return "\n".join(lines) + "\n"
+
+    def format_json(self):
+        ''' Format recorded timings as JSON '''
+        import json
+        return json.dumps({'phases': self.as_list()}, indent=2) + "\n"
+
+    def trace_events(self, process_name=None):
+        ''' Get recorded timings as a Chrome trace-event document '''
+        pid = os.getpid()
+        events = [record.as_trace_event(pid) for record in self.records]
+        if process_name:
+            events.insert(0, {'name': 'process_name', 'ph': 'M', 'pid': pid,
+                              'args': {'name': process_name}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, filename=None, process_name=None):
+        ''' Write recorded timings as Chrome trace-event JSON file
+
+        filename defaults to QUICKCLI_TRACE_FILE environment variable, or
+        quickcli_trace.json. Returns name of the written file
+        '''
+        import json
+        if filename is None:
+            filename = os.environ.get(TRACE_FILE_ENV) or DEFAULT_TRACE_FILE
+        with open(filename, 'w') as trace_file:
+            json.dump(self.trace_events(process_name), trace_file)
+        return filename
+
+    def report(self, stream=None, process_name=None):
+        ''' Write recorded timings to a stream (stderr by default)
+
+        With 'trace' format, timings are written to trace file instead, and
+        only its name is written to stream
+        '''
+        stream = stream if stream is not None else sys.stderr
+        if self.format == 'trace':
+            stream.write("Trace written to %s\n" % self.write_trace(
+                process_name=process_name))
+        elif self.format == 'json':
+            stream.write(self.format_json())
+        else:
+            stream.write(self.format_table())
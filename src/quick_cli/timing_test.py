@@ -0,0 +1,166 @@
+''' Unit Tests For Phase Timing '''
+
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+from .actions import Action
+from .app import QuickCLIApp
+from .context import QuickCLIContext
+from .timing import TRACE_FILE_ENV, PhaseTimer, extract_timing_flag
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+class TestPhaseTimer(unittest.TestCase):
+    ''' Phase Timer tests '''
+
+    def test_disabled(self):
+        ''' Test disabled timer records nothing '''
+        timer = PhaseTimer()
+        with timer.phase("one"):
+            pass
+        self.assertFalse(timer.enabled)
+        self.assertEqual(timer.records, [])
+
+    def test_nested_phases(self):
+        ''' Test nested phases are recorded with depth '''
+        timer = PhaseTimer('json')
+        with timer.phase("outer"):
+            with timer.phase("inner"):
+                pass
+        phases = json.loads(timer.format_json())['phases']
+        self.assertEqual([(item['name'], item['depth']) for item in phases],
+                         [('outer', 0), ('inner', 1)])
+        self.assertGreaterEqual(phases[0]['duration_ms'],
+                                phases[1]['duration_ms'])
+        self.assertIn("  inner", timer.format_table())
+
+    def test_extract_timing_flag(self):
+        ''' Test extracting hidden timing flag '''
+        self.assertEqual(extract_timing_flag(['a', '--quickcli-timing', 'b']),
+                         (['a', 'b'], 'table'))
+        self.assertEqual(extract_timing_flag(['--quickcli-timing=json']),
+                         ([], 'json'))
+        self.assertEqual(extract_timing_flag(['a']), (['a'], None))
+
+    def test_app_timings(self):
+        ''' Test app run reports timings of phases and dispatched path '''
+        class App(QuickCLIApp):
+            ''' Test App '''
+            ACTIONS = [Action("one", action=lambda args, wrapper: 0)]
+
+            def on_timings(self, timer):
+                self.timings = [record.name for record in timer.records]
+
+        app = App()
+        saved_argv = sys.argv
+        sys.argv = ['prog']
+        try:
+            self.assertEqual(app.run(['--quickcli-timing', 'one']), 0)
+        finally:
+            sys.argv = saved_argv
+        for name in ['build_parser', 'parse_args', 'pre_execute',
+                     'prep_command[one]', 'execute[one]']:
+            self.assertIn(name, app.timings)
+
+    def test_per_invocation(self):
+        ''' Test timing flag and recorded timings only apply to one invocation '''
+        class App(QuickCLIApp):
+            ''' Test App '''
+            ACTIONS = [Action("one", action=lambda args, wrapper: 0)]
+            reports = []
+
+            def on_timings(self, timer):
+                self.reports.append([record.name for record in timer.records])
+
+        app = App()
+        self.assertEqual(app.invoke(['--quickcli-timing', 'one']), 0)
+        self.assertEqual(app.invoke(['one']), 0)
+        self.assertEqual(app.invoke(['--quickcli-timing', 'one']), 0)
+        self.assertEqual(len(app.reports), 2)
+        self.assertEqual(app.reports[1].count('pre_parser_config'), 1)
+        self.assertFalse(app.timer.enabled)
+
+    def test_thread_depth(self):
+        ''' Test phases of other threads do not nest into current phase '''
+        timer = PhaseTimer('table')
+
+        def worker():
+            ''' Time a phase in another thread '''
+            with timer.phase("worker"):
+                pass
+        with timer.phase("outer"):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+            with timer.phase("inner"):
+                pass
+        depths = dict((record.name, record.depth) for record in timer.records)
+        self.assertEqual(depths, {'outer': 0, 'worker': 0, 'inner': 1})
+
+    def test_trace_events(self):
+        ''' Test timings as Chrome trace events '''
+        timer = PhaseTimer('trace')
+        with timer.phase("outer"):
+            with timer.phase("inner", 'span', {'key': 'value'}):
+                pass
+        trace = timer.trace_events('prog')
+        metadata, outer, inner = trace['traceEvents']
+        self.assertEqual(metadata['args'], {'name': 'prog'})
+        self.assertEqual((outer['name'], outer['ph'], outer['cat']),
+                         ('outer', 'X', 'phase'))
+        self.assertEqual((inner['cat'], inner['args']), ('span', {'key': 'value'}))
+        self.assertEqual(inner['tid'], outer['tid'])
+        self.assertLessEqual(outer['ts'], inner['ts'])
+        self.assertGreaterEqual(outer['dur'], inner['dur'])
+
+    def test_span_without_timer(self):
+        ''' Test spans of a context without app do nothing '''
+        with QuickCLIContext(None).span("nothing") as record:
+            self.assertIsNone(record)
+
+    def test_app_trace(self):
+        ''' Test app run writes trace file with dispatch chain and user spans '''
+        def lookup(args, wrapper):
+            ''' Lookup with a user span '''
+            with wrapper.app.context.span("lookup", host='web'):
+                return 0
+
+        class App(QuickCLIApp):
+            ''' Test App '''
+            ACTIONS = [Action("one", actions=[Action("two", action=lookup)])]
+
+        tmpdir = tempfile.mkdtemp()
+        trace_file = os.path.join(tmpdir, 'trace.json')
+        os.environ[TRACE_FILE_ENV] = trace_file
+        saved_stderr = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            self.assertEqual(App().invoke(['--quickcli-timing=trace', 'one', 'two']), 0)
+            self.assertIn(trace_file, sys.stderr.getvalue())
+            with open(trace_file) as source:
+                events = json.load(source)['traceEvents']
+        finally:
+            sys.stderr = saved_stderr
+            del os.environ[TRACE_FILE_ENV]
+            shutil.rmtree(tmpdir)
+        names = [event['name'] for event in events]
+        for name in ['build_parser', 'parse_args', 'execute[one]',
+                     'prep_command[one two]', 'action[one two]', 'lookup']:
+            self.assertIn(name, names)
+        span = events[names.index('lookup')]
+        self.assertEqual(span['args'], {'host': 'web'})
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
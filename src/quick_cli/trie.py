@@ -0,0 +1,158 @@
+''' Prefix Tree For Action Lookup '''
+import logging
+
+LOG = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class _Node(object):
+    ''' Trie node
+
+    target is the value of keys below this node, if they all have the same
+    value (unique is True), i.e. a unique prefix of the key
+    '''
+    __slots__ = ('children', 'value', 'target', 'unique')
+
+    def __init__(self):
+        ''' Constructor '''
+        self.children = {}
+        self.value = _MISSING
+        self.target = _MISSING
+        self.unique = True
+
+
+class Trie(object):
+    ''' Prefix tree mapping keys (i.e. action names and aliases) to values
+
+    Supports exact lookup, unique-prefix lookup (abbreviations), listing
+    all values under a prefix, and suggesting keys within a bounded edit
+    distance of a word. Several keys may map to the same value (i.e. name
+    and aliases of an action), a prefix is unique if all keys below it
+    map to the same value.
+    '''
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, items=()):
+        ''' Constructor '''
+        self._root = _Node()
+        self._size = 0
+        for key, value in items:
+            self.add(key, value)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key, value):
+        ''' Add key with a value '''
+        node = self._root
+        for char in key:
+            self._mark(node, value)
+            node = node.children.setdefault(char, _Node())
+        self._mark(node, value)
+        if node.value is _MISSING:
+            self._size += 1
+        node.value = value
+
+    @staticmethod
+    def _mark(node, value):
+        ''' Record value as being below node '''
+        if node.target is _MISSING:
+            node.target = value
+        elif node.target != value:
+            node.unique = False
+
+    def _find(self, prefix):
+        ''' Get node of a prefix, or None '''
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def get(self, key, default_value=None):
+        ''' Get value of key '''
+        node = self._find(key)
+        if node is None or node.value is _MISSING:
+            return default_value
+        return node.value
+
+    def __contains__(self, key):
+        node = self._find(key)
+        return node is not None and node.value is not _MISSING
+
+    def unique(self, prefix):
+        ''' Get value of key, or of the only value of keys starting with prefix
+
+        Returns None if prefix is unknown or ambiguous
+        '''
+        node = self._find(prefix)
+        if node is None:
+            return None
+        if node.value is not _MISSING:
+            return node.value
+        return node.target if node.unique and node.target is not _MISSING else None
+
+    def keys(self, prefix=''):
+        ''' Get sorted keys starting with prefix '''
+        node = self._find(prefix)
+        keys = []
+        if node is not None:
+            self._collect(node, prefix, keys)
+        return sorted(keys)
+
+    def _collect(self, node, key, keys):
+        ''' Collect keys at and below node '''
+        if node.value is not _MISSING:
+            keys.append(key)
+        for char, child in node.children.items():
+            self._collect(child, key + char, keys)
+
+    def matches(self, prefix):
+        ''' Get distinct values of keys starting with prefix, in key order '''
+        values = []
+        for key in self.keys(prefix):
+            value = self.get(key)
+            if value not in values:
+                values.append(value)
+        return values
+
+    def suggest(self, word, max_distance=None, limit=5):
+        ''' Get keys within bounded edit (Levenshtein) distance of word
+
+        Returns up to limit keys, closest first, with one key per distinct
+        value. Trie branches are pruned as soon as they can not get within
+        max_distance (by default 1 for words up to 4 characters, else 2).
+        '''
+        if max_distance is None:
+            max_distance = 1 if len(word) <= 4 else 2
+        found = []
+        first_row = list(range(len(word) + 1))
+        for char, child in self._root.children.items():
+            self._search(child, char, char, word, first_row, max_distance, found)
+        found.sort()
+        keys = []
+        values = []
+        for _, key, value in found:
+            if value in values:
+                continue
+            values.append(value)
+            keys.append(key)
+            if len(keys) >= limit:
+                break
+        return keys
+
+    def _search(self, node, char, key, word, previous_row, max_distance, found):
+        ''' Compute edit distance row for node, recursing into children '''
+        row = [previous_row[0] + 1]
+        for column in range(1, len(word) + 1):
+            row.append(min(row[column - 1] + 1,
+                           previous_row[column] + 1,
+                           previous_row[column - 1] + (word[column - 1] != char)))
+        if node.value is not _MISSING and row[-1] <= max_distance:
+            found.append((row[-1], key, node.value))
+        if min(row) <= max_distance:
+            for next_char, child in node.children.items():
+                self._search(child, next_char, key + next_char, word, row,
+                             max_distance, found)
@@ -0,0 +1,165 @@
+''' Unit Tests For Action Lookup Trie '''
+
+import logging
+import unittest
+
+from .action_wrapper import IS_PYTHON2
+from .actions import Action
+from .app import QuickCLIApp
+from .dispatcher import build_path_parser
+from .trie import Trie
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+class TestTrie(unittest.TestCase):
+    ''' Trie tests '''
+
+    def make_trie(self):
+        ''' Make trie of names and aliases '''
+        return Trie([('deploy', 'deploy'), ('delete', 'delete'),
+                     ('rm', 'delete'), ('status', 'status'),
+                     ('stat', 'status'), ('start', 'start')])
+
+    def test_lookup(self):
+        ''' Test exact and unique prefix lookup '''
+        trie = self.make_trie()
+        self.assertEqual(len(trie), 6)
+        self.assertIn('rm', trie)
+        self.assertNotIn('r', trie)
+        self.assertEqual(trie.get('rm'), 'delete')
+        self.assertEqual(trie.unique('dep'), 'deploy')
+        self.assertEqual(trie.unique('r'), 'delete')
+        self.assertEqual(trie.unique('stat'), 'status')
+        self.assertIsNone(trie.unique('de'))
+        self.assertIsNone(trie.unique('sta'))
+        self.assertIsNone(trie.unique('x'))
+
+    def test_matches(self):
+        ''' Test listing of values under a prefix '''
+        trie = self.make_trie()
+        self.assertEqual(trie.keys('sta'), ['start', 'stat', 'status'])
+        self.assertEqual(trie.matches('sta'), ['start', 'status'])
+        self.assertEqual(trie.matches('x'), [])
+
+    def test_suggest(self):
+        ''' Test suggestions within bounded edit distance '''
+        trie = self.make_trie()
+        self.assertEqual(trie.suggest('depoly'), ['deploy'])
+        self.assertEqual(trie.suggest('statr'), ['stat', 'start'])
+        self.assertEqual(trie.suggest('rn'), ['rm'])
+        self.assertEqual(trie.suggest('xyzzy'), [])
+        self.assertEqual(trie.suggest('statr', limit=1), ['stat'])
+
+
+def noop(args, wrapper):
+    ''' Record executed action '''
+    wrapper.app.executed.append(wrapper.name)
+    return 0
+
+
+class App(QuickCLIApp):
+    ''' Test App '''
+    ABBREVIATIONS = True
+    ACTIONS = [Action("deploy", action=noop), Action("delete", action=noop,
+                                                     aliases=['rm']),
+               Action("status", action=noop, aliases=['deploy'])]
+
+    def __init__(self, **kwargs):
+        QuickCLIApp.__init__(self, **kwargs)
+        self.executed = []
+
+
+class RecordingHandler(logging.Handler):
+    ''' Log handler keeping formatted messages, as assertLogs is not on Python 2 '''
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.output = []
+
+    def emit(self, record):
+        self.output.append(self.format(record))
+
+
+class TestAbbreviations(unittest.TestCase):
+    ''' Action abbreviation tests '''
+
+    def parse_error(self, app, argv):
+        ''' Parse argv, returning error message '''
+        parser = app.build_parser()
+        output = StringIO()
+        parser._print_message = lambda message, file=None: output.write(message)
+        with self.assertRaises(SystemExit):
+            parser.parse_args(argv)
+        return output.getvalue()
+
+    def test_abbreviation(self):
+        ''' Test unique prefixes select actions '''
+        app = App()
+        self.assertEqual(app.invoke(['dep']), 0)
+        self.assertEqual(app.invoke(['stat']), 0)
+        self.assertEqual(app.executed, ['deploy', 'status'])
+        self.assertEqual(app.command.resolve_action('del').name, 'delete')
+        self.assertIsNone(app.command.resolve_action('de'))
+
+    @unittest.skipIf(IS_PYTHON2, "Aliases are not supported on Python 2")
+    def test_alias_abbreviation(self):
+        ''' Test unique prefixes of aliases select actions '''
+        app = App()
+        self.assertEqual(app.invoke(['r']), 0)
+        self.assertEqual(app.executed, ['delete'])
+
+    def test_errors(self):
+        ''' Test ambiguous and invalid actions are reported '''
+        app = App()
+        self.assertIn("ambiguous choice: 'de' could match 'delete', 'deploy'",
+                      self.parse_error(app, ['de']))
+        self.assertIn("invalid choice: 'delte' (did you mean 'delete'?)",
+                      self.parse_error(app, ['delte']))
+
+    def test_disabled(self):
+        ''' Test abbreviations are not resolved unless enabled '''
+        app = App()
+        app.ABBREVIATIONS = False
+        self.assertIsNone(app.command.resolve_action('dep'))
+        choices = "'deploy', 'delete', 'status'" if IS_PYTHON2 else \
+            "'deploy', 'delete', 'rm', 'status'"
+        self.assertIn("invalid choice: 'dep' (choose from %s)" % choices,
+                      self.parse_error(app, ['dep']))
+        self.assertIn("invalid choice: 'deplyo' (did you mean 'deploy'?)",
+                      self.parse_error(app, ['deplyo']))
+
+    def test_lazy_and_fast_path(self):
+        ''' Test abbreviations in lazy parser and fast path dispatch '''
+        app = App()
+        app.LAZY_PARSER = True
+        self.assertEqual(app.invoke(['dep']), 0)
+        parser = build_path_parser(app, ['dele'])
+        self.assertEqual(parser.parse_args(['dele']).action, 'delete')
+        self.assertIsNone(build_path_parser(app, ['de']))
+
+    def test_alias_conflict(self):
+        ''' Test conflicting alias is ignored at build time '''
+        app = App()
+        self.assertEqual(app.command.actions_idx['deploy'].name, 'deploy')
+        self.assertEqual(app.command.suggest_actions('stats'), ['status'])
+
+    def test_invalid_action(self):
+        ''' Test invalid action hook suggests closest actions '''
+        app = App()
+        logger = logging.getLogger('quick_cli.actions')
+        handler = RecordingHandler()
+        logger.addHandler(handler)
+        try:
+            self.assertEqual(app.on_invalid_action({}, app.command, 'delet'), 1)
+        finally:
+            logger.removeHandler(handler)
+        self.assertIn("did you mean 'delete'?", handler.output[0])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()